@@ -28,7 +28,7 @@ async def main():
     # 1. Setup Shared In-Memory Qdrant
     print("[INFO] Setting up in-memory vector DB...")
     shared_qdrant = QdrantHandler(use_memory=True)
-    shared_qdrant.create_collection_if_not_exists()
+    await shared_qdrant.create_collection_if_not_exists()
     
     # 2. Wire Components
     ingestor = IngestionService(qdrant_handler=shared_qdrant)
@@ -57,8 +57,8 @@ async def main():
     print("[OK] Ingestion Complete.")
     
     # Debug: Check extraction
-    count = shared_qdrant.client.count(collection_name="documents")
-    print(f"\n[DEBUG] Total Chunks in DB: {count.count}")
+    count = await shared_qdrant.count()
+    print(f"\n[DEBUG] Total Chunks in DB: {count}")
     
     # 4. Run Agent with Real Questions
     queries = [
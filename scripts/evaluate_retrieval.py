@@ -23,25 +23,33 @@ async def main():
     
     from src.infrastructure.db.qdrant import QdrantHandler
     shared_qdrant = QdrantHandler(use_memory=True)
-    shared_qdrant.create_collection_if_not_exists()
+    await shared_qdrant.create_collection_if_not_exists()
     
     # Monkey patch the classes to return our shared instance
     # This is "hacky" but efficient for a script without full DI container
     from unittest.mock import MagicMock
     
+    # Same for the BM25 index: keep it in memory and share it
+    from src.infrastructure.db.sparse_index import SparseIndex
+    shared_sparse = SparseIndex(path=None)
+    
     # Custom Ingestion Service that uses shared qdrant
     ingestor = IngestionService()
     ingestor.qdrant = shared_qdrant 
+    ingestor.sparse_index = shared_sparse
     
     # Custom Retriever that uses shared qdrant
     retriever = Retriever()
     retriever.qdrant = shared_qdrant
+    retriever.sparse_index = shared_sparse
     
     # 2. Ingest Data
     documents = [
         ("Paris.txt", "Paris is the capital of France. It is known for the Eiffel Tower."),
         ("Berlin.txt", "Berlin is the capital of Germany. It has the Brandenburg Gate."),
-        ("Tokyo.txt", "Tokyo is the capital of Japan. It is famous for Shibuya Crossing.")
+        ("Tokyo.txt", "Tokyo is the capital of Japan. It is famous for Shibuya Crossing."),
+        ("Dress.txt", "Policy 4.2: Headwear such as caps may not be worn during examinations."),
+        ("Grades.txt", "Grade B+ corresponds to Very Good. Grade F means the course was failed.")
     ]
     
     print(f"\n📥 Ingesting {len(documents)} validation documents...")
@@ -71,30 +79,42 @@ async def main():
         ("Capital of Japan?", "Tokyo")
     ]
     
-    print("\n🔍 Running Queries...")
-    hits = 0
-    k = 1
+    # Exact codes and labels are where dense-only retrieval tends to miss
+    queries += [
+        ("Policy 4.2", "Policy 4.2"),
+        ("What does grade B+ mean?", "Grade B+")
+    ]
     
-    print(f"{'QUERY':<40} | {'RETRIEVED':<30} | {'SCORE':<5} | {'HIT'}")
-    print("-" * 90)
+    k = 1
+    accuracies = {}
     
-    for query, expected_keyword in queries:
-        results = await retriever.retrieve(query, top_k=k)
+    for mode in ("dense", "sparse", "hybrid"):
+        print(f"\n🔍 Running Queries (mode={mode})...")
+        hits = 0
         
-        top_content = results[0].content if results else "NO RESULTS"
-        score = f"{results[0].score:.2f}" if results else "0.00"
+        print(f"{'QUERY':<40} | {'RETRIEVED':<30} | {'SCORE':<5} | {'HIT'}")
+        print("-" * 90)
         
-        is_hit = expected_keyword in top_content
-        if is_hit:
-            hits += 1
+        for query, expected_keyword in queries:
+            results = await retriever.retrieve(query, top_k=k, mode=mode)
+            
+            top_content = results[0].content if results else "NO RESULTS"
+            score = f"{results[0].score:.2f}" if results else "0.00"
+            
+            is_hit = expected_keyword in top_content
+            if is_hit:
+                hits += 1
+                
+            print(f"{query:<40} | {top_content[:30]}... | {score:<5} | {'✅' if is_hit else '❌'}")
             
-        print(f"{query:<40} | {top_content[:30]}... | {score:<5} | {'✅' if is_hit else '❌'}")
+        accuracies[mode] = (hits / len(queries)) * 100
+        print("-" * 90)
+        print(f"📊 Results ({mode}): {hits}/{len(queries)} Hits")
 
     # 4. Results
-    accuracy = (hits / len(queries)) * 100
-    print("-" * 90)
-    print(f"📊 Results: {hits}/{len(queries)} Hits")
-    print(f"🎯 Accuracy: {accuracy:.1f}%")
+    # Every miss at k=1 is roughly one extra retrieval round (one more LLM call) for the agent
+    print("\n🎯 Accuracy by mode: " + ", ".join(f"{m}={a:.1f}%" for m, a in accuracies.items()))
+    accuracy = accuracies["hybrid"]
 
     if accuracy < 80:
         print("❌ FAILED: Accuracy below 80%")
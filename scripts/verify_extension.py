@@ -16,7 +16,7 @@ async def main():
     
     # Setup
     shared_qdrant = QdrantHandler(use_memory=True)
-    shared_qdrant.create_collection_if_not_exists()
+    await shared_qdrant.create_collection_if_not_exists()
     
     # Use tmp db path provided by tempfile but handle closure explicitly
     tmp_db_path = Path(tempfile.gettempdir()) / f"test_registry_{int(time.time())}.db"
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from typing import AsyncGenerator
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from src.domain.chat.agent import AgentRouter
-from src.domain.chat.models import AgentStep, AnswerAction, RefuseAction
+from src.app.core.container import ServiceContainer, get_container
+from src.domain.chat.answer_cache import answer_cache
+from src.domain.chat.models import AgentState, AgentStep, AnswerAction, RefuseAction
+from src.infrastructure.db.registry import corpus_generation
 
 router = APIRouter()
 
@@ -11,13 +17,21 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     steps: list[AgentStep]
+    cached: bool = False
 
 @router.post("/", response_model=ChatResponse)
-async def chat_with_agent(request: ChatRequest):
+async def chat_with_agent(request: ChatRequest, container: ServiceContainer = Depends(get_container)):
     """
     Interact with the Agentic RAG system.
+    Near-duplicates of recently answered questions are served from the semantic answer cache.
     """
-    agent = AgentRouter()
+    generation = corpus_generation.value
+    query_vector = await container.embedding_service.aembed_query(request.query)
+    cached = answer_cache.lookup(query_vector)
+    if cached is not None:
+        return ChatResponse(answer=cached.answer, steps=cached.steps, cached=True)
+
+    agent = container.agent()
     steps = []
     final_answer = ""
     
@@ -28,8 +42,74 @@ async def chat_with_agent(request: ChatRequest):
                 final_answer = step.action.answer
             elif isinstance(step.action, RefuseAction):
                 final_answer = f"Refused: {step.action.reason}"
+
+    # Only answers that passed the guardrail are worth replaying
+    if steps and steps[-1].state == AgentState.DONE and isinstance(steps[-1].action, AnswerAction):
+        answer_cache.store(query_vector, request.query, final_answer, steps, generation)
                 
     return ChatResponse(
         answer=final_answer or "No answer generated.",
         steps=steps
     )
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+async def _stream_agent(query: str, container: ServiceContainer) -> AsyncGenerator[str, None]:
+    generation = corpus_generation.value
+    query_vector = await container.embedding_service.aembed_query(query)
+    cached = answer_cache.lookup(query_vector)
+    if cached is not None:
+        for step in cached.steps:
+            yield _sse("step", step.model_dump_json())
+        yield _sse("answer", json.dumps({"answer": cached.answer, "cached": True}))
+        return
+
+    # The agent runs as a producer task; tokens and steps share one queue so
+    # they reach the client in the order they were produced.
+    queue: asyncio.Queue = asyncio.Queue()
+    steps = []
+
+    async def on_token(text: str):
+        await queue.put(("token", json.dumps({"text": text})))
+
+    async def produce():
+        try:
+            async for step in container.agent().run(query, on_token=on_token):
+                steps.append(step)
+                await queue.put(("step", step.model_dump_json()))
+        except Exception as e:
+            await queue.put(("error", json.dumps({"detail": str(e)})))
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (item := await queue.get()) is not None:
+            yield _sse(*item)
+    finally:
+        # Client went away: stop the agent instead of finishing the run for nobody
+        producer.cancel()
+
+    final_answer = ""
+    if steps and isinstance(steps[-1].action, AnswerAction):
+        final_answer = steps[-1].action.answer
+        if steps[-1].state == AgentState.DONE:
+            answer_cache.store(query_vector, query, final_answer, steps, generation)
+    elif steps and isinstance(steps[-1].action, RefuseAction):
+        final_answer = f"Refused: {steps[-1].action.reason}"
+    yield _sse("answer", json.dumps({"answer": final_answer or "No answer generated.", "cached": False}))
+
+@router.post("/stream")
+async def chat_with_agent_stream(request: ChatRequest, container: ServiceContainer = Depends(get_container)):
+    """
+    Server-sent events version of /chat.
+    Events: `step` (an AgentStep, once its action has run), `token` (answer
+    text while the LLM generates it), `error`, and a closing `answer`.
+    Streamed tokens precede the guardrail check; the closing `answer` event is authoritative.
+    """
+    return StreamingResponse(
+        _stream_agent(request.query, container),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,34 +1,65 @@
-import shutil
+import hashlib
 import tempfile
 from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query, status
-from src.services.ingestion import IngestionService
+from typing import Tuple
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Response, status
+from src.app.core.container import ServiceContainer, get_container
 from src.domain.documents.models import DocumentMetadata
 from src.domain.documents.exceptions import UnsupportedFileTypeError, ParsingError
+from src.infrastructure.executors import executors
 
 router = APIRouter()
 
+# Upload read size; large reads keep the per-chunk executor hop negligible
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+async def _save_upload(file: UploadFile, suffix: str) -> Tuple[Path, str]:
+    """Streams the upload to a temp file, hashing it on the way. Returns (path, sha256)."""
+    sha256_hash = hashlib.sha256()
+    tmp = await executors.run_io(tempfile.NamedTemporaryFile, delete=False, suffix=suffix)
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            sha256_hash.update(chunk)
+            await executors.run_io(tmp.write, chunk)
+    except BaseException:
+        tmp.close()
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+    await executors.run_io(tmp.close)
+    return Path(tmp.name), sha256_hash.hexdigest()
+
 @router.post("/", response_model=DocumentMetadata, status_code=status.HTTP_201_CREATED)
 async def ingest_document(
+    response: Response,
     file: UploadFile = File(...),
-    strategy: str = Query("semantic", description="Chunking strategy: semantic, fixed, recursive, markdown")
+    strategy: str = Query("semantic", description="Chunking strategy: semantic, fixed, recursive, markdown"),
+    container: ServiceContainer = Depends(get_container)
 ):
     """
     Uploads and ingests a document into the RAG system.
+    Re-uploading a file whose content is already registered under the same
+    name returns its current record (200) without parsing it again.
     """
-    service = IngestionService()
+    service = container.ingestion
+    filename = file.filename or "unknown"
     
-    # Create temp file
-    # In production, might want to stream or use specific volume
-    suffix = Path(file.filename).suffix if file.filename else ""
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = Path(tmp.name)
+    # Stream to a temp file (keeps the original suffix for type detection);
+    # the hash computed here is reused by ingestion and parsing
+    suffix = Path(filename).suffix
+    tmp_path, content_hash = await _save_upload(file, suffix)
         
     try:
-        metadata = await service.ingest_file(tmp_path, strategy=strategy)
-        # Update filename to original name as tmp name is random
-        metadata.filename = file.filename or "unknown" 
+        metadata = await service.ingest_file(tmp_path, strategy=strategy, content_hash=content_hash, filename=filename)
+        if metadata is None:
+            # Unchanged: describe the version that is already published
+            record = await executors.run_io(service.registry.get_by_filename, filename)
+            response.status_code = status.HTTP_200_OK
+            return DocumentMetadata(
+                doc_id=record.logical_id,
+                filename=filename,
+                file_type=suffix.lstrip('.').lower(),
+                content_hash=content_hash
+            )
         return metadata
         
     except UnsupportedFileTypeError as e:
@@ -1,8 +1,8 @@
 from typing import List, Optional
-from fastapi import APIRouter, Query, HTTPException
-from src.services.retrieval import Accountant, Retriever, RetrievalResult # Wait, Accountant? Bad copy paste potential. 
-# Fixed import
-from src.services.retrieval import Retriever, RetrievalResult
+from fastapi import APIRouter, Depends, Query, HTTPException
+from src.app.core.container import ServiceContainer, get_container
+from src.services.retrieval import RetrievalResult, RetrievalMode
+from src.domain.documents.models import SearchFilters
 
 router = APIRouter()
 
@@ -10,14 +10,21 @@ router = APIRouter()
 async def search_documents(
     query: str = Query(..., min_length=1),
     top_k: int = Query(5, ge=1, le=20),
-    threshold: Optional[float] = Query(0.1, ge=0.0, le=1.0)
+    threshold: Optional[float] = Query(0.1, ge=0.0, le=1.0),
+    latest_only: bool = Query(True, description="Only search the current version of each document (ignored when `version` is given)"),
+    version: Optional[int] = Query(None, ge=1, description="Only search this version number"),
+    filename: Optional[str] = Query(None, description="Only search chunks of this file"),
+    mode: Optional[RetrievalMode] = Query(None, description="dense, sparse (BM25) or hybrid; defaults to RETRIEVAL_MODE"),
+    container: ServiceContainer = Depends(get_container)
 ):
     """
     Search for documents using semantic similarity.
     """
     try:
-        retriever = Retriever()
-        results = await retriever.retrieve(query, top_k=top_k, score_threshold=threshold)
+        retriever = container.retriever
+        # An explicit version asks for that version, current or not
+        filters = SearchFilters(latest_only=latest_only and version is None, version_number=version, filename=filename)
+        results = await retriever.retrieve(query, top_k=top_k, score_threshold=threshold, filters=filters, mode=mode)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Retrieval failed: {str(e)}")
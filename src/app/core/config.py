@@ -1,6 +1,7 @@
+import os
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import PostgresDsn, computed_field
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_ignore_empty=True)
@@ -8,6 +9,9 @@ class Settings(BaseSettings):
     # API
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "Agentic RAG Platform"
+    BACKEND_CORS_ORIGINS: List[str] = []
+    APP_WARMUP: bool = True # Load the embedding model and prepare the collection at startup
+    INGESTION_WORKER_ENABLED: bool = True
     
     # POSTGRES
     POSTGRES_SERVER: str = "localhost"
@@ -30,11 +34,78 @@ class Settings(BaseSettings):
     # QDRANT
     QDRANT_HOST: str = "localhost"
     QDRANT_PORT: int = 6333
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_UPSERT_BATCH_SIZE: int = 256
+    QDRANT_UPSERT_PARALLELISM: int = 4
     QDRANT_API_KEY: Optional[str] = None
     
     # LLM (Defaults to Ollama/Local)
     LLM_MODEL: str = "ollama/llama3"
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     OLLAMA_BASE_URL: str = "http://localhost:11434"
+    LLM_CALL_TIMEOUT_S: float = 30.0 # Per attempt
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_RETRY_MAX_WAIT_S: float = 4.0
+    LLM_RUN_BUDGET_S: float = 90.0 # Total LLM + tool time for one agent run
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_SAMPLES: int = 20 # Latencies observed before the p95 is trusted
+
+    # AGENT
+    AGENT_PLANNER_POLICY: str = "llm" # llm | fast_path (first retrieve decided locally)
+    AGENT_MAX_QUERY_CHARS: int = 2000
+    AGENT_MAX_PROMPT_TOKENS: int = 6000 # Retrieved context is trimmed (lowest scores first) to fit
+    AGENT_CONTEXT_COMPRESSION: bool = False # Keep only the query-relevant sentences of each chunk
+    COMPRESSION_MAX_SENTENCES: int = 3
+    COMPRESSION_MAX_CHARS: int = 600 # Per chunk
+    COMPRESSION_CACHE_CHUNKS: int = 4096
+    AGENT_SPECULATIVE_RETRIEVAL: bool = False # Retrieve the user query while the first step is planned
+    AGENT_SPECULATION_SIMILARITY: float = 0.9
+
+    # EMBEDDING CACHE (content-addressed, persisted next to the registry)
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.db"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200_000
+
+    # RETRIEVAL
+    RETRIEVAL_MODE: str = "dense" # dense | sparse | hybrid (hybrid scores are RRF values, not cosine)
+    SPARSE_INDEX_PATH: str = "data/sparse_index.json.gz"
+    SPARSE_INDEX_SAVE_DELAY_S: float = 5.0 # Ingest writes within this window share one save
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = 1024
+    RETRIEVAL_CACHE_TTL_S: float = 600.0
+    ANSWER_CACHE_MAX_ENTRIES: int = 512
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.92
+
+    # QUERY EMBEDDING MICRO-BATCHING
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # EXECUTORS (blocking work is kept off the event loop)
+    IO_EXECUTOR_WORKERS: int = 16
+    MODEL_EXECUTOR_WORKERS: int = 2
+
+    # DOCUMENT PARSING (dedicated process pool)
+    PARSER_WORKERS: int = max(1, (os.cpu_count() or 2) - 1)
+    PARSER_TIMEOUT_S: float = 300.0 # Per document
+    PARSER_MAX_DOCS_PER_WORKER: int = 20 # Workers are recycled to contain converter leaks
+    PARSER_MEMORY_LIMIT_MB: int = 4096 # Per worker RSS; 0 disables
+    PARSE_CACHE_DIR: str = "data/parse_cache" # Converted markdown, keyed by content hash
+    PARSE_CACHE_MAX_MB: int = 1024 # Compressed size on disk; 0 disables
+
+    # INGESTION PIPELINE (parse -> chunk -> embed -> upsert)
+    PIPELINE_PARSE_WORKERS: int = max(1, (os.cpu_count() or 2) - 1) # One document per parser process
+    PIPELINE_CHUNK_WORKERS: int = 2
+    PIPELINE_EMBED_BATCH_SIZE: int = 64 # Chunks per model call, packed across documents
+    PIPELINE_EMBED_MAX_WAIT_MS: float = 50.0 # Flush a partial batch when input stalls this long
+    PIPELINE_UPSERT_WORKERS: int = 2
+    PIPELINE_QUEUE_SIZE: int = 8 # Documents buffered between stages
+
+    # SOURCE DIRECTORY WATCHER (background ingestion)
+    SOURCE_DOCS_DIR: str = "data/source_docs"
+    WATCHER_USE_INOTIFY: bool = True # Falls back to polling where inotify is unavailable
+    WATCHER_DEBOUNCE_S: float = 2.0 # Quiet period before a burst of changes is ingested
+    WATCHER_MAX_DELAY_S: float = 30.0 # Upper bound on debouncing during continuous writes
+    WATCHER_POLL_INTERVAL_S: float = 10.0 # Polling fallback: stat-only scans
+    WATCHER_RESCAN_INTERVAL_S: float = 3600.0 # Full reconciliation (missed events, failed files)
+    WATCHER_STAT_CACHE_PATH: str = "data/source_stat_cache.json"
 
 settings = Settings()
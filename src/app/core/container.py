@@ -0,0 +1,90 @@
+from pathlib import Path
+from typing import Optional
+from fastapi import Request
+from src.app.core.config import settings
+from src.domain.chat.agent import AgentRouter
+from src.domain.chat.tools import AgentTools
+from src.domain.documents.parser import DocumentParser
+from src.domain.documents.parsing_pool import parsing_pool
+from src.infrastructure.db.qdrant import QdrantHandler, close_shared_clients, is_shared_client
+from src.infrastructure.db.registry import DocumentRegistry
+from src.infrastructure.db.sparse_index import SparseIndex, get_sparse_index
+from src.infrastructure.executors import executors
+from src.infrastructure.llm.embedding_cache import EmbeddingCache
+from src.infrastructure.llm.embeddings import EmbeddingService
+from src.infrastructure.llm.model_registry import model_registry
+from src.services.ingestion import IngestionService
+from src.services.pipeline import IngestionPipeline
+from src.services.retrieval import Retriever
+from src.services.source_watcher import SourceWatcher
+
+class ServiceContainer:
+    """
+    Long-lived services of the API process, built once in the app lifespan and
+    handed to endpoints through `Depends(get_container)`. Requests only build
+    what holds per-run state (an AgentRouter); everything else is shared.
+    """
+
+    def __init__(
+        self,
+        qdrant: Optional[QdrantHandler] = None,
+        registry: Optional[DocumentRegistry] = None,
+        sparse_index: Optional[SparseIndex] = None
+    ):
+        self.qdrant = qdrant or QdrantHandler()
+        self.registry = registry or DocumentRegistry()
+        self.sparse_index = sparse_index if sparse_index is not None else get_sparse_index()
+        self.embedding_service = EmbeddingService()
+        self.parser = DocumentParser()
+        self.retriever = Retriever(
+            qdrant_handler=self.qdrant,
+            registry=self.registry,
+            sparse_index=self.sparse_index,
+            embedding_service=self.embedding_service
+        )
+        self.tools = AgentTools(retriever=self.retriever)
+        self.ingestion = IngestionService(
+            qdrant_handler=self.qdrant,
+            registry=self.registry,
+            sparse_index=self.sparse_index,
+            parser=self.parser,
+            # Document embeddings go through the persistent cache
+            embedding_service=EmbeddingService(cache=EmbeddingCache())
+        )
+        self.pipeline = IngestionPipeline(self.ingestion)
+        self.watcher = SourceWatcher(self.pipeline, Path(settings.SOURCE_DOCS_DIR))
+
+    def agent(self) -> AgentRouter:
+        return AgentRouter(tools=self.tools)
+
+    async def startup(self, warmup: bool = settings.APP_WARMUP):
+        """
+        Warm-up, so the first request does not pay for it: load the embedding
+        model and make sure the collection exists. Failures are logged, not
+        fatal; the same work is retried lazily on first use.
+        """
+        if not warmup:
+            return
+        try:
+            await executors.run_model(model_registry.get, self.embedding_service.model_name)
+            print(f"🔥 Embedding model {self.embedding_service.model_name} loaded.")
+        except Exception as e:
+            print(f"⚠️ Could not preload embedding model: {e}")
+        try:
+            await self.qdrant.create_collection_if_not_exists()
+        except Exception as e:
+            print(f"⚠️ Could not prepare vector collection: {e}")
+
+    async def shutdown(self):
+        # Persist BM25 changes still waiting for their debounced save
+        await self.ingestion.close()
+        for batcher in EmbeddingService._query_batchers.values():
+            await batcher.close()
+        if not is_shared_client(self.qdrant.client):
+            await self.qdrant.client.close()
+        await close_shared_clients()
+        parsing_pool.shutdown(wait=False)
+        executors.shutdown(wait=False)
+
+def get_container(request: Request) -> ServiceContainer:
+    return request.app.state.container
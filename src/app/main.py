@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.app.core.config import settings
 from src.app.api import ingestion, search, chat
@@ -6,18 +6,36 @@ from src.app.api import ingestion, search, chat
 from contextlib import asynccontextmanager
 import asyncio
 from src.app.worker import background_ingestion_task
+from src.infrastructure.llm.model_registry import model_registry
+from src.infrastructure.llm.embeddings import EmbeddingService
+from src.infrastructure.executors import executors
+from src.app.core.container import ServiceContainer, get_container
+from src.services.retrieval_cache import retrieval_cache
+from src.domain.chat.answer_cache import answer_cache
+from src.infrastructure.llm.client import all_call_stats
+from src.domain.chat.speculation import speculation_stats
+from src.domain.chat.planner import planner_stats
+from src.domain.documents.parsing_pool import parsing_pool
+from src.domain.documents.parse_cache import parse_cache
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Start worker
-    worker_task = asyncio.create_task(background_ingestion_task())
+    # Startup: build the long-lived services once, warm them up, start worker
+    container = ServiceContainer()
+    app.state.container = container
+    await container.startup()
+    worker_task = None
+    if settings.INGESTION_WORKER_ENABLED:
+        worker_task = asyncio.create_task(background_ingestion_task(container.watcher))
     yield
     # Shutdown
-    worker_task.cancel()
-    try:
-        await worker_task
-    except asyncio.CancelledError:
-        pass
+    if worker_task:
+        worker_task.cancel()
+        try:
+            await worker_task
+        except asyncio.CancelledError:
+            pass
+    await container.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -44,6 +62,23 @@ if settings.BACKEND_CORS_ORIGINS:
 async def health_check():
     return {"status": "ok", "project": settings.PROJECT_NAME}
 
+@app.get("/metrics")
+async def metrics(container: ServiceContainer = Depends(get_container)):
+    return {
+        "models": model_registry.stats(),
+        "query_batching": EmbeddingService.batcher_stats(),
+        "executors": executors.stats(),
+        "retrieval_cache": retrieval_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "llm": all_call_stats(),
+        "speculative_retrieval": speculation_stats.as_dict(),
+        "planner": planner_stats.as_dict(),
+        "parsing": parsing_pool.stats(),
+        "parse_cache": parse_cache.stats(),
+        "ingestion_pipeline": container.pipeline.stats(),
+        "source_watcher": container.watcher.stats()
+    }
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Agentic Document Intelligence Platform"}
@@ -1,32 +1,19 @@
-import asyncio
-import os
 from pathlib import Path
+from typing import Optional
+from src.app.core.config import settings
 from src.services.ingestion import IngestionService
+from src.services.pipeline import IngestionPipeline
+from src.services.source_watcher import SourceWatcher
 
-SOURCE_DOCS_DIR = Path("data/source_docs")
+SOURCE_DOCS_DIR = Path(settings.SOURCE_DOCS_DIR)
 
-async def background_ingestion_task():
+async def background_ingestion_task(watcher: Optional[SourceWatcher] = None):
     """
-    Periodically checks for new/updated files and ingests them.
+    Ingests new/updated files under the source directory as they appear.
+    Uses the app's SourceWatcher when given, so it shares the API's services.
     """
     print("🚀 Background Ingestion Worker Started.")
-    # Ensure dir exists
-    SOURCE_DOCS_DIR.mkdir(parents=True, exist_ok=True)
     
-    ingestor = IngestionService()
-    
-    while True:
-        try:
-            # 1. List Files
-            files = [f for f in SOURCE_DOCS_DIR.iterdir() if f.is_file()]
-            
-            for file_path in files:
-                if file_path.suffix.lower() in [".pdf", ".docx", ".txt"]:
-                    # Ingest Logic handles hashing & skipping
-                    await ingestor.ingest_file(file_path)
-            
-        except Exception as e:
-            print(f"⚠️ Background Worker Error: {e}")
-            
-        # Wait 60s
-        await asyncio.sleep(60)
+    # Only files whose stat changed are hashed; unchanged content is still skipped by ingestion
+    watcher = watcher or SourceWatcher(IngestionPipeline(IngestionService()), SOURCE_DOCS_DIR)
+    await watcher.run()
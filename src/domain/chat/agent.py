@@ -1,36 +1,57 @@
+import asyncio
 import json
 import time
-from typing import List, AsyncGenerator
-from litellm import completion
+from typing import Any, List, AsyncGenerator, Awaitable, Callable, Coroutine, Dict
 from src.app.core.config import settings
 from src.domain.chat.models import (
     AgentState, AgentStep, AgentAction, 
-    RetrieveAction, SummarizeAction, ClarifyAction, AnswerAction, RefuseAction
+    RetrieveAction, MultiRetrieveAction, SummarizeAction, ClarifyAction, AnswerAction, RefuseAction
 )
 from src.domain.chat.tools import AgentTools
 from src.domain.chat.guardrails import ConfidenceGuard
+from src.domain.chat.streaming import AnswerFieldStreamer
+from src.domain.chat.speculation import SpeculativeRetrieval
+from src.domain.chat.context import ContextManager
+from src.domain.chat.planner import build_planner, planner_stats
+from src.infrastructure.llm.client import LLMBudgetExceeded, LLMClient
 
 from typing import Optional
 
+TokenCallback = Callable[[str], Awaitable[None]]
+
 class AgentRouter:
-    def __init__(self, tools: Optional[AgentTools] = None):
+    def __init__(
+        self,
+        tools: Optional[AgentTools] = None,
+        speculative: Optional[bool] = None,
+        planner_policy: Optional[str] = None
+    ):
         self.tools = tools or AgentTools()
+        self.speculative = settings.AGENT_SPECULATIVE_RETRIEVAL if speculative is None else speculative
+        self.planner = build_planner(planner_policy or settings.AGENT_PLANNER_POLICY)
+        # Per run (latest run), see _loop
+        self.llm_calls = 0
+        self.llm_calls_saved = 0
         self.guard = ConfidenceGuard()
         self.history: List[AgentStep] = []
         self.max_steps = 5
         self.model = settings.LLM_MODEL
+        self.llm = LLMClient(self.model)
+        self.budget_s = settings.LLM_RUN_BUDGET_S
         
     def _build_system_prompt(self) -> str:
         return """You are a specific, reliable Agentic Document Assistant.
 your Goal: Answer user queries using ONLY the provided tools.
 You have access to:
 1. retrieve_context(query): Search documents.
-2. summarize_docs(ids): Summarize specific docs.
-3. clarify(question): Ask user for details.
-4. refuse(reason): If you cannot answer.
+2. multi_retrieve(queries): Search documents for several independent sub-questions at once.
+3. summarize_docs(ids): Summarize specific docs.
+4. clarify(question): Ask user for details.
+5. refuse(reason): If you cannot answer.
 
 RULES:
 - ALWAYS 'retrieve' first if you need information.
+- If the question needs several separate facts, use ONE 'multi_retrieve' with a query per fact instead of several 'retrieve' steps.
 - If retrieval is empty/irrelevant, try identifying why, or clarify.
 - If you have enough info, use 'answer'.
 - Be concise.
@@ -41,19 +62,74 @@ RESPONSE FORMAT:
 You MUST output a single JSON object.
 Examples:
 {"action_type": "retrieve", "query": "search query", "rationale": "reasoning"}
+{"action_type": "multi_retrieve", "queries": ["first sub-question", "second sub-question"], "rationale": "reasoning"}
 {"action_type": "answer", "answer": "final response", "rationale": "reasoning", "citations": ["doc1.pdf"], "confidence_score": 0.9}
 {"action_type": "refuse", "reason": "why refusing", "rationale": "reasoning"}
 """
 
-    async def run(self, user_query: str) -> AsyncGenerator[AgentStep, None]:
+    async def _decide(
+        self,
+        messages: List[Dict[str, str]],
+        deadline: float,
+        on_token: Optional[TokenCallback] = None
+    ) -> str:
+        """
+        Calls the LLM and returns the raw JSON decision.
+        With `on_token`, the response is streamed and the text of an "answer"
+        field is forwarded as it is generated.
+        """
+        if on_token is None:
+            return await self.llm.complete(messages, deadline=deadline)
+
+        streamer = AnswerFieldStreamer()
+
+        async def on_delta(delta: str):
+            text = streamer.feed(delta)
+            if text:
+                await on_token(text)
+
+        await self.llm.complete(messages, deadline=deadline, on_delta=on_delta)
+        return streamer.buffer
+
+    async def run(self, user_query: str, on_token: Optional[TokenCallback] = None) -> AsyncGenerator[AgentStep, None]:
         """
         Main loop:
         1. User Query -> Thinking (Plan)
         2. Action Loop (Thought -> Tool -> Observation)
         3. Answer
+        on_token: optional async callback receiving answer text as it is generated.
+        Tokens are sent before the guardrail runs, so the final step decides
+        whether they stand.
+        The whole run (LLM calls and tools) has a latency budget; once it is
+        spent the agent refuses, cutting short a tool call still in flight.
         """
+        # Speculative mode: retrieval of the raw query overlaps the first planning call.
+        # With a fast-path planner there is no first planning call to overlap.
+        speculation = SpeculativeRetrieval(self.tools, user_query) if self.speculative and not self.planner else None
+        try:
+            async for step in self._loop(user_query, on_token, speculation):
+                yield step
+        finally:
+            if speculation:
+                speculation.discard()
+
+    async def _loop(
+        self,
+        user_query: str,
+        on_token: Optional[TokenCallback],
+        speculation: Optional[SpeculativeRetrieval]
+    ) -> AsyncGenerator[AgentStep, None]:
+        deadline = time.monotonic() + self.budget_s
         step_count = 0
-        current_context = ""
+        # History and context are per run: a reused (or shared) router starts every query clean.
+        # self.history points at the latest run's steps for inspection.
+        history: List[AgentStep] = []
+        self.history = history
+        context = ContextManager(self.model)
+        self.llm_calls = 0
+        self.llm_calls_saved = 0
+        planner_stats.runs += 1
+        planned = self.planner.initial_action(user_query) if self.planner else None
         
         # Initial State
         yield AgentStep(
@@ -65,79 +141,96 @@ Examples:
         while step_count < self.max_steps:
             step_count += 1
             
-            # 1. Prepare Messages for LLM
-            messages = [{"role": "system", "content": self._build_system_prompt()}]
-            
-            # Add history
-            for step in self.history:
-                if step.action:
-                    messages.append({"role": "assistant", "content": f"Action: {step.action.action_type}\nRationale: {step.action.rationale}"})
-                if step.observation:
-                    messages.append({"role": "user", "content": f"Tool Output: {step.observation}"})
-            
-            # Current Input
-            messages.append({"role": "user", "content": f"User Query: {user_query}\nCurrent Context: {current_context}"})
+            if planned is not None:
+                # Decided locally: one LLM round trip saved
+                action, planned, prompt_tokens = planned, None, None
+                self.llm_calls_saved += 1
+                planner_stats.llm_calls_saved += 1
+                if isinstance(action, RefuseAction):
+                    planner_stats.local_refusals += 1
+            else:
+                # 1. Prepare Messages for LLM
+                # Retrieved chunks are sent once, in the context section, within the token budget
+                messages, prompt_tokens = context.build_messages(
+                    self._build_system_prompt(), self._history_messages(history), user_query
+                )
             
-            # 2. Call LLM for Decision
-            # We use LiteLLM's response_format or function calling if model supports it.
-            # Ideally we use Pydantic object for structured output.
-            # Since we are "FOSS/Local", we might be using Llama3 via Ollama which supports JSON mode well.
+                # 2. Call LLM for Decision
+                # We use LiteLLM's response_format or function calling if model supports it.
+                # Ideally we use Pydantic object for structured output.
+                # Since we are "FOSS/Local", we might be using Llama3 via Ollama which supports JSON mode well.
             
-            try:
-                response = completion(
-                    model=self.model,
-                    messages=messages,
-                    base_url=settings.OLLAMA_BASE_URL if "ollama" in self.model else None,
-                    response_format={"type": "json_object"} 
-                )
-                content = response.choices[0].message.content
+                try:
+                    self.llm_calls += 1
+                    planner_stats.llm_calls += 1
+                    content = await self._decide(messages, deadline, on_token)
                 
-                # Parse Decision (Expect JSON matching one of the Action schemas)
-                # In robust implementation, we'd use a parser library. 
-                # Here we trust the prompt + JSON mode.
-                decision_data = json.loads(content)
+                    # Parse Decision (Expect JSON matching one of the Action schemas)
+                    # In robust implementation, we'd use a parser library. 
+                    # Here we trust the prompt + JSON mode.
+                    decision_data = json.loads(content)
                 
-                # Naive polymorphic parsing based on 'action_type'
-                action_type = decision_data.get("action_type")
+                    # Naive polymorphic parsing based on 'action_type'
+                    action_type = decision_data.get("action_type")
                 
-                if action_type == "retrieve":
-                    action = RetrieveAction(**decision_data)
-                elif action_type == "answer":
-                    action = AnswerAction(**decision_data)
-                elif action_type == "clarify":
-                    action = ClarifyAction(**decision_data)
-                elif action_type == "refuse":
-                    action = RefuseAction(**decision_data)
-                else:
-                    # Fallback
-                    action = RefuseAction(reason="Invalid action generated", rationale="LLM failure")
+                    if action_type == "retrieve":
+                        action = RetrieveAction(**decision_data)
+                    elif action_type == "multi_retrieve":
+                        action = MultiRetrieveAction(**decision_data)
+                    elif action_type == "answer":
+                        action = AnswerAction(**decision_data)
+                    elif action_type == "clarify":
+                        action = ClarifyAction(**decision_data)
+                    elif action_type == "refuse":
+                        action = RefuseAction(**decision_data)
+                    else:
+                        # Fallback
+                        action = RefuseAction(reason="Invalid action generated", rationale="LLM failure")
                 
-            except Exception as e:
-                yield AgentStep(state=AgentState.REFUSING, thought=f"LLM Error: {e}", timestamp=time.time())
-                return
+                except LLMBudgetExceeded:
+                    yield self._budget_exhausted_step()
+                    return
+                except Exception as e:
+                    if time.monotonic() >= deadline:
+                        # Last attempt was cut short by the run budget
+                        yield self._budget_exhausted_step()
+                    else:
+                        yield AgentStep(state=AgentState.REFUSING, thought=f"LLM Error: {e}", timestamp=time.time())
+                    return
 
             # 3. Create Step & Execute
             step = AgentStep(
                 state=AgentState.ANALYZING, # Interim state
                 thought=f"Decided to {action.action_type}",
                 action=action,
+                prompt_tokens=prompt_tokens,
                 timestamp=time.time()
             )
+            history.append(step)
+            finished = True
             
-            yield step
-            self.history.append(step)
-            
-            # 4. Execute Action
-            if isinstance(action, RetrieveAction):
-                step.state = AgentState.RETRIEVING
-                observation = await self.tools.retrieve_context(action.query)
-                step.observation = observation
-                current_context += f"\nRetrieval for '{action.query}':\n{observation}"
-                # Loop continues
+            # 4. Execute Action (the step is yielded once final: state, observation, guardrail verdict)
+            try:
+                if isinstance(action, RetrieveAction):
+                    step.state = AgentState.RETRIEVING
+                    results = await self._within_budget(speculation.claim(action.query), deadline) if speculation else None
+                    if results is None:
+                        results = await self._within_budget(self.tools.retrieve(action.query), deadline)
+                    step.observation = self._observe(context, results)
+                    finished = False # Loop continues
+
+                elif isinstance(action, MultiRetrieveAction):
+                    step.state = AgentState.RETRIEVING
+                    results = await self._within_budget(self.tools.retrieve_many(action.queries), deadline)
+                    step.observation = self._observe(context, results)
+                    finished = False
+            except LLMBudgetExceeded:
+                yield self._budget_exhausted_step()
+                return
                 
-            elif isinstance(action, AnswerAction):
+            if isinstance(action, AnswerAction):
                 # GUARDRAIL CHECK
-                validated_action = self.guard.evaluate_answer(action, current_context)
+                validated_action = self.guard.evaluate_answer(action, messages[-1]["content"])
                 
                 # Update step action if it changed (e.g. to Refuse)
                 step.action = validated_action
@@ -147,15 +240,16 @@ Examples:
                      step.thought += f" (Guardrail: Refused due to {validated_action.reason})"
                 else:
                     step.state = AgentState.DONE
-                return # Done
                 
             elif isinstance(action, ClarifyAction):
-                step.state = AgentState.CLARIFYING
-                return # Done (wait for user)
+                step.state = AgentState.CLARIFYING # Wait for user
                 
             elif isinstance(action, RefuseAction):
                 step.state = AgentState.REFUSING
-                return # Done
+
+            yield step
+            if finished:
+                return
                 
         # Max steps reached
         yield AgentStep(
@@ -164,3 +258,48 @@ Examples:
             action=RefuseAction(reason="Too many steps", rationale="Could not resolve query in time."),
             timestamp=time.time()
         )
+
+    @staticmethod
+    async def _within_budget(call: Coroutine[Any, Any, Any], deadline: float) -> Any:
+        """Awaits a tool call, cut short (LLMBudgetExceeded) when the run's deadline passes."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            call.close() # Never started
+            raise LLMBudgetExceeded("Latency budget exhausted before the tool call")
+        try:
+            return await asyncio.wait_for(call, timeout=remaining)
+        except asyncio.TimeoutError:
+            if time.monotonic() < deadline:
+                raise # The tool's own timeout, not the budget
+            raise LLMBudgetExceeded("Latency budget exhausted during the tool call")
+
+    @staticmethod
+    def _history_messages(history: List[AgentStep]) -> List[Dict[str, str]]:
+        """Previous decisions of this run. Retrieved chunks live in the context section instead."""
+        messages = []
+        for step in history:
+            if step.action:
+                content = f"Action: {step.action.action_type}\nRationale: {step.action.rationale}"
+                if isinstance(step.action, RetrieveAction):
+                    content += f"\nQuery: {step.action.query}"
+                elif isinstance(step.action, MultiRetrieveAction):
+                    content += f"\nQueries: {step.action.queries}"
+                messages.append({"role": "assistant", "content": content})
+            if step.observation:
+                messages.append({"role": "user", "content": f"Tool Output: {step.observation}"})
+        return messages
+
+    @staticmethod
+    def _observe(context: ContextManager, results: list) -> str:
+        new = context.add(results)
+        if not results:
+            return "No relevant documents found."
+        return f"{len(results)} chunks retrieved ({new} new), added to Current Context."
+
+    def _budget_exhausted_step(self) -> AgentStep:
+        return AgentStep(
+            state=AgentState.REFUSING,
+            thought="Latency budget exhausted.",
+            action=RefuseAction(reason="Took too long to answer", rationale=f"Run exceeded its {self.budget_s:.0f}s budget."),
+            timestamp=time.time()
+        )
@@ -0,0 +1,105 @@
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from pydantic import BaseModel
+from src.app.core.config import settings
+from src.domain.chat.models import AgentStep
+from src.infrastructure.db.registry import corpus_generation
+
+class CachedAnswer(BaseModel):
+    query: str
+    answer: str
+    steps: List[AgentStep]
+    similarity: float = 1.0
+
+class SemanticAnswerCache:
+    """
+    Final agent answers keyed by query embedding.
+    Paraphrases ("Can I wear a hat?" / "Are hats allowed?") land close together,
+    so a lookup is one matrix-vector product against every cached query; the
+    nearest one is a hit if it clears `threshold`. The whole cache is dropped
+    when the corpus generation moves, and the least recently used slot is
+    overwritten once `max_entries` is reached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.ANSWER_CACHE_MAX_ENTRIES,
+        threshold: float = settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._reset(corpus_generation.value)
+
+    def _reset(self, generation: int):
+        self._generation = generation
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, dim), rows L2-normalized
+        self._entries: List[Optional[CachedAnswer]] = [None] * self.max_entries
+        self._last_used = np.zeros(self.max_entries, dtype=np.int64)
+        self._size = 0
+        self._tick = 0
+
+    @staticmethod
+    def _normalize(vector: Any) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _check_generation(self):
+        if self._generation != corpus_generation.value:
+            self._reset(corpus_generation.value)
+
+    def lookup(self, query_vector: Any) -> Optional[CachedAnswer]:
+        with self._lock:
+            self._check_generation()
+            if self._size == 0:
+                self.misses += 1
+                return None
+
+            similarities = self._vectors[:self._size] @ self._normalize(query_vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._tick += 1
+            self._last_used[best] = self._tick
+            self.hits += 1
+            return self._entries[best].model_copy(update={"similarity": float(similarities[best])})
+
+    def store(self, query_vector: Any, query: str, answer: str, steps: List[AgentStep], generation: int):
+        """`generation` is the one read before the agent ran; answers built on an older corpus are dropped."""
+        vector = self._normalize(query_vector)
+        with self._lock:
+            self._check_generation()
+            if generation != self._generation:
+                return
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(np.argmin(self._last_used))
+
+            self._tick += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = CachedAnswer(query=query, answer=answer, steps=steps)
+            self._last_used[slot] = self._tick
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "threshold": self.threshold
+        }
+
+# Shared by every /chat request in the process
+answer_cache = SemanticAnswerCache()
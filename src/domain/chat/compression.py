@@ -0,0 +1,113 @@
+import asyncio
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+from src.app.core.config import settings
+from src.infrastructure.llm.embeddings import EmbeddingService
+from src.services.retrieval import RetrievalResult
+
+# Sentence ends, or blank lines between paragraphs/list items
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\"'])|\n\s*\n")
+
+class ContextCompressor:
+    """
+    Extractive compression of retrieved chunks before they reach the LLM.
+    Each chunk is split into sentences; every sentence of every chunk is scored
+    against the query in one matrix-vector product, and each chunk keeps only
+    its best sentences (in original order) within `max_chars`. Metadata is
+    untouched, so source/version annotations and outdated warnings still apply.
+    Sentence embeddings are cached per chunk_id (chunk ids are content-derived).
+    """
+
+    def __init__(
+        self,
+        embedding_service: Optional[EmbeddingService] = None,
+        max_sentences: int = settings.COMPRESSION_MAX_SENTENCES,
+        max_chars: int = settings.COMPRESSION_MAX_CHARS,
+        cache_size: int = settings.COMPRESSION_CACHE_CHUNKS
+    ):
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.max_sentences = max_sentences
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()  # chunk_id -> (sentences, unit vectors)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def split(text: str) -> List[str]:
+        return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+    @staticmethod
+    def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms > 0, norms, 1.0)
+
+    async def _sentence_vectors(self, results: List[RetrievalResult]) -> List[tuple]:
+        with self._lock:
+            cached = {r.chunk_id: self._cache.get(r.chunk_id) for r in results}
+            for chunk_id, entry in cached.items():
+                if entry is not None:
+                    self._cache.move_to_end(chunk_id)
+
+        missing = [r for r in results if cached[r.chunk_id] is None]
+        if missing:
+            sentence_lists = [self.split(r.content) for r in missing]
+            flat = [s for sentences in sentence_lists for s in sentences]
+            # One model call for all uncached chunks
+            vectors = self._unit_rows(await self.embedding_service.aembed_documents(flat)) if flat else None
+            offset = 0
+            with self._lock:
+                for res, sentences in zip(missing, sentence_lists):
+                    entry = (sentences, vectors[offset:offset + len(sentences)] if vectors is not None else None)
+                    offset += len(sentences)
+                    cached[res.chunk_id] = entry
+                    self._cache[res.chunk_id] = entry
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [cached[r.chunk_id] for r in results]
+
+    async def compress(self, query: str, results: List[RetrievalResult]) -> List[RetrievalResult]:
+        # Short chunks are already as small as they get
+        long_results = [r for r in results if len(r.content) > self.max_chars]
+        if not long_results:
+            return results
+
+        # Query embedding (micro-batched) overlaps the sentence embeddings of uncached chunks
+        entries, query_vector = await asyncio.gather(
+            self._sentence_vectors(long_results),
+            self.embedding_service.aembed_query(query)
+        )
+        query_vector = self._unit_rows(np.asarray(query_vector, dtype=np.float32))
+
+        # All sentences of all chunks, scored at once
+        matrices = [vectors for _, vectors in entries if vectors is not None and len(vectors)]
+        scores = np.concatenate(matrices) @ query_vector if matrices else np.empty(0)
+
+        compressed = {}
+        offset = 0
+        for res, (sentences, vectors) in zip(long_results, entries):
+            if vectors is None or not len(vectors):
+                continue
+            chunk_scores = scores[offset:offset + len(sentences)]
+            offset += len(sentences)
+
+            keep: List[int] = []
+            used = 0
+            for i in np.argsort(-chunk_scores):
+                if len(keep) >= self.max_sentences:
+                    break
+                length = len(sentences[i]) + 1
+                if keep and used + length > self.max_chars:
+                    continue
+                keep.append(int(i))
+                used += length
+            content = " ".join(sentences[i] for i in sorted(keep))
+            compressed[res.chunk_id] = res.model_copy(update={
+                "content": content,
+                "metadata": {**res.metadata, "compressed_from_chars": len(res.content)}
+            })
+
+        return [compressed.get(r.chunk_id, r) for r in results]
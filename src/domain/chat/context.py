@@ -0,0 +1,88 @@
+from typing import Dict, List, Tuple
+from litellm import token_counter
+from src.app.core.config import settings
+from src.services.retrieval import RetrievalResult
+
+class ContextManager:
+    """
+    Retrieved context for one agent run, kept as chunks rather than text.
+    Chunks seen by several retrievals are stored once (best score wins), and
+    each prompt gets as many of them as fit the token budget, highest score
+    first: when the prompt is too large, the lowest-scoring chunks are dropped.
+    Tokens are counted with the target model's tokenizer via litellm.
+    """
+
+    def __init__(self, model: str = settings.LLM_MODEL, max_prompt_tokens: int = settings.AGENT_MAX_PROMPT_TOKENS):
+        self.model = model
+        self.max_prompt_tokens = max_prompt_tokens
+        self.chunks: Dict[str, RetrievalResult] = {}
+        self.retrievals = 0
+        self.dropped = 0  # Chunks left out of the last prompt
+        self._token_counts: Dict[str, int] = {} # Block/header text -> tokens
+
+    def add(self, results: List[RetrievalResult]) -> int:
+        """Adds retrieval results; returns how many chunks were new."""
+        self.retrievals += 1
+        new = 0
+        for res in results:
+            best = self.chunks.get(res.chunk_id)
+            if best is None:
+                new += 1
+            if best is None or res.score > best.score:
+                self.chunks[res.chunk_id] = res
+        return new
+
+    def count_tokens(self, text: str) -> int:
+        return token_counter(model=self.model, text=text)
+
+    @staticmethod
+    def format_chunk(res: RetrievalResult) -> str:
+        version = res.metadata.get("version_number", "?")
+        block = ""
+        if not res.metadata.get("is_latest", True):
+            block += f"** WARNING: OUTDATED VERSION (v{version}) **\n"
+        block += f"Content: {res.content}\n"
+        block += f"Source: {res.metadata.get('filename', 'Unknown')} (v{version})\n\n"
+        return block
+
+    def _cached_tokens(self, text: str) -> int:
+        # Chunks are re-sent every turn: count each text once. Keyed on the text
+        # itself, since the result kept for a chunk id can be replaced.
+        if text not in self._token_counts:
+            self._token_counts[text] = self.count_tokens(text)
+        return self._token_counts[text]
+
+    def build_messages(
+        self,
+        system_prompt: str,
+        history: List[Dict[str, str]],
+        user_query: str
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Assembles the prompt and returns (messages, prompt_tokens).
+        The system prompt, history and query are always sent; context fills
+        whatever budget is left.
+        """
+        messages = [{"role": "system", "content": system_prompt}, *history]
+        header = f"User Query: {user_query}\nCurrent Context:"
+        used = token_counter(model=self.model, messages=messages + [{"role": "user", "content": header}])
+
+        selected: List[str] = []
+        ranked = sorted(self.chunks.values(), key=lambda r: r.score, reverse=True)
+        self.dropped = 0
+        for res in ranked:
+            block = self.format_chunk(res)
+            document_header = f"--- Document {len(selected) + 1} ---\n"
+            tokens = self._cached_tokens(document_header) + self._cached_tokens(block)
+            if used + tokens > self.max_prompt_tokens:
+                self.dropped += 1
+                continue
+            selected.append(document_header + block)
+            used += tokens
+
+        if selected:
+            context = "".join(selected)
+        else:
+            context = "No relevant documents found." if self.retrievals else ""
+        messages.append({"role": "user", "content": f"{header}\n{context}"})
+        return messages, used
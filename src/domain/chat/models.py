@@ -18,6 +18,11 @@ class RetrieveAction(BaseModel):
     query: str
     rationale: str
 
+class MultiRetrieveAction(BaseModel):
+    action_type: Literal["multi_retrieve"] = "multi_retrieve"
+    queries: List[str]
+    rationale: str
+
 class SummarizeAction(BaseModel):
     action_type: Literal["summarize"] = "summarize"
     doc_ids: Optional[List[str]] = None
@@ -41,7 +46,7 @@ class AnswerAction(BaseModel):
     rationale: str
 
 # Union for polymorphic parsing
-AgentAction = Union[RetrieveAction, SummarizeAction, ClarifyAction, RefuseAction, AnswerAction]
+AgentAction = Union[RetrieveAction, MultiRetrieveAction, SummarizeAction, ClarifyAction, RefuseAction, AnswerAction]
 
 # --- History ---
 class AgentStep(BaseModel):
@@ -50,4 +55,5 @@ class AgentStep(BaseModel):
     thought: str
     action: Optional[AgentAction] = None
     observation: Optional[str] = None # Output of tool
+    prompt_tokens: Optional[int] = None # Size of the prompt behind this decision
     timestamp: float = 0.0
@@ -0,0 +1,51 @@
+from typing import Any, Dict, Literal, Optional
+from src.app.core.config import settings
+from src.domain.chat.models import AgentAction, RefuseAction, RetrieveAction
+
+PlannerPolicy = Literal["llm", "fast_path"]
+
+class PlannerStats:
+    def __init__(self):
+        self.runs = 0
+        self.llm_calls = 0
+        self.llm_calls_saved = 0
+        self.local_refusals = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "llm_calls": self.llm_calls,
+            "llm_calls_saved": self.llm_calls_saved,
+            "local_refusals": self.local_refusals
+        }
+
+planner_stats = PlannerStats()
+
+class FastPathPlanner:
+    """
+    Decides the first agent step without the LLM.
+    The system prompt makes the model retrieve first anyway, so the opening
+    decision is synthesized locally: retrieve the user query as-is, or refuse
+    queries that are empty or too long to be a real question.
+    """
+
+    def __init__(self, max_query_chars: int = settings.AGENT_MAX_QUERY_CHARS):
+        self.max_query_chars = max_query_chars
+
+    def initial_action(self, user_query: str) -> AgentAction:
+        query = user_query.strip()
+        if not query:
+            return RefuseAction(reason="Empty query", rationale="There is nothing to search for.")
+        if len(query) > self.max_query_chars:
+            return RefuseAction(
+                reason="Query too long",
+                rationale=f"Queries are limited to {self.max_query_chars} characters."
+            )
+        return RetrieveAction(query=query, rationale="Fast path: the first step always retrieves the user query.")
+
+def build_planner(policy: str = settings.AGENT_PLANNER_POLICY) -> Optional[FastPathPlanner]:
+    if policy == "fast_path":
+        return FastPathPlanner()
+    if policy == "llm":
+        return None
+    raise ValueError(f"Unknown planner policy: {policy}")
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Any, Dict, List, Optional
+import numpy as np
+from src.app.core.config import settings
+from src.infrastructure.llm.embeddings import EmbeddingService
+
+class SpeculationStats:
+    def __init__(self):
+        self.launched = 0
+        self.hits = 0    # Planner retrieved a matching query: one serial hop saved
+        self.misses = 0  # Planner retrieved something else: speculation cancelled
+        self.unused = 0  # Planner did not retrieve first (answered, clarified, failed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "launched": self.launched,
+            "hits": self.hits,
+            "misses": self.misses,
+            "unused": self.unused,
+            "hit_rate": self.hits / self.launched if self.launched else 0.0
+        }
+
+speculation_stats = SpeculationStats()
+
+def _normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+class SpeculativeRetrieval:
+    """
+    Retrieval for the raw user query, started while the LLM is still planning
+    the first step. If the planner then asks for the same query (or one whose
+    embedding is within `threshold` cosine similarity) the in-flight result is
+    reused; otherwise it is cancelled.
+    The user query is embedded once: the retrieval searches with that vector
+    and the similarity check compares against it.
+    """
+
+    def __init__(self, tools: Any, user_query: str, threshold: float = settings.AGENT_SPECULATION_SIMILARITY):
+        self.user_query = user_query
+        self.threshold = threshold
+        self.embedding_service = EmbeddingService()
+        self.query_vector: asyncio.Task = asyncio.create_task(self.embedding_service.aembed_query(user_query))
+        self.task: Optional[asyncio.Task] = asyncio.create_task(self._retrieve(tools))
+        speculation_stats.launched += 1
+
+    async def _retrieve(self, tools: Any) -> List[Any]:
+        return await tools.retrieve(self.user_query, query_vector=await self.query_vector)
+
+    async def _matches(self, query: str) -> bool:
+        if _normalize(query) == _normalize(self.user_query):
+            return True
+        # Shielded: a cancelled claim must not take the speculative retrieval's vector with it
+        a, b = await asyncio.gather(
+            asyncio.shield(self.query_vector),
+            self.embedding_service.aembed_query(query)
+        )
+        a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+        denom = float(np.linalg.norm(a) * np.linalg.norm(b))
+        return denom > 0 and float(a @ b) / denom >= self.threshold
+
+    async def claim(self, query: str) -> Optional[List[Any]]:
+        """The speculative results if they can stand in for retrieving `query`, else None."""
+        if self.task is None:
+            return None
+        # Still held while comparing: if the claim is cancelled here, discard() drops it
+        task = self.task
+        try:
+            matches = await self._matches(query)
+        except Exception:
+            # Embedding failed: the real retrieval will run (and surface the error) instead
+            matches = False
+        self.task = None
+        if matches:
+            try:
+                results = await task
+            except Exception:
+                # The real retrieval will run (and surface the error) instead
+                speculation_stats.misses += 1
+                return None
+            speculation_stats.hits += 1
+            return results
+        self._drop(task)
+        speculation_stats.misses += 1
+        return None
+
+    def discard(self):
+        if self.task is not None:
+            self._drop(self.task)
+            self.task = None
+            speculation_stats.unused += 1
+        self._drop(self.query_vector)
+
+    @staticmethod
+    def _drop(task: asyncio.Task):
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # Marks a failure as retrieved, so it is not logged as "never retrieved"
+            task.exception()
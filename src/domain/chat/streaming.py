@@ -0,0 +1,59 @@
+import json
+import re
+from typing import List
+
+# The key of the answer field, not the same text inside another string value
+ANSWER_FIELD = re.compile(r'(?<!\\)"answer"\s*:\s*"')
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class AnswerFieldStreamer:
+    """
+    Incrementally extracts the "answer" string from a JSON decision that is
+    still being generated, so its text can be forwarded token by token.
+    feed() takes raw content deltas and returns the newly decoded answer text
+    (empty until the field starts, and after its closing quote).
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = -1  # Position in buffer of the next undecoded answer char
+        self.done = False
+
+    def feed(self, delta: str) -> str:
+        self.buffer += delta
+        if self.done:
+            return ""
+        if self._pos < 0:
+            match = ANSWER_FIELD.search(self.buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out: List[str] = []
+        buf = self.buffer
+        while self._pos < len(buf):
+            char = buf[self._pos]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                out.append(char)
+                self._pos += 1
+                continue
+            # Escape sequence: wait for the rest of it to arrive
+            if self._pos + 1 >= len(buf):
+                break
+            code = buf[self._pos + 1]
+            if code == "u":
+                if self._pos + 6 > len(buf):
+                    break
+                try:
+                    out.append(json.loads(f'"{buf[self._pos:self._pos + 6]}"'))
+                except ValueError:
+                    pass
+                self._pos += 6
+            else:
+                out.append(_ESCAPES.get(code, code))
+                self._pos += 2
+        return "".join(out)
@@ -1,34 +1,73 @@
+import asyncio
 from typing import List, Dict, Any, Optional
 from src.services.retrieval import Retriever, RetrievalResult
 from src.domain.chat.models import AgentAction
+from src.domain.documents.models import SearchFilters
+from src.app.core.config import settings
+from src.domain.chat.context import ContextManager
+from src.domain.chat.compression import ContextCompressor
 
 class AgentTools:
-    def __init__(self, retriever: Optional[Retriever] = None):
+    def __init__(
+        self,
+        retriever: Optional[Retriever] = None,
+        filters: Optional[SearchFilters] = None,
+        compressor: Optional[ContextCompressor] = None
+    ):
         self.retriever = retriever or Retriever()
+        # Current versions only by default: outdated chunks no longer compete for top_k
+        self.filters = filters or SearchFilters(latest_only=True)
+        if compressor is None and settings.AGENT_CONTEXT_COMPRESSION:
+            compressor = ContextCompressor(self.retriever.embedding_service)
+        self.compressor = compressor
+
+    async def retrieve(self, query: str, query_vector: Optional[List[float]] = None) -> List[RetrievalResult]:
+        results = await self.retriever.retrieve(query, top_k=5, filters=self.filters, query_vector=query_vector)
+        return await self._compress(query, results)
+
+    async def retrieve_many(self, queries: List[str]) -> List[RetrievalResult]:
+        """
+        Retrieves for several sub-queries in one batched search.
+        Chunks found by more than one sub-query appear once, with their best score.
+        """
+        result_lists = await self.retriever.retrieve_many(queries, top_k=5, filters=self.filters)
+        if self.compressor:
+            # Each chunk is compressed against the sub-query that found it
+            result_lists = await asyncio.gather(
+                *(self._compress(q, results) for q, results in zip(queries, result_lists))
+            )
+
+        merged: Dict[str, RetrievalResult] = {}
+        for results in result_lists:
+            for res in results:
+                best = merged.get(res.chunk_id)
+                if best is None or res.score > best.score:
+                    merged[res.chunk_id] = res
+
+        return sorted(merged.values(), key=lambda r: r.score, reverse=True)
 
     async def retrieve_context(self, query: str) -> str:
         """
         Retrieves relevant context for a query. 
         Returns formatted string for LLM consumption.
         """
-        results = await self.retriever.retrieve(query, top_k=5)
+        return self.format_results(await self.retrieve(query))
+
+    async def retrieve_many_context(self, queries: List[str]) -> str:
+        return self.format_results(await self.retrieve_many(queries))
+
+    async def _compress(self, query: str, results: List[RetrievalResult]) -> List[RetrievalResult]:
+        if self.compressor is None or not results:
+            return results
+        return await self.compressor.compress(query, results)
+
+    @staticmethod
+    def format_results(results: List[RetrievalResult]) -> str:
         if not results:
             return "No relevant documents found."
-            
-        # Format for LLM
-        context = ""
-        for i, res in enumerate(results):
-            is_latest = res.metadata.get("is_latest", True)
-            version = res.metadata.get("version_number", "?")
-            
-            context += f"--- Document {i+1} ---\n"
-            if not is_latest:
-                context += f"** WARNING: OUTDATED VERSION (v{version}) **\n"
-            
-            context += f"Content: {res.content}\n"
-            context += f"Source: {res.metadata.get('filename', 'Unknown')} (v{version})\n\n"
-            
-        return context
+        return "".join(
+            f"--- Document {i+1} ---\n{ContextManager.format_chunk(res)}" for i, res in enumerate(results)
+        )
 
     async def summarize_docs(self, doc_ids: List[str]) -> str:
         # Placeholder: This would actually fetch full doc content and summarize using LLM
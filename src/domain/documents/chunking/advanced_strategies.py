@@ -4,6 +4,8 @@ from uuid import UUID
 from src.domain.documents.chunking.base import BaseChunker, ChunkerConfig
 from src.domain.documents.models import ChunkMetadata
 
+from src.infrastructure.llm.model_registry import model_registry
+
 # Try to import sentence types
 try:
     from sentence_transformers import SentenceTransformer, util
@@ -14,8 +16,8 @@ class SemanticChunker(BaseChunker):
     def __init__(self, config: ChunkerConfig):
         if not SentenceTransformer:
             raise ImportError("sentence-transformers is required for SemanticChunking")
-        # Load model (this is heavy, in prod we might dependency inject or lazy load)
-        self.model = SentenceTransformer(config.embedding_model)
+        # Shared, lazily-loaded model from the process-wide registry
+        self.model_name = config.embedding_model
         self.threshold = config.breakpoint_threshold_amount / 100.0 # e.g. 0.95
 
     def chunk(self, text: str, doc_id: UUID) -> List[ChunkMetadata]:
@@ -25,7 +27,8 @@ class SemanticChunker(BaseChunker):
             return []
             
         # 2. Embed sentences
-        embeddings = self.model.encode(sentences, convert_to_tensor=True)
+        model = model_registry.get(self.model_name)
+        embeddings = model.encode(sentences, convert_to_tensor=True)
         
         # 3. Calculate cosine distances
         chunks = []
@@ -21,3 +21,9 @@ class ChunkMetadata(BaseModel):
     section_title: Optional[str] = None
     start_char_idx: int
     end_char_idx: int
+
+class SearchFilters(BaseModel):
+    """Structured, server-side filters for vector search."""
+    latest_only: bool = False
+    version_number: Optional[int] = None
+    filename: Optional[str] = None
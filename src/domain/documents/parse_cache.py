@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from src.app.core.config import settings
+
+class ParseCache:
+    """
+    Content-addressed cache of converted documents.
+    Each entry is the markdown plus its page count, stored as one gzipped JSON
+    file named after sha256(content hash + converter fingerprint), so the same
+    bytes parsed with the same options are converted only once, whatever the
+    filename or chunking strategy. Total size on disk is bounded; the least
+    recently used files (by mtime, refreshed on hits) are evicted first.
+    """
+
+    def __init__(self, directory: str = settings.PARSE_CACHE_DIR, max_bytes: int = settings.PARSE_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sizes: Optional[Dict[Path, int]] = None # Scanned lazily on first use
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(content_hash: str, fingerprint: str) -> str:
+        return hashlib.sha256(f"{content_hash}:{fingerprint}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json.gz"
+
+    def _entries(self) -> Dict[Path, int]:
+        if self._sizes is None:
+            self._sizes = {}
+            if self.directory.exists():
+                for path in self.directory.glob("*.json.gz"):
+                    self._sizes[path] = path.stat().st_size
+        return self._sizes
+
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """Returns (markdown, page_count) or None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path) # Refresh recency for LRU eviction
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            # Truncated or corrupt entry: drop it and parse again
+            print(f"⚠️ Discarding unreadable parse cache entry {path.name}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["content"], entry["page_count"]
+
+    def put(self, key: str, content: str, page_count: int):
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Write-then-rename, so a reader never sees a half-written file
+        tmp = path.with_suffix(f".tmp{os.getpid()}.{threading.get_ident()}")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"content": content, "page_count": page_count}, f)
+        os.replace(tmp, path)
+        with self._lock:
+            self._entries()[path] = path.stat().st_size
+            self._evict()
+
+    def _remove(self, path: Path):
+        with self._lock:
+            self._entries().pop(path, None)
+        path.unlink(missing_ok=True)
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(entries.values())
+        if total <= self.max_bytes:
+            return
+        by_age = []
+        for path in entries:
+            try:
+                by_age.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                by_age.append((0.0, path))
+        for _, path in sorted(by_age):
+            if total <= self.max_bytes:
+                break
+            total -= entries.pop(path)
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._entries()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(entries),
+                "bytes": sum(entries.values())
+            }
+
+# Shared by every DocumentParser in the process
+parse_cache = ParseCache()
@@ -1,6 +1,6 @@
 import hashlib
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 
 try:
     from docling.document_converter import DocumentConverter, PdfFormatOption
@@ -16,6 +16,9 @@ except ImportError:
 
 from src.domain.documents.models import DocumentMetadata
 from src.domain.documents.exceptions import UnsupportedFileTypeError, ParsingError
+from src.domain.documents.parse_cache import ParseCache, parse_cache
+from src.domain.documents.parsing_pool import ParsingPool, converter_fingerprint, parsing_pool
+from src.infrastructure.executors import executors
 
 class DocumentParser:
     """
@@ -24,20 +27,14 @@ class DocumentParser:
     
     SUPPORTED_EXTENSIONS = {'.pdf', '.docx', '.txt'}
 
-    def __init__(self):
-        if DocumentConverter:
-            # Configure to disable OCR to prevent memory leaks/crashes on small devices
-            pipeline_options = PdfPipelineOptions()
-            pipeline_options.do_ocr = False
-            pipeline_options.do_table_structure = True # Keep table structure if possible
-            
-            self.converter = DocumentConverter(
-                format_options={
-                    InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-                }
-            )
-        else:
-            self.converter = None
+    def __init__(self, pool: Optional[ParsingPool] = None, cache: Optional[ParseCache] = None):
+        # Conversion happens in the parsing process pool, whose workers own the
+        # converters; here we only record whether docling is available at all.
+        self.pool = pool or parsing_pool
+        self.converter = self.pool.convert if DocumentConverter else None
+        # Converted markdown is reused across strategies, filenames and versions
+        self.cache = cache if cache is not None else parse_cache
+        self.fingerprint = converter_fingerprint()
 
     def _validate_file(self, file_path: Path) -> None:
         if file_path.suffix.lower() not in self.SUPPORTED_EXTENSIONS:
@@ -48,46 +45,65 @@ class DocumentParser:
     def _calculate_hash(self, file_path: Path) -> str:
         sha256_hash = hashlib.sha256()
         with open(file_path, "rb") as f:
-            # Read and update hash string value in blocks of 4K
-            for byte_block in iter(lambda: f.read(4096), b""):
+            # Read and update hash string value in blocks of 1 MiB
+            for byte_block in iter(lambda: f.read(1024 * 1024), b""):
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
 
-    async def parse(self, file_path: Path) -> Tuple[str, DocumentMetadata]:
+    async def parse(
+        self,
+        file_path: Path,
+        content_hash: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Tuple[str, DocumentMetadata]:
         """
         Parses a file and returns its content (Markdown) and metadata.
+        Callers that already hashed the file pass `content_hash` so it is not read twice.
         """
         self._validate_file(file_path)
         
         # 1. Compute Hash
-        content_hash = self._calculate_hash(file_path)
+        if content_hash is None:
+            content_hash = await executors.run_io(self._calculate_hash, file_path)
         
         # 2. Parse Content
         try:
             if file_path.suffix.lower() == '.txt':
                 # Fast path for TXT
-                content = file_path.read_text(encoding='utf-8')
+                content = await executors.run_io(file_path.read_text, encoding='utf-8')
                 page_count = 1
             else:
                 if not self.converter:
                      raise ParsingError("Docling is not installed or failed to initialize.")
                 
-                # Docling conversion
-                # Note: conversion is CPU bound, in a real async app we might run this in a threadpool
-                result = self.converter.convert(file_path)
-                content = result.document.export_to_markdown()
-                # Estimation of pages, Docling might provide this in metadata
-                page_count = 0 # TODO: extract from docling result if available
+                content, page_count = await self._convert(file_path, content_hash)
                 
+        except ParsingError:
+            raise
         except Exception as e:
             raise ParsingError(f"Failed to parse document: {str(e)}") from e
 
         # 3. Construct Metadata
         metadata = DocumentMetadata(
-            filename=file_path.name,
+            filename=filename or file_path.name,
             file_type=file_path.suffix.lstrip('.').lower(), # type: ignore
             page_count=page_count,
             content_hash=content_hash
         )
 
         return content, metadata
+
+    async def _convert(self, file_path: Path, content_hash: str) -> Tuple[str, int]:
+        key = ParseCache.make_key(content_hash, self.fingerprint)
+        cached = await executors.run_io(self.cache.get, key)
+        if cached is not None:
+            return cached
+
+        # Docling conversion is CPU bound: run it in a parsing worker process
+        content, page_count = await self.pool.convert(str(file_path))
+        try:
+            await executors.run_io(self.cache.put, key, content, page_count)
+        except OSError as e:
+            # A full or read-only cache directory must not fail the ingestion
+            print(f"⚠️ Could not cache parsed {file_path.name}: {e}")
+        return content, page_count
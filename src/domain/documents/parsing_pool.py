@@ -0,0 +1,192 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+from src.app.core.config import settings
+from src.domain.documents.exceptions import ParsingError
+
+# How often in-flight documents are checked against the memory limit
+WATCHDOG_INTERVAL_S = 0.5
+
+def _process_rss_bytes(pid: int) -> int:
+    """Resident set size of a process (Linux); 0 when unknown."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+# Converter settings; part of the parse cache key, so changing them re-parses documents
+CONVERTER_OPTIONS = {"do_ocr": False, "do_table_structure": True}
+
+def converter_fingerprint() -> str:
+    """Identifies what conversion output depends on: converter options and docling version."""
+    try:
+        from importlib.metadata import version
+        docling_version = version("docling")
+    except Exception:
+        docling_version = "none"
+    options = ",".join(f"{k}={v}" for k, v in sorted(CONVERTER_OPTIONS.items()))
+    return f"docling={docling_version};{options}"
+
+# --- Worker side (runs inside the pool's processes) ---
+
+# Per-process converter, built once by the initializer and reused for every document
+_worker_converter = None
+
+def _build_converter():
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions
+
+    # Configure to disable OCR to prevent memory leaks/crashes on small devices
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = CONVERTER_OPTIONS["do_ocr"]
+    pipeline_options.do_table_structure = CONVERTER_OPTIONS["do_table_structure"] # Keep table structure if possible
+
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+        }
+    )
+
+def _init_worker(warm_converter: bool):
+    global _worker_converter
+    if warm_converter:
+        try:
+            _worker_converter = _build_converter()
+        except Exception as e:
+            # Built lazily (and the error surfaced) on the first document instead
+            print(f"⚠️ Parser worker {os.getpid()} could not build converter: {e}")
+
+def convert_with_docling(file_path: str) -> Tuple[str, int]:
+    """Returns (markdown, page_count)."""
+    global _worker_converter
+    if _worker_converter is None:
+        _worker_converter = _build_converter()
+
+    result = _worker_converter.convert(file_path)
+    content = result.document.export_to_markdown()
+    num_pages = getattr(result.document, "num_pages", None)
+    page_count = num_pages() if callable(num_pages) else len(getattr(result.document, "pages", None) or {})
+    return content, page_count
+
+# --- Parent side ---
+
+class ParsingPool:
+    """
+    Dedicated process pool for document conversion.
+    - Each worker process builds (warms) its own converter once at start-up.
+    - Workers are recycled after `max_docs_per_worker` documents, which bounds
+      the damage of converter memory leaks.
+    - While documents are in flight, worker RSS is polled; a worker above
+      `memory_limit_mb` is killed.
+    - Each document has a wall-clock limit; when it is exceeded the pool is torn
+      down (its processes killed) and rebuilt on next use.
+    Documents that die with the pool because of another document are retried once.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.PARSER_WORKERS,
+        timeout_s: float = settings.PARSER_TIMEOUT_S,
+        max_docs_per_worker: int = settings.PARSER_MAX_DOCS_PER_WORKER,
+        memory_limit_mb: int = settings.PARSER_MEMORY_LIMIT_MB,
+        warm_converter: bool = True
+    ):
+        self.workers = workers
+        self.timeout_s = timeout_s
+        self.max_docs_per_worker = max_docs_per_worker
+        self.memory_limit_mb = memory_limit_mb
+        self.warm_converter = warm_converter
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stats: Dict[str, int] = {"documents": 0, "failures": 0, "timeouts": 0, "memory_kills": 0, "restarts": 0}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 'spawn' because forking a process that already runs torch/grpc threads is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.warm_converter,),
+                max_tasks_per_child=self.max_docs_per_worker or None
+            )
+        return self._executor
+
+    @staticmethod
+    def _processes(executor: ProcessPoolExecutor) -> list:
+        return list((getattr(executor, "_processes", None) or {}).values())
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """Kills the pool's processes (a stuck conversion never returns on its own)."""
+        if self._executor is not executor:
+            return  # Already replaced by a concurrent failure
+        self._executor = None
+        self._stats["restarts"] += 1
+        for process in self._processes(executor):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _enforce_memory_limit(self, executor: ProcessPoolExecutor):
+        limit = self.memory_limit_mb * 1024 * 1024
+        if limit <= 0:
+            return
+        for process in self._processes(executor):
+            if process.is_alive() and _process_rss_bytes(process.pid) > limit:
+                print(f"⚠️ Parser worker {process.pid} exceeded {self.memory_limit_mb} MB RSS, killing it")
+                self._stats["memory_kills"] += 1
+                # The pool breaks; in-flight documents see BrokenProcessPool
+                process.kill()
+
+    async def _wait(self, executor: ProcessPoolExecutor, future: asyncio.Future, timeout_s: float) -> Any:
+        deadline = asyncio.get_running_loop().time() + timeout_s
+        while True:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            done, _ = await asyncio.wait({future}, timeout=min(WATCHDOG_INTERVAL_S, remaining))
+            if done:
+                return future.result()
+            self._enforce_memory_limit(executor)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout_s: Optional[float] = None) -> Any:
+        """Runs a picklable `fn(*args)` in the pool under the wall-clock limit."""
+        timeout_s = self.timeout_s if timeout_s is None else timeout_s
+        for attempt in range(2):
+            executor = self._pool()
+            future = asyncio.wrap_future(executor.submit(fn, *args))
+            try:
+                result = await self._wait(executor, future, timeout_s)
+                self._stats["documents"] += 1
+                return result
+            except asyncio.TimeoutError:
+                future.cancel()
+                self._stats["timeouts"] += 1
+                self._discard(executor)
+                raise ParsingError(f"Parsing exceeded {timeout_s:.0f}s and was aborted")
+            except BrokenProcessPool as e:
+                # A worker died (memory watchdog, OOM killer, or killed with another document): rebuild and retry once
+                self._discard(executor)
+                if attempt == 1:
+                    self._stats["failures"] += 1
+                    raise ParsingError(f"Parser worker died: {e}") from e
+            except MemoryError as e:
+                self._stats["failures"] += 1
+                raise ParsingError("Parser worker ran out of memory") from e
+
+    async def convert(self, file_path: str) -> Tuple[str, int]:
+        """Converts a document with docling; returns (markdown, page_count)."""
+        return await self.run(convert_with_docling, file_path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "workers": self.workers, "running": self._executor is not None}
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+parsing_pool = ParsingPool()
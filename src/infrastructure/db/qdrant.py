@@ -1,64 +1,287 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
 from uuid import UUID
-from qdrant_client import QdrantClient,models
+import numpy as np
+from qdrant_client import AsyncQdrantClient, models
 from src.app.core.config import settings
+from src.domain.documents.models import SearchFilters
+
+# One pooled client per (host, ports, transport) per process. Every handler that
+# talks to the same server reuses it, so connections are kept alive across requests.
+_shared_clients: Dict[Tuple[Any, ...], AsyncQdrantClient] = {}
+
+def get_shared_client(
+    host: str = settings.QDRANT_HOST,
+    port: int = settings.QDRANT_PORT,
+    grpc_port: int = settings.QDRANT_GRPC_PORT,
+    prefer_grpc: bool = settings.QDRANT_PREFER_GRPC,
+    api_key: Optional[str] = settings.QDRANT_API_KEY
+) -> AsyncQdrantClient:
+    key = (host, port, grpc_port, prefer_grpc, api_key)
+    client = _shared_clients.get(key)
+    if client is None:
+        client = AsyncQdrantClient(
+            host=host,
+            port=port,
+            grpc_port=grpc_port,
+            prefer_grpc=prefer_grpc,
+            api_key=api_key
+        )
+        _shared_clients[key] = client
+    return client
+
+def is_shared_client(client: AsyncQdrantClient) -> bool:
+    return any(client is shared for shared in _shared_clients.values())
+
+async def close_shared_clients():
+    for client in _shared_clients.values():
+        await client.close()
+    _shared_clients.clear()
 
 class QdrantHandler:
-    def __init__(self, use_memory: bool = False):
-        if use_memory:
-            self.client = QdrantClient(location=":memory:")
+    # Payload fields used for filtering. Indexed so that filtered HNSW search and
+    # filter-based updates do not degrade into full collection scans.
+    PAYLOAD_INDEXES = {
+        "logical_doc_id": models.PayloadSchemaType.KEYWORD,
+        "filename": models.PayloadSchemaType.KEYWORD,
+        "version_number": models.PayloadSchemaType.INTEGER,
+        "versions": models.PayloadSchemaType.INTEGER,
+    }
+
+    def __init__(self, use_memory: bool = False, client: Optional[AsyncQdrantClient] = None):
+        if client is not None:
+            self.client = client
+        elif use_memory:
+            # Private in-process store: handlers that must see the same data
+            # (e.g. ingestor + retriever in tests/scripts) share the handler.
+            self.client = AsyncQdrantClient(location=":memory:")
         else:
-            self.client = QdrantClient(
-                host=settings.QDRANT_HOST,
-                port=settings.QDRANT_PORT,
-                api_key=settings.QDRANT_API_KEY
-            )
+            self.client = get_shared_client()
         self.collection_name = "documents"
-        self.vector_size = 384 # Default for all-MiniLM-L6-v2. Configurable? 
+        self.vector_size = 384 # Default for all-MiniLM-L6-v2. Configurable?
+        self._collection_ready = False
+        # The local (in-memory) engine ignores payload indexes and warns about them
+        self._use_payload_indexes = not use_memory
 
-    def create_collection_if_not_exists(self):
-        if not self.client.collection_exists(self.collection_name):
-            self.client.create_collection(
+    async def create_collection_if_not_exists(self):
+        if self._collection_ready:
+            return
+        if not await self.client.collection_exists(self.collection_name):
+            await self.client.create_collection(
                 collection_name=self.collection_name,
                 vectors_config=models.VectorParams(
                     size=self.vector_size,
                     distance=models.Distance.COSINE
                 )
             )
+        if self._use_payload_indexes:
+            # Idempotent, so collections created before the indexes existed get them too
+            for field_name, schema in self.PAYLOAD_INDEXES.items():
+                await self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=schema
+                )
+        migrated = await self.backfill_versions()
+        if migrated:
+            print(f"🔧 Added version lists to {migrated} points from before version history.")
+        self._collection_ready = True
+
+    async def backfill_versions(self, page_size: int = 1000) -> int:
+        """
+        Points written before version history carry only `version_number`;
+        visibility filters match on `versions`, so give them `[version_number]`.
+        Idempotent; returns the number of points updated.
+        """
+        missing = models.Filter(must=[models.IsEmptyCondition(is_empty=models.PayloadField(key="versions"))])
+        updated = 0
+        while True:
+            points, _ = await self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=missing,
+                limit=page_size,
+                with_payload=["version_number"],
+                with_vectors=False
+            )
+            if not points:
+                return updated
+            groups: Dict[int, List[Any]] = {}
+            for point in points:
+                groups.setdefault(int((point.payload or {}).get("version_number") or 1), []).append(point.id)
+            for version, point_ids in groups.items():
+                await self.client.set_payload(
+                    collection_name=self.collection_name,
+                    payload={"versions": [version]},
+                    points=point_ids
+                )
+            updated += len(points)
 
     async def upsert_points(self, points: List[models.PointStruct]):
-        self.client.upsert(
+        await self.client.upsert(
             collection_name=self.collection_name,
             points=points
         )
 
-    async def mark_as_outdated(self, logical_doc_id: str):
+    async def upsert_vectors(
+        self,
+        ids: List[str],
+        vectors: np.ndarray,
+        payloads: List[Dict[str, Any]],
+        batch_size: int = settings.QDRANT_UPSERT_BATCH_SIZE,
+        parallelism: int = settings.QDRANT_UPSERT_PARALLELISM
+    ):
         """
-        Updates all chunks of a doc to is_latest=False.
+        Upserts a large set of points in fixed-size batches.
+        All batches but the last are pipelined with wait=False and bounded
+        parallelism; the last one is sent with wait=True afterwards and acts as
+        a consistency barrier, since Qdrant applies updates in order.
+        Each batch is serialized from its own slice of `vectors`, so the whole
+        matrix is never materialized as Python lists.
         """
-        # 1. Filter by logical_doc_id
-        filter_query = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="logical_doc_id",
-                    match=models.MatchValue(value=logical_doc_id)
+        if len(ids) == 0:
+            return
+
+        bounds = [(i, min(i + batch_size, len(ids))) for i in range(0, len(ids), batch_size)]
+        semaphore = asyncio.Semaphore(parallelism)
+
+        async def send(start: int, end: int, wait: bool):
+            async with semaphore:
+                # Serialized inside the semaphore: at most `parallelism` batches are in memory.
+                # model_construct: the slices are already well-formed, skip re-validating every float
+                batch = models.Batch.model_construct(
+                    ids=ids[start:end],
+                    vectors=vectors[start:end].tolist(),
+                    payloads=payloads[start:end]
                 )
-            ]
-        )
-        
-        # 2. Update Payload
-        self.client.set_payload(
-            collection_name=self.collection_name,
-            payload={"is_latest": False},
-            points=filter_query
-        )
+                await self.client.upsert(collection_name=self.collection_name, points=batch, wait=wait)
+
+        await asyncio.gather(*(send(start, end, wait=False) for start, end in bounds[:-1]))
+        await send(*bounds[-1], wait=True)
+
+    async def tag_points_with_version(self, point_versions: Dict[str, List[int]], version: int):
+        """
+        Carries existing chunks forward into `version` with a payload-only update.
+        `point_versions` maps point id -> versions it already belongs to; points
+        sharing the same history are updated with one set_payload call.
+        `version_number` keeps the version that introduced the chunk.
+        """
+        groups: Dict[Tuple[int, ...], List[str]] = {}
+        for point_id, versions in point_versions.items():
+            new_versions = tuple(sorted(set(versions) | {version}))
+            groups.setdefault(new_versions, []).append(point_id)
+
+        for new_versions, point_ids in groups.items():
+            await self.client.set_payload(
+                collection_name=self.collection_name,
+                payload={"versions": list(new_versions)},
+                points=point_ids
+            )
+
+    # (version map, condition) of the last latest-only filter built; the registry
+    # hands out the same map object until a write, so the condition is reused
+    _latest_cache: Optional[Tuple[Dict[str, int], models.Filter]] = None
+
+    @classmethod
+    def latest_condition(cls, current_versions: Dict[str, int]) -> models.Filter:
+        """
+        "Chunk is in its document's current version", with one clause per
+        distinct version number (doc ids matched with MatchAny), not per document.
+        """
+        cached = cls._latest_cache
+        if cached is not None and cached[0] is current_versions:
+            return cached[1]
+        docs_by_version: Dict[int, List[str]] = {}
+        for doc_id, version in current_versions.items():
+            docs_by_version.setdefault(version, []).append(doc_id)
+        condition = models.Filter(should=[
+            models.Filter(must=[
+                models.FieldCondition(key="versions", match=models.MatchValue(value=version)),
+                models.FieldCondition(key="logical_doc_id", match=models.MatchAny(any=doc_ids)),
+            ])
+            for version, doc_ids in docs_by_version.items()
+        ])
+        cls._latest_cache = (current_versions, condition)
+        return condition
+
+    @staticmethod
+    def build_filter(
+        filters: Optional[SearchFilters],
+        current_versions: Optional[Dict[str, int]] = None
+    ) -> Optional[models.Filter]:
+        """
+        Translates SearchFilters into a Qdrant filter.
+        Visibility of the latest version is decided at query time from the
+        registry's {logical_doc_id: current_version} map, so publishing a version
+        never rewrites the payloads of older chunks. A chunk belongs to every
+        version listed in its `versions` payload array.
+        """
+        if filters is None:
+            return None
+
+        conditions = []
+        if filters.latest_only:
+            if current_versions is None:
+                raise ValueError("latest_only filtering requires the current version map")
+            conditions.append(QdrantHandler.latest_condition(current_versions))
+        if filters.version_number is not None:
+            conditions.append(models.FieldCondition(key="versions", match=models.MatchValue(value=filters.version_number)))
+        if filters.filename:
+            conditions.append(models.FieldCondition(key="filename", match=models.MatchValue(value=filters.filename)))
+
+        return models.Filter(must=conditions) if conditions else None
+
+    async def search(
+        self,
+        query_vector: List[float],
+        limit: int = 5,
+        score_threshold: Optional[float] = None,
+        filters: Optional[SearchFilters] = None,
+        current_versions: Optional[Dict[str, int]] = None
+    ) -> List[models.ScoredPoint]:
+        if filters and filters.latest_only and not current_versions:
+            # No published documents: nothing is visible
+            return []
 
-    async def search(self, query_vector: List[float], limit: int = 5, score_threshold: Optional[float] = None) -> List[models.ScoredPoint]:
         # Refactored to use query_points as search seems unavailable in this environment
-        response = self.client.query_points(
+        response = await self.client.query_points(
             collection_name=self.collection_name,
             query=query_vector,
+            query_filter=self.build_filter(filters, current_versions),
             limit=limit,
             score_threshold=score_threshold
         )
         return response.points
+
+    async def search_batch(
+        self,
+        query_vectors: List[List[float]],
+        limit: int = 5,
+        score_threshold: Optional[float] = None,
+        filters: Optional[SearchFilters] = None,
+        current_versions: Optional[Dict[str, int]] = None
+    ) -> List[List[models.ScoredPoint]]:
+        """Several searches sharing one filter, sent as a single batch request."""
+        if not query_vectors:
+            return []
+        if filters and filters.latest_only and not current_versions:
+            return [[] for _ in query_vectors]
+
+        query_filter = self.build_filter(filters, current_versions)
+        responses = await self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(
+                    query=vector,
+                    filter=query_filter,
+                    limit=limit,
+                    score_threshold=score_threshold,
+                    with_payload=True
+                )
+                for vector in query_vectors
+            ]
+        )
+        return [response.points for response in responses]
+
+    async def count(self) -> int:
+        result = await self.client.count(collection_name=self.collection_name)
+        return result.count
@@ -1,6 +1,7 @@
 import sqlite3
+import threading
 import time
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from uuid import uuid4
 from pydantic import BaseModel
@@ -12,9 +13,47 @@ class RegistryRecord(BaseModel):
     content_hash: str
     updated_at: float
 
+class VersionRecord(BaseModel):
+    logical_id: str
+    version: int
+    content_hash: str
+    created_at: float
+
+class ManifestEntry(BaseModel):
+    point_id: str
+    chunk_hash: str
+
+class CorpusGeneration:
+    """
+    Monotonically increasing counter of corpus writes in this process.
+    Caches of retrieval/answer results remember the generation they were
+    computed at and are treated as stale once it moves.
+    """
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+corpus_generation = CorpusGeneration()
+
+# Current-version map per database file, shared by every DocumentRegistry in the
+# process. It feeds query-time visibility filters, so it is read on every search;
+# any write through a registry instance drops the entry.
+_current_versions_cache: Dict[str, Dict[str, int]] = {}
+
 class DocumentRegistry:
     def __init__(self, db_path: str = "data/registry.db"):
         self.db_path = db_path
+        self._cache_key = str(Path(db_path).resolve())
         self._init_db()
 
     def _init_db(self):
@@ -22,7 +61,7 @@ class DocumentRegistry:
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS documents (
                 logical_id TEXT PRIMARY KEY,
@@ -32,9 +71,46 @@ class DocumentRegistry:
                 updated_at REAL NOT NULL
             )
         """)
+        # Every published version, so the current-version pointer can be moved back.
+        # Numbers are reserved (published = 0) before any point is written with them.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS document_versions (
+                logical_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                published INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (logical_id, version)
+            )
+        """)
+        cursor.execute("PRAGMA table_info(document_versions)")
+        if "published" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE document_versions ADD COLUMN published INTEGER NOT NULL DEFAULT 1")
+        # Per-version chunk manifest: which (deterministic) points make up a version
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS chunk_manifests (
+                logical_id TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                point_id TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                PRIMARY KEY (logical_id, version, point_id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_manifest_point ON chunk_manifests (logical_id, point_id)")
+        # Databases from before version history: record each document's current version
+        cursor.execute("""
+            INSERT OR IGNORE INTO document_versions (logical_id, version, content_hash, created_at)
+            SELECT logical_id, current_version, content_hash, updated_at FROM documents
+        """)
         conn.commit()
         conn.close()
 
+    def _invalidate_cache(self):
+        # Every registry write changes what searches can see
+        _current_versions_cache.pop(self._cache_key, None)
+        corpus_generation.bump()
+
     def get_by_filename(self, filename: str) -> Optional[RegistryRecord]:
         """Fetch document state by filename."""
         conn = sqlite3.connect(self.db_path)
@@ -42,7 +118,7 @@ class DocumentRegistry:
         cursor.execute("SELECT * FROM documents WHERE filename = ?", (filename,))
         row = cursor.fetchone()
         conn.close()
-        
+
         if row:
             return RegistryRecord(
                 logical_id=row[0],
@@ -53,35 +129,176 @@ class DocumentRegistry:
             )
         return None
 
-    def upsert_document(self, filename: str, content_hash: str, logical_id: Optional[str] = None, version: int = 1) -> str:
+    def upsert_document(
+        self,
+        filename: str,
+        content_hash: str,
+        logical_id: Optional[str] = None,
+        version: int = 1,
+        manifest: Optional[List[ManifestEntry]] = None
+    ) -> str:
         """
         Register a new document or update an existing one.
+        Updating `current_version` is what publishes a version: searches decide
+        visibility from this pointer, so the flip is a single-row update.
+        The version's chunk manifest, if given, is written in the same transaction.
         Returns logical_id.
         """
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        
+
         timestamp = time.time()
-        
+
         # Check if exists (handled by caller usually, but safe upsert here)
         existing = self.get_by_filename(filename)
-        
+        lid = existing.logical_id if existing else (logical_id or str(uuid4()))
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO document_versions (logical_id, version, content_hash, created_at, published)
+            VALUES (?, ?, ?, ?, 1)
+        """, (lid, version, content_hash, timestamp))
+
+        if manifest is not None:
+            cursor.execute("DELETE FROM chunk_manifests WHERE logical_id = ? AND version = ?", (lid, version))
+            cursor.executemany("""
+                INSERT INTO chunk_manifests (logical_id, version, position, point_id, chunk_hash)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(lid, version, i, e.point_id, e.chunk_hash) for i, e in enumerate(manifest)])
+
         if existing:
             # Update
-            lid = existing.logical_id
             cursor.execute("""
-                UPDATE documents 
+                UPDATE documents
                 SET current_version = ?, content_hash = ?, updated_at = ?
                 WHERE logical_id = ?
             """, (version, content_hash, timestamp, lid))
         else:
             # Insert
-            lid = logical_id or str(uuid4())
             cursor.execute("""
                 INSERT INTO documents (logical_id, filename, current_version, content_hash, updated_at)
                 VALUES (?, ?, ?, ?, ?)
             """, (lid, filename, version, content_hash, timestamp))
-            
+
         conn.commit()
         conn.close()
+        self._invalidate_cache()
         return lid
+
+    def set_current_version(self, logical_id: str, version: int):
+        """
+        Moves the current-version pointer, e.g. to roll back to an earlier version.
+        The chunks of every published version are kept, so this is free.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT content_hash FROM document_versions WHERE logical_id = ? AND version = ? AND published = 1",
+            (logical_id, version)
+        )
+        row = cursor.fetchone()
+        if not row:
+            conn.close()
+            raise ValueError(f"Unknown version {version} for document {logical_id}")
+
+        cursor.execute("""
+            UPDATE documents
+            SET current_version = ?, content_hash = ?, updated_at = ?
+            WHERE logical_id = ?
+        """, (version, row[0], time.time(), logical_id))
+        conn.commit()
+        conn.close()
+        self._invalidate_cache()
+
+    def next_version(self, logical_id: str) -> int:
+        """
+        Number for the document's next version: one past the highest ever
+        published or reserved, so a version rolled away from (or whose ingest
+        failed) is never reused. The current version counts too, for documents
+        registered before version history.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        version = self._next_version(cursor, logical_id)
+        conn.close()
+        return version
+
+    @staticmethod
+    def _next_version(cursor: sqlite3.Cursor, logical_id: str) -> int:
+        cursor.execute("""
+            SELECT MAX(version) FROM (
+                SELECT version FROM document_versions WHERE logical_id = ?
+                UNION ALL SELECT current_version FROM documents WHERE logical_id = ?
+            )
+        """, (logical_id, logical_id))
+        latest = cursor.fetchone()[0]
+        return (latest or 0) + 1
+
+    def reserve_version(self, logical_id: str, content_hash: str) -> int:
+        """
+        Claims the next version number before any point is written with it.
+        The version stays unpublished (not listed, not a rollback target) until
+        upsert_document; if the ingest fails, its number is simply skipped.
+        """
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        # Write lock up front: concurrent ingests of one document get distinct numbers
+        cursor.execute("BEGIN IMMEDIATE")
+        version = self._next_version(cursor, logical_id)
+        cursor.execute("""
+            INSERT INTO document_versions (logical_id, version, content_hash, created_at, published)
+            VALUES (?, ?, ?, ?, 0)
+        """, (logical_id, version, content_hash, time.time()))
+        cursor.execute("COMMIT")
+        conn.close()
+        return version
+
+    def list_versions(self, logical_id: str) -> List[VersionRecord]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT logical_id, version, content_hash, created_at FROM document_versions WHERE logical_id = ? AND published = 1 ORDER BY version",
+            (logical_id,)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return [VersionRecord(logical_id=r[0], version=r[1], content_hash=r[2], created_at=r[3]) for r in rows]
+
+    def get_manifest(self, logical_id: str, version: int) -> List[ManifestEntry]:
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT point_id, chunk_hash FROM chunk_manifests WHERE logical_id = ? AND version = ? ORDER BY position",
+            (logical_id, version)
+        )
+        rows = cursor.fetchall()
+        conn.close()
+        return [ManifestEntry(point_id=r[0], chunk_hash=r[1]) for r in rows]
+
+    def get_point_versions(self, logical_id: str, point_ids: List[str]) -> Dict[str, List[int]]:
+        """For each known point of a document, the sorted list of versions containing it."""
+        found: Dict[str, List[int]] = {}
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        for i in range(0, len(point_ids), 500):
+            batch = point_ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            cursor.execute(
+                f"SELECT point_id, version FROM chunk_manifests WHERE logical_id = ? AND point_id IN ({placeholders}) ORDER BY version",
+                (logical_id, *batch)
+            )
+            for point_id, version in cursor.fetchall():
+                found.setdefault(point_id, []).append(version)
+        conn.close()
+        return found
+
+    def get_current_versions(self) -> Dict[str, int]:
+        """Returns {logical_id: current_version}, served from the in-process cache."""
+        versions = _current_versions_cache.get(self._cache_key)
+        if versions is None:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute("SELECT logical_id, current_version FROM documents")
+            versions = dict(cursor.fetchall())
+            conn.close()
+            _current_versions_cache[self._cache_key] = versions
+        return versions
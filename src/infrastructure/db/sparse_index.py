@@ -0,0 +1,166 @@
+import gzip
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from src.app.core.config import settings
+from src.domain.documents.models import SearchFilters
+
+# Words and dotted codes ("4.2", "3.1.4") stay whole, so "Policy 4.2" is an exact term
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+class SparseIndex:
+    """
+    In-process BM25 inverted index over chunk text.
+    Complements dense search for exact terms (policy codes, grade labels) that
+    embeddings blur. Updated incrementally by ingestion and persisted as
+    gzipped JSON next to the registry (or kept in memory when `path` is None).
+    """
+
+    def __init__(self, path: Optional[str] = settings.SPARSE_INDEX_PATH, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._dirty = False # Changed since the last save
+        if path and Path(path).exists():
+            self._load()
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def add(self, point_id: str, text: str, payload: Dict[str, Any]):
+        with self._lock:
+            if point_id in self._doc_lengths:
+                self._remove(point_id)
+            terms = Counter(self.tokenize(text))
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[point_id] = tf
+            length = sum(terms.values())
+            self._doc_lengths[point_id] = length
+            self._total_length += length
+            self._payloads[point_id] = payload
+            self._dirty = True
+
+    def update_payload(self, point_ids: List[str], updates: Dict[str, Any]):
+        with self._lock:
+            for point_id in point_ids:
+                if point_id in self._payloads:
+                    self._payloads[point_id].update(updates)
+                    self._dirty = True
+
+    def remove(self, point_ids: List[str]):
+        with self._lock:
+            for point_id in point_ids:
+                if point_id in self._doc_lengths:
+                    self._remove(point_id)
+                    self._dirty = True
+
+    def _remove(self, point_id: str):
+        for term in self.tokenize(self._payloads[point_id].get("content", "")):
+            postings = self._postings.get(term)
+            if postings:
+                postings.pop(point_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(point_id)
+        del self._payloads[point_id]
+
+    @staticmethod
+    def matches(payload: Dict[str, Any], filters: Optional[SearchFilters], current_versions: Optional[Dict[str, int]]) -> bool:
+        """Same semantics as QdrantHandler.build_filter, evaluated in-process."""
+        if filters is None:
+            return True
+        versions = payload.get("versions", [])
+        if filters.latest_only and (current_versions or {}).get(payload.get("logical_doc_id")) not in versions:
+            return False
+        if filters.version_number is not None and filters.version_number not in versions:
+            return False
+        if filters.filename and payload.get("filename") != filters.filename:
+            return False
+        return True
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        filters: Optional[SearchFilters] = None,
+        current_versions: Optional[Dict[str, int]] = None
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """Returns [(point_id, bm25_score, payload)] sorted by score."""
+        with self._lock:
+            n_docs = len(self._doc_lengths)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs
+
+            scores: Dict[str, float] = {}
+            for term in set(self.tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for point_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[point_id] / avg_length)
+                    scores[point_id] = scores.get(point_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for point_id, score in ranked:
+                payload = self._payloads[point_id]
+                if self.matches(payload, filters, current_versions):
+                    results.append((point_id, score, dict(payload)))
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "postings": self._postings,
+                "doc_lengths": self._doc_lengths,
+                "payloads": self._payloads
+            }
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f)
+            # Atomic swap: a crash mid-write never leaves a truncated index behind
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        self._postings = data["postings"]
+        self._doc_lengths = data["doc_lengths"]
+        self._payloads = data["payloads"]
+        self._total_length = sum(self._doc_lengths.values())
+
+# One index per file per process, shared by ingestion and every Retriever
+_shared_indexes: Dict[str, SparseIndex] = {}
+
+def get_sparse_index(path: str = settings.SPARSE_INDEX_PATH) -> SparseIndex:
+    index = _shared_indexes.get(path)
+    if index is None:
+        index = SparseIndex(path=path)
+        _shared_indexes[path] = index
+    return index
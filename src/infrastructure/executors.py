@@ -0,0 +1,61 @@
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+from src.app.core.config import settings
+
+class ExecutorManager:
+    """
+    Keeps blocking work off the event loop, with separately sized pools:
+    - io:    threads for blocking client/sqlite/file calls and sync SDKs.
+    - model: threads for embedding-model inference (torch releases the GIL).
+    CPU-bound document conversion has its own process pool (ParsingPool).
+    Pools are created lazily so importing this module stays cheap.
+    """
+
+    def __init__(self, io_workers: int, model_workers: int):
+        self.io_workers = io_workers
+        self.model_workers = model_workers
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._model_pool: Optional[ThreadPoolExecutor] = None
+        self._submitted: Dict[str, int] = {"io": 0, "model": 0}
+
+    @property
+    def io_pool(self) -> ThreadPoolExecutor:
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="rag-io")
+        return self._io_pool
+
+    @property
+    def model_pool(self) -> ThreadPoolExecutor:
+        if self._model_pool is None:
+            self._model_pool = ThreadPoolExecutor(max_workers=self.model_workers, thread_name_prefix="rag-model")
+        return self._model_pool
+
+    async def _run(self, kind: str, pool: Executor, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self._submitted[kind] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(pool, partial(fn, *args, **kwargs))
+
+    async def run_io(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await self._run("io", self.io_pool, fn, *args, **kwargs)
+
+    async def run_model(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await self._run("model", self.model_pool, fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": {"io": self.io_workers, "model": self.model_workers},
+            "submitted": dict(self._submitted)
+        }
+
+    def shutdown(self, wait: bool = True):
+        for pool in (self._io_pool, self._model_pool):
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+        self._io_pool = self._model_pool = None
+
+executors = ExecutorManager(
+    io_workers=settings.IO_EXECUTOR_WORKERS,
+    model_workers=settings.MODEL_EXECUTOR_WORKERS
+)
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from src.infrastructure.executors import executors
+
+class BatcherStats:
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    def record(self, batch_size: int, waits: List[float]):
+        self.batches += 1
+        self.items += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.total_queue_wait += sum(waits)
+        self.max_queue_wait = max(self.max_queue_wait, max(waits))
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_queue_wait_ms": 1000 * self.total_queue_wait / self.items if self.items else 0.0,
+            "max_queue_wait_ms": 1000 * self.max_queue_wait
+        }
+
+class MicroBatcher:
+    """
+    Collects concurrent single-text encode requests into one batched call.
+    A batch is flushed when it reaches `max_batch_size` or when the oldest
+    request has waited `max_wait_ms`; the encode runs on the model executor and
+    each caller's future is resolved with its own row of the result.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], Any], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = BatcherStats()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self):
+        # Queue and worker are bound to the running loop; rebuild if it changed
+        # (e.g. a new loop per test, or asyncio.run called twice in a script).
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, text: str) -> np.ndarray:
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        while True:
+            first = await self._queue.get()
+            batch: List[Tuple[str, asyncio.Future, float]] = [first]
+            deadline = first[2] + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.perf_counter()
+            self.stats.record(len(batch), [started - enqueued for _, _, enqueued in batch])
+
+            try:
+                vectors = await executors.run_model(self.encode_batch, [text for text, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), vector in zip(batch, vectors):
+                # Callers may have been cancelled while waiting
+                if not future.done():
+                    future.set_result(vector)
+
+    async def close(self):
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
@@ -0,0 +1,209 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import litellm
+from litellm import acompletion
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+from src.app.core.config import settings
+
+# Failures worth another attempt; anything else (bad request, auth) is raised at once
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    litellm.Timeout,
+    litellm.APIConnectionError,
+    litellm.RateLimitError,
+    litellm.ServiceUnavailableError,
+    litellm.InternalServerError,
+    litellm.BadGatewayError,
+)
+
+DeltaCallback = Callable[[str], Awaitable[None]]
+
+class LLMBudgetExceeded(Exception):
+    """Raised when a call cannot start or finish within the caller's deadline."""
+
+class LLMStreamInterrupted(Exception):
+    """A streamed call failed after output was forwarded; it cannot be retried transparently."""
+
+class LLMCallStats:
+    """Recent latencies (for the hedge delay) and counters for one model."""
+
+    def __init__(self, window: int = 200):
+        self.latencies: deque = deque(maxlen=window)
+        self.calls = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "p50_s": self.percentile(0.5),
+            "p95_s": self.percentile(0.95)
+        }
+
+# Per model, shared by every client in the process so the p95 reflects all traffic
+_call_stats: Dict[str, LLMCallStats] = {}
+
+def get_call_stats(model: str) -> LLMCallStats:
+    stats = _call_stats.get(model)
+    if stats is None:
+        stats = LLMCallStats()
+        _call_stats[model] = stats
+    return stats
+
+def all_call_stats() -> Dict[str, Dict[str, Any]]:
+    return {model: stats.as_dict() for model, stats in _call_stats.items()}
+
+class LLMClient:
+    """
+    Async litellm wrapper with bounded latency:
+    - every attempt has a timeout, capped by the caller's absolute deadline;
+    - transient failures are retried with jittered exponential backoff;
+    - optionally, a non-streaming call is hedged: if it has not returned by the
+      model's observed p95 latency, a second identical request is sent and
+      whichever answers first wins.
+    """
+
+    def __init__(
+        self,
+        model: str = settings.LLM_MODEL,
+        timeout_s: float = settings.LLM_CALL_TIMEOUT_S,
+        max_attempts: int = settings.LLM_MAX_ATTEMPTS,
+        hedge: bool = settings.LLM_HEDGE_ENABLED
+    ):
+        self.model = model
+        self.timeout_s = timeout_s
+        self.max_attempts = max_attempts
+        self.hedge = hedge
+        self.stats = get_call_stats(model)
+
+    def _request_kwargs(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        return dict(
+            model=self.model,
+            messages=messages,
+            base_url=settings.OLLAMA_BASE_URL if "ollama" in self.model else None,
+            response_format={"type": "json_object"}
+        )
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> float:
+        if deadline is None:
+            return self.timeout_s
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMBudgetExceeded("Latency budget exhausted before the LLM call")
+        return min(self.timeout_s, remaining)
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        deadline: Optional[float] = None,
+        on_delta: Optional[DeltaCallback] = None
+    ) -> str:
+        """
+        Returns the message content. `deadline` is a time.monotonic() value;
+        with `on_delta` the response is streamed and each content delta is
+        forwarded as it arrives.
+        """
+        self.stats.calls += 1
+        backoff = wait_random_exponential(multiplier=0.5, max=settings.LLM_RETRY_MAX_WAIT_S)
+
+        def wait(retry_state) -> float:
+            # Never sleep past the deadline: the next attempt then fails fast with LLMBudgetExceeded
+            delay = backoff(retry_state)
+            return delay if deadline is None else max(0.0, min(delay, deadline - time.monotonic()))
+
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(self.max_attempts),
+            wait=wait,
+            retry=retry_if_exception_type(RETRYABLE_ERRORS),
+            reraise=True
+        )
+        attempt_number = 0
+        async for attempt in retrying:
+            with attempt:
+                attempt_number += 1
+                if attempt_number > 1:
+                    self.stats.retries += 1
+                timeout = self._attempt_timeout(deadline)
+                started = time.monotonic()
+                try:
+                    if on_delta is not None:
+                        content = await self._stream(messages, timeout, on_delta)
+                    else:
+                        content = await self._hedged(messages, timeout)
+                except asyncio.TimeoutError:
+                    self.stats.timeouts += 1
+                    raise
+                self.stats.latencies.append(time.monotonic() - started)
+                return content
+
+    async def _call(self, messages: List[Dict[str, str]]) -> str:
+        response = await acompletion(**self._request_kwargs(messages))
+        return response.choices[0].message.content
+
+    async def _hedged(self, messages: List[Dict[str, str]], timeout: float) -> str:
+        hedge_after = self.stats.percentile(0.95)
+        if not self.hedge or hedge_after is None or len(self.stats.latencies) < settings.LLM_HEDGE_MIN_SAMPLES or hedge_after >= timeout:
+            return await asyncio.wait_for(self._call(messages), timeout=timeout)
+
+        loop_deadline = time.monotonic() + timeout
+        primary = asyncio.create_task(self._call(messages))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self.stats.hedges_fired += 1
+                tasks.append(asyncio.create_task(self._call(messages)))
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                remaining = loop_deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.stats.hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            if error is not None and not pending:
+                raise error
+            raise asyncio.TimeoutError()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _stream(self, messages: List[Dict[str, str]], timeout: float, on_delta: DeltaCallback) -> str:
+        parts: List[str] = []
+
+        async def consume():
+            response = await acompletion(stream=True, **self._request_kwargs(messages))
+            async for chunk in response:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    await on_delta(delta)
+
+        try:
+            await asyncio.wait_for(consume(), timeout=timeout)
+        except RETRYABLE_ERRORS as e:
+            if parts:
+                # Part of the output already reached the caller: a retry would duplicate it
+                raise LLMStreamInterrupted(str(e) or type(e).__name__) from e
+            raise
+        return "".join(parts)
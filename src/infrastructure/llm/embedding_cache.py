@@ -0,0 +1,116 @@
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from src.app.core.config import settings
+
+class EmbeddingCache:
+    """
+    Content-addressed, persistent embedding cache.
+    Vectors are stored as raw float32 blobs keyed by (model name, sha256 of text),
+    so re-ingesting a new document version only embeds the chunks that changed.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: int = settings.EMBEDDING_CACHE_MAX_ENTRIES
+    ):
+        # Resolved per instance, so a redirected setting (e.g. in tests) is honoured
+        self.db_path = db_path or settings.EMBEDDING_CACHE_PATH
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._init_db()
+
+    def _init_db(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model_name TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model_name, text_hash)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, text_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached vectors for the given hashes; misses are simply absent."""
+        if not text_hashes:
+            return {}
+
+        found: Dict[str, np.ndarray] = {}
+        unique_hashes = list(dict.fromkeys(text_hashes))
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(unique_hashes), 500):
+            batch = unique_hashes[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            cursor.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model_name = ? AND text_hash IN ({placeholders})",
+                (model_name, *batch)
+            )
+            for text_hash, blob in cursor.fetchall():
+                found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+        if found:
+            # Refresh recency for LRU eviction
+            now = time.time()
+            cursor.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE model_name = ? AND text_hash = ?",
+                [(now, model_name, h) for h in found]
+            )
+            conn.commit()
+        conn.close()
+
+        self.hits += len(found)
+        self.misses += len(unique_hashes) - len(found)
+        return found
+
+    def put_many(self, model_name: str, text_hashes: List[str], vectors: np.ndarray):
+        if not text_hashes:
+            return
+
+        now = time.time()
+        rows = [
+            (model_name, h, np.asarray(v, dtype=np.float32).tobytes(), now)
+            for h, v in zip(text_hashes, vectors)
+        ]
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO embeddings (model_name, text_hash, vector, last_access)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+        self._evict(cursor)
+        conn.commit()
+        conn.close()
+
+    def _evict(self, cursor: sqlite3.Cursor):
+        """Drop least-recently-used entries once the cache exceeds max_entries."""
+        cursor.execute("SELECT COUNT(*) FROM embeddings")
+        overflow = cursor.fetchone()[0] - self.max_entries
+        if overflow > 0:
+            cursor.execute("""
+                DELETE FROM embeddings WHERE rowid IN (
+                    SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?
+                )
+            """, (overflow,))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
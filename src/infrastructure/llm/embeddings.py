@@ -1,20 +1,82 @@
-from typing import List
-from sentence_transformers import SentenceTransformer
+from typing import Any, Dict, List, Optional
+import numpy as np
 from src.app.core.config import settings
+from src.infrastructure.llm.model_registry import model_registry
+from src.infrastructure.llm.embedding_cache import EmbeddingCache
+from src.infrastructure.llm.batching import MicroBatcher
+from src.infrastructure.executors import executors
 
 class EmbeddingService:
-    def __init__(self, model_name: str = settings.EMBEDDING_MODEL):
+    # One query batcher per model, shared by every EmbeddingService in the process,
+    # so concurrent /search and /chat requests land in the same batches.
+    _query_batchers: Dict[str, MicroBatcher] = {}
+
+    def __init__(self, model_name: str = settings.EMBEDDING_MODEL, cache: Optional[EmbeddingCache] = None):
         self.model_name = model_name
-        # Lazy load in production, or load on startup. 
-        # For now, load in init.
-        self.model = SentenceTransformer(model_name)
+        self.cache = cache
+
+    @property
+    def model(self) -> Any:
+        # Lazily resolved from the process-wide registry, so constructing
+        # an EmbeddingService is cheap and every instance shares one model.
+        return model_registry.get(self.model_name)
+
+    def embed_documents(self, texts: List[str]) -> np.ndarray:
+        """
+        Returns a float32 matrix of shape (len(texts), dim). It is kept as NumPy
+        so callers (e.g. batched upserts) can serialize it slice by slice.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if self.cache is None:
+            embeddings = self.model.encode(texts, convert_to_numpy=True)
+            return np.asarray(embeddings, dtype=np.float32)
+
+        # Only texts the cache has never seen go through the model
+        hashes = [EmbeddingCache.hash_text(t) for t in texts]
+        cached = self.cache.get_many(self.model_name, hashes)
+
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = text
+
+        if missing:
+            new_vectors = self.model.encode(list(missing.values()), convert_to_numpy=True)
+            new_vectors = np.asarray(new_vectors, dtype=np.float32)
+            self.cache.put_many(self.model_name, list(missing.keys()), new_vectors)
+            cached.update(zip(missing.keys(), new_vectors))
 
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        # sentence-transformers encode returns numpy array or list of tensors
-        # we convert to list of floats for JSON/Qdrant compatibility
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings.tolist()
+        return np.stack([cached[h] for h in hashes])
+
+    async def aembed_documents(self, texts: List[str]) -> np.ndarray:
+        """embed_documents on the model executor, so the event loop stays responsive."""
+        return await executors.run_model(self.embed_documents, texts)
 
     def embed_query(self, text: str) -> List[float]:
         embedding = self.model.encode(text, convert_to_numpy=True)
         return embedding.tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """
+        Async variant of embed_query: concurrent callers are micro-batched
+        into a single encode call that runs off the event loop.
+        """
+        embedding = await self._query_batcher().submit(text)
+        return embedding.tolist()
+
+    def _query_batcher(self) -> MicroBatcher:
+        batcher = self._query_batchers.get(self.model_name)
+        if batcher is None:
+            model_name = self.model_name
+            batcher = MicroBatcher(
+                lambda texts: model_registry.get(model_name).encode(texts, convert_to_numpy=True),
+                max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS
+            )
+            self._query_batchers[model_name] = batcher
+        return batcher
+
+    @classmethod
+    def batcher_stats(cls) -> Dict[str, Dict[str, float]]:
+        return {name: b.stats.as_dict() for name, b in cls._query_batchers.items()}
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None # type: ignore
+
+class ModelStats(BaseModel):
+    model_name: str
+    load_seconds: float
+    parameter_bytes: int
+    rss_delta_bytes: int
+    loaded_at: float
+    hits: int = 0
+
+def _current_rss_bytes() -> int:
+    """Resident set size of this process (0 if the platform does not expose it)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+class ModelRegistry:
+    """
+    Process-wide registry of SentenceTransformer models keyed by model name.
+    Models are loaded lazily on first use and shared by every consumer
+    (EmbeddingService, SemanticChunker, ...), so a model is loaded once per process.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+        self._model_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, model_name: str) -> Any:
+        model = self._models.get(model_name)
+        if model is not None:
+            self._stats[model_name].hits += 1
+            return model
+
+        # One lock per model name: loading model A must not block users of model B
+        with self._lock:
+            model_lock = self._model_locks.setdefault(model_name, threading.Lock())
+
+        with model_lock:
+            # Double-checked: another thread may have finished loading while we waited
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._load(model_name)
+            return model
+
+    def _load(self, model_name: str) -> Any:
+        if not SentenceTransformer:
+            raise ImportError("sentence-transformers is required to load embedding models")
+
+        rss_before = _current_rss_bytes()
+        start = time.perf_counter()
+        model = SentenceTransformer(model_name)
+        load_seconds = time.perf_counter() - start
+
+        parameter_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+        self._stats[model_name] = ModelStats(
+            model_name=model_name,
+            load_seconds=load_seconds,
+            parameter_bytes=parameter_bytes,
+            rss_delta_bytes=max(_current_rss_bytes() - rss_before, 0),
+            loaded_at=time.time()
+        )
+        self._models[model_name] = model
+        print(f"Loaded embedding model {model_name} in {load_seconds:.2f}s")
+        return model
+
+    def is_loaded(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "process_rss_bytes": _current_rss_bytes(),
+            "models": {name: s.model_dump() for name, s in self._stats.items()}
+        }
+
+    def clear(self, model_name: Optional[str] = None):
+        """Drop cached models (all, or a single one). Mostly useful for tests."""
+        with self._lock:
+            if model_name is None:
+                self._models.clear()
+                self._stats.clear()
+            else:
+                self._models.pop(model_name, None)
+                self._stats.pop(model_name, None)
+
+model_registry = ModelRegistry()
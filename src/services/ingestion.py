@@ -1,119 +1,262 @@
+import asyncio
 from pathlib import Path
-from uuid import uuid4
-from qdrant_client import models
+from uuid import UUID, uuid4, uuid5
 import time
-from src.infrastructure.db.registry import DocumentRegistry
+from src.app.core.config import settings
+from src.infrastructure.db.registry import DocumentRegistry, ManifestEntry, corpus_generation
 
 from src.domain.documents.parser import DocumentParser
 from src.domain.documents.models import DocumentMetadata, ChunkMetadata
 from src.domain.documents.chunking.factory import ChunkerFactory, ChunkerConfig
 from src.infrastructure.db.qdrant import QdrantHandler
+from src.infrastructure.db.sparse_index import SparseIndex, get_sparse_index
 from src.infrastructure.llm.embeddings import EmbeddingService
+from src.infrastructure.llm.embedding_cache import EmbeddingCache
+from src.infrastructure.executors import executors
 
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 import hashlib
-from src.infrastructure.db.registry import DocumentRegistry
+import numpy as np
+from pydantic import BaseModel
+
+# Namespace for deterministic chunk point ids
+CHUNK_NAMESPACE = UUID("6f1c3a52-8d4e-4b8a-9c1e-2f7d5a0b9e31")
+
+class IngestionJob(BaseModel):
+    """One document version moving through the ingestion stages."""
+    filename: str
+    content_hash: str
+    logical_id: str
+    version: int
+    is_update: bool
+    content: str
+    metadata: DocumentMetadata
+    manifest: List[ManifestEntry] = []
+    texts: Dict[str, str] = {} # point id -> chunk text
+    existing_versions: Dict[str, List[int]] = {} # carried-forward point id -> versions
+    new_ids: List[str] = []
+
+    def new_texts(self) -> List[str]:
+        return [self.texts[point_id] for point_id in self.new_ids]
 
 class IngestionService:
-    def __init__(self, qdrant_handler: Optional[QdrantHandler] = None, registry: Optional[DocumentRegistry] = None):
-        self.parser = DocumentParser()
+    def __init__(
+        self,
+        qdrant_handler: Optional[QdrantHandler] = None,
+        registry: Optional[DocumentRegistry] = None,
+        sparse_index: Optional[SparseIndex] = None,
+        parser: Optional[DocumentParser] = None,
+        embedding_service: Optional[EmbeddingService] = None,
+        sparse_save_delay_s: float = settings.SPARSE_INDEX_SAVE_DELAY_S
+    ):
+        self.parser = parser or DocumentParser()
         self.chunker_factory = ChunkerFactory()
         self.qdrant = qdrant_handler or QdrantHandler()
         self.registry = registry or DocumentRegistry()
-        self.embedding_service = EmbeddingService()
-
-        
-        # Ensure DB is ready
-        self.qdrant.create_collection_if_not_exists()
+        # BM25 side of hybrid retrieval, kept in step with the vector store
+        self.sparse_index = sparse_index if sparse_index is not None else get_sparse_index()
+        # The index file is rewritten whole, so writes are debounced rather than per document
+        self.sparse_save_delay_s = sparse_save_delay_s
+        self._sparse_save: Optional[asyncio.Task] = None
+        # Cached: unchanged chunks of a new version reuse their stored vectors
+        self.embedding_service = embedding_service or EmbeddingService(cache=EmbeddingCache())
 
     def _compute_hash(self, valid_file_path: Path) -> str:
         sha256_hash = hashlib.sha256()
         with open(valid_file_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
+            for byte_block in iter(lambda: f.read(1024 * 1024), b""):
                 sha256_hash.update(byte_block)
         return sha256_hash.hexdigest()
 
-    async def ingest_file(self, file_path: Path, strategy: str = "semantic") -> Optional[DocumentMetadata]:
+    @staticmethod
+    def _point_id(logical_doc_id: str, chunk_hash: str) -> str:
+        # Deterministic: the same text in the same document always maps to the same point
+        return str(uuid5(CHUNK_NAMESPACE, f"{logical_doc_id}:{chunk_hash}"))
+
+    async def ingest_file(
+        self,
+        file_path: Path,
+        strategy: str = "semantic",
+        content_hash: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Optional[DocumentMetadata]:
         """
         Ingests a file with Version Control:
         1. Check Registry (Hash Check).
         2. If New/Updated:
-           - Deprecate old chunks (is_latest=False).
-           - Parse & Upsert new chunks (is_latest=True).
-           - Update Registry.
+           - Parse & Chunk, then diff the chunks against the points already
+             stored for this document (point id = logical id + chunk hash).
+           - Carry unchanged chunks forward with a payload-only update.
+           - Embed & Upsert only new chunks.
+           - Update Registry with the version's chunk manifest (publishes the
+             version: search visibility follows the registry's current-version
+             pointer, so chunks missing from the new version are retired).
+        """
+        job = await self.prepare(file_path, content_hash=content_hash, filename=filename)
+        if job is None:
+            return None
+        await self.chunk(job, strategy)
+        vectors = await self.embedding_service.aembed_documents(job.new_texts()) if job.new_ids else None
+        await self.publish(job, vectors)
+        return job.metadata
+
+    # --- Stages (also driven concurrently by IngestionPipeline) ---
+
+    async def prepare(
+        self,
+        file_path: Path,
+        content_hash: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Optional[IngestionJob]:
         """
+        Hash & registry check, then parse. Returns None when the file is unchanged.
+        `content_hash` (sha256 of the file, e.g. computed while uploading) and
+        `filename` (registry name when `file_path` is a temp file) are optional.
+        """
+        # Ensure DB is ready (no-op after the first call)
+        await self.qdrant.create_collection_if_not_exists()
+
         # 0. Hash & Registry Check
-        new_hash = self._compute_hash(file_path)
-        filename = file_path.name
+        new_hash = content_hash or await executors.run_io(self._compute_hash, file_path)
+        filename = filename or file_path.name
         
-        record = self.registry.get_by_filename(filename)
+        record = await executors.run_io(self.registry.get_by_filename, filename)
         
         if record and record.content_hash == new_hash:
             # Unchanged
             print(f"Skipping {filename}: Unchanged.")
             return None
             
-        # Determine Version
-        version = 1
-        logical_id = None
-        
-        if record:
-            version = record.current_version + 1
-            logical_id = record.logical_id
-            print(f"Updating {filename} to Version {version}...")
-            
-            # PHASE A: DEPRECATE OLD VERSION
-            # We assume qdrant_handler has a method to bulk-update payload
-            # For now, we will perform a 'Delete' of 'is_latest' by ... actually we need a method updates payload.
-            # Simpler approach for prototype: We just upsert the NEW ones as latest.
-            # Queries dealing with old ones might need 'version' filter.
-            # To do this correctly:
-            await self.qdrant.mark_as_outdated(logical_id) 
-        
         # 1. Parse
-        content, doc_metadata = await self.parser.parse(file_path)
+        content, doc_metadata = await self.parser.parse(file_path, content_hash=new_hash, filename=filename)
         # Override doc_id with logical_id if exists, else keep parser's or generate new
-        final_doc_id = logical_id or str(uuid4()) # Use stable ID
-        
+        final_doc_id = record.logical_id if record else str(uuid4()) # Use stable ID
+
+        # Determine Version: reserved now, so points written with it can never
+        # resurface under a later ingest, even if this one fails half-way
+        # (not current_version + 1 either: after a rollback that number is taken)
+        version = await executors.run_io(self.registry.reserve_version, final_doc_id, new_hash)
+        if record:
+            print(f"Updating {filename} to Version {version}...")
+            # Old chunks are left untouched: the version becomes visible when the
+            # registry pointer flips after the upsert, and older versions stay
+            # available for rollback.
+
+        return IngestionJob(
+            filename=filename,
+            content_hash=new_hash,
+            logical_id=final_doc_id,
+            version=version,
+            is_update=record is not None,
+            content=content,
+            metadata=doc_metadata
+        )
+
+    async def chunk(self, job: IngestionJob, strategy: str = "semantic"):
+        """Chunks, diffs against stored points and carries unchanged chunks forward."""
         # 2. Chunk
         config = ChunkerConfig(strategy=strategy) # type: ignore
         chunker = self.chunker_factory.get_chunker(config)
-        chunks_metadata = chunker.chunk(content, final_doc_id)
-        
-        # 3. Prepare Points logic ...
-        points = []
-        texts_to_embed = []
-        payloads = []
+        # Semantic chunking runs the embedding model, so keep it off the loop
+        chunks_metadata = await executors.run_model(chunker.chunk, job.content, job.logical_id)
         
+        # 3. Build the manifest (identical chunks collapse into one point)
         for chunk_meta in chunks_metadata:
-            text = content[chunk_meta.start_char_idx : chunk_meta.end_char_idx]
-            texts_to_embed.append(text)
-            
-            payload = {
-                "logical_doc_id": final_doc_id,
-                "chunk_id": str(chunk_meta.chunk_id),
-                "content": text,
-                "filename": filename,
-                "version_number": version,
-                "is_latest": True, # Always true for new ingestion
-                "effective_date": "2024-01-01", # Placeholder for extraction logic
-                "ingestion_timestamp": time.time()
-            }
-            payloads.append(payload)
-            
-        vectors = self.embedding_service.embed_documents(texts_to_embed)
+            text = job.content[chunk_meta.start_char_idx : chunk_meta.end_char_idx]
+            chunk_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            point_id = self._point_id(job.logical_id, chunk_hash)
+            if point_id not in job.texts:
+                job.texts[point_id] = text
+                job.manifest.append(ManifestEntry(point_id=point_id, chunk_hash=chunk_hash))
+                
+        if not job.manifest:
+            return
         
-        for i, vector in enumerate(vectors):
-            points.append(models.PointStruct(
-                id=str(uuid4()), 
-                vector=vector,
-                payload=payloads[i]
-            ))
-            
-        if points:
-            await self.qdrant.upsert_points(points)
+        # 4. Diff against every point already stored for this document
+        if job.is_update:
+            job.existing_versions = await executors.run_io(
+                self.registry.get_point_versions, job.logical_id, [e.point_id for e in job.manifest]
+            )
+        job.new_ids = [e.point_id for e in job.manifest if e.point_id not in job.existing_versions]
+        print(f"{job.filename} v{job.version}: {len(job.existing_versions)} chunks carried forward, {len(job.new_ids)} new")
+
+    async def publish(self, job: IngestionJob, vectors: Optional[np.ndarray], save_sparse: bool = True):
+        """
+        Upserts the new chunks' vectors, tags the carried-forward ones, then
+        flips the registry pointer. The version number was reserved in
+        prepare(), so if anything here fails, points already tagged with it stay
+        invisible: the number is never published nor handed out again.
+        save_sparse=False: the caller saves the BM25 index itself (e.g. once per pipeline run).
+        """
+        if not job.manifest:
+            return
+
+        # 5a. Upsert only the new chunks
+        # (`version_number` is the version that introduced a chunk; `versions` lists every one containing it)
+        if job.new_ids:
+            payloads = []
+            for point_id in job.new_ids:
+                payloads.append({
+                    "logical_doc_id": job.logical_id,
+                    "chunk_id": point_id,
+                    "content": job.texts[point_id],
+                    "filename": job.filename,
+                    "version_number": job.version,
+                    "versions": [job.version],
+                    "effective_date": "2024-01-01", # Placeholder for extraction logic
+                    "ingestion_timestamp": time.time()
+                })
+                
+            # Batched + pipelined; returns once every batch is applied
+            await self.qdrant.upsert_vectors(job.new_ids, vectors, payloads)
+            for point_id, payload in zip(job.new_ids, payloads):
+                self.sparse_index.add(point_id, payload["content"], dict(payload))
+
+        # 5b. Carry unchanged chunks forward (payload-only update, no embedding)
+        if job.existing_versions:
+            await self.qdrant.tag_points_with_version(job.existing_versions, job.version)
+            for point_id, versions in job.existing_versions.items():
+                self.sparse_index.update_payload([point_id], {"versions": sorted(set(versions) | {job.version})})
             
-            # 4. Update Registry
-            self.registry.upsert_document(filename, new_hash, final_doc_id, version)
+        if save_sparse:
+            self._schedule_sparse_save()
             
-        return doc_metadata
+        # 6. Update Registry (publishes the version)
+        await executors.run_io(
+            self.registry.upsert_document, job.filename, job.content_hash, job.logical_id, job.version, job.manifest
+        )
+        # Retrieval/answer caches computed before this write are now stale
+        corpus_generation.bump()
+
+    # --- BM25 index persistence ---
+
+    def _schedule_sparse_save(self):
+        if self._sparse_save is None or self._sparse_save.done():
+            self._sparse_save = asyncio.create_task(self._save_sparse_later())
+
+    async def _save_sparse_later(self):
+        # Changes made while a save is running are picked up by another round
+        while True:
+            await asyncio.sleep(self.sparse_save_delay_s)
+            try:
+                await self.flush_sparse_index()
+            except Exception as e:
+                print(f"⚠️ Failed to save sparse index: {e}")
+                return
+            if not self.sparse_index.dirty:
+                return
+
+    async def flush_sparse_index(self):
+        """Writes the BM25 index now if it has unsaved changes."""
+        if self.sparse_index.dirty:
+            await executors.run_io(self.sparse_index.save)
+
+    async def close(self):
+        """Cancels the pending debounced save and flushes instead."""
+        if self._sparse_save is not None and not self._sparse_save.done():
+            self._sparse_save.cancel()
+            try:
+                await self._sparse_save
+            except asyncio.CancelledError:
+                pass
+        await self.flush_sparse_index()
@@ -0,0 +1,235 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from src.app.core.config import settings
+from src.domain.documents.models import DocumentMetadata
+from src.services.ingestion import IngestionJob, IngestionService
+
+# Marks the end of a queue's input
+_DONE = object()
+
+class StageStats:
+    def __init__(self):
+        self.items = 0
+        self.failures = 0
+        self.busy_seconds = 0.0  # Summed over the stage's workers
+
+    def record(self, started: float, items: int = 1):
+        self.items += items
+        self.busy_seconds += time.perf_counter() - started
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "items": self.items,
+            "failures": self.failures,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_busy_second": self.items / self.busy_seconds if self.busy_seconds else 0.0
+        }
+
+class IngestionPipeline:
+    """
+    Streams many files through IngestionService's stages concurrently:
+
+        paths -> [parse] -> q -> [chunk] -> q -> [embed batcher] -> q -> [upsert] -> done
+
+    Stages are connected by bounded queues, so a fast stage blocks instead of
+    piling up documents in memory (back-pressure). The embed stage packs the
+    new chunks of several documents into full model batches. A document is
+    published (registry pointer flipped) only once all of its vectors are written.
+    Failures are logged per document and do not stop the pipeline.
+    """
+
+    STAGES = ("parse", "chunk", "embed", "upsert")
+
+    def __init__(
+        self,
+        service: IngestionService,
+        parse_workers: int = settings.PIPELINE_PARSE_WORKERS,
+        chunk_workers: int = settings.PIPELINE_CHUNK_WORKERS,
+        upsert_workers: int = settings.PIPELINE_UPSERT_WORKERS,
+        embed_batch_size: int = settings.PIPELINE_EMBED_BATCH_SIZE,
+        embed_max_wait_ms: float = settings.PIPELINE_EMBED_MAX_WAIT_MS,
+        queue_size: int = settings.PIPELINE_QUEUE_SIZE
+    ):
+        self.service = service
+        self.parse_workers = parse_workers
+        self.chunk_workers = chunk_workers
+        self.upsert_workers = upsert_workers
+        self.embed_batch_size = embed_batch_size
+        self.embed_max_wait = embed_max_wait_ms / 1000.0
+        self.queue_size = queue_size
+        self.stages: Dict[str, StageStats] = {stage: StageStats() for stage in self.STAGES}
+        self.embed_batches = 0
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self.failed: List[str] = [] # Filenames that failed in the last run
+        self._lock = asyncio.Lock()
+
+    async def run(
+        self, files: Iterable[Path], strategy: str = "semantic", root: Optional[Path] = None
+    ) -> List[DocumentMetadata]:
+        """
+        Ingests `files`; returns the metadata of documents that were (re)published.
+        With `root`, documents are registered under their path relative to it
+        (so same-named files in different subdirectories stay distinct).
+        """
+        # One run at a time: concurrent runs could race on the same filename
+        async with self._lock:
+            items = [(path, path.relative_to(root).as_posix() if root else path.name) for path in files]
+            return await self._run(items, strategy)
+
+    async def _run(self, items: List[Tuple[Path, str]], strategy: str) -> List[DocumentMetadata]:
+        self._queues = {stage: asyncio.Queue(maxsize=self.queue_size) for stage in self.STAGES}
+        self.failed = []
+        published: List[DocumentMetadata] = []
+
+        async def feed():
+            for item in items:
+                await self._queues["parse"].put(item)
+
+        stages = [
+            self._workers(self.parse_workers, "parse", self._parse, "chunk", self.chunk_workers),
+            self._workers(self.chunk_workers, "chunk", lambda job: self._chunk(job, strategy), "embed", 1),
+            self._embed_batcher(),
+            self._workers(self.upsert_workers, "upsert", lambda item: self._upsert(item, published)),
+        ]
+        await asyncio.gather(self._close_after(feed(), "parse", self.parse_workers), *stages)
+
+        # The BM25 index is written once per run instead of once per document
+        await self.service.flush_sparse_index()
+        self._queues = {}
+        return published
+
+    async def _close_after(self, producer, queue: str, consumers: int):
+        await producer
+        for _ in range(consumers):
+            await self._queues[queue].put(_DONE)
+
+    async def _workers(
+        self, count: int, stage: str, handle, downstream: Optional[str] = None, downstream_consumers: int = 0
+    ):
+        async def worker():
+            queue = self._queues[stage]
+            while (item := await queue.get()) is not _DONE:
+                started = time.perf_counter()
+                try:
+                    result = await handle(item)
+                except Exception as e:
+                    self._fail(stage, self._filename(item), e)
+                    continue
+                self.stages[stage].record(started)
+                if result is not None and downstream:
+                    await self._queues[downstream].put(result)
+
+        await asyncio.gather(*(worker() for _ in range(count)))
+        # All workers drained: tell every consumer of the next stage
+        for _ in range(downstream_consumers):
+            await self._queues[downstream].put(_DONE)
+
+    def _fail(self, stage: str, filename: str, error: Exception):
+        self.stages[stage].failures += 1
+        self.failed.append(filename)
+        print(f"⚠️ Pipeline {stage} failed for {filename}: {error}")
+
+    @staticmethod
+    def _filename(item: Any) -> str:
+        if isinstance(item, IngestionJob):
+            return item.filename
+        # (path, filename) from the feed, or (job, vectors) from the embed stage
+        first, second = item
+        return first.filename if isinstance(first, IngestionJob) else second
+
+    async def _parse(self, item: Tuple[Path, str]) -> Optional[IngestionJob]:
+        path, filename = item
+        return await self.service.prepare(path, filename=filename)
+
+    async def _chunk(self, job: IngestionJob, strategy: str) -> Optional[IngestionJob]:
+        await self.service.chunk(job, strategy)
+        return job
+
+    async def _embed_batcher(self):
+        """
+        Single consumer: keeps a buffer of pending chunks across documents and
+        embeds it whenever a full batch is available (or input stalls for
+        embed_max_wait). Completed documents go to the upsert stage.
+        """
+        queue = self._queues["embed"]
+        pending: List[Tuple[IngestionJob, int]] = []   # (job, index into job.new_ids)
+        vectors: Dict[int, List[Optional[np.ndarray]]] = {}   # id(job) -> rows
+        remaining: Dict[int, int] = {}
+        finished = False
+
+        async def flush(batch: List[Tuple[IngestionJob, int]]):
+            started = time.perf_counter()
+            try:
+                matrix = await self.service.embedding_service.aembed_documents(
+                    [job.texts[job.new_ids[i]] for job, i in batch]
+                )
+            except Exception as e:
+                failed = {id(job): job for job, _ in batch}
+                for key, job in failed.items():
+                    self._fail("embed", job.filename, e)
+                    vectors.pop(key, None)
+                    remaining.pop(key, None)
+                # Drop the failed documents' other chunks still waiting
+                pending[:] = [(job, i) for job, i in pending if id(job) not in failed]
+                return
+            self.embed_batches += 1
+            self.stages["embed"].record(started, items=len(batch))
+            for (job, i), row in zip(batch, matrix):
+                key = id(job)
+                if key not in vectors:
+                    continue
+                vectors[key][i] = row
+                remaining[key] -= 1
+                if remaining[key] == 0:
+                    await self._queues["upsert"].put((job, np.stack(vectors.pop(key))))
+                    del remaining[key]
+
+        while not finished or pending:
+            item = None
+            if not finished:
+                try:
+                    # Wait for more documents only briefly once something is buffered
+                    timeout = self.embed_max_wait if pending else None
+                    item = await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            if item is _DONE:
+                finished = True
+            elif item is not None:
+                if not item.new_ids:
+                    # Nothing to embed (unchanged chunks only, or empty document)
+                    await self._queues["upsert"].put((item, None))
+                else:
+                    vectors[id(item)] = [None] * len(item.new_ids)
+                    remaining[id(item)] = len(item.new_ids)
+                    pending.extend((item, i) for i in range(len(item.new_ids)))
+
+            # Full batches always go; a partial one when input stalls or has ended
+            while len(pending) >= self.embed_batch_size:
+                batch, pending[:] = pending[:self.embed_batch_size], pending[self.embed_batch_size:]
+                await flush(batch)
+            if pending and (item is None or finished):
+                batch, pending[:] = list(pending), []
+                await flush(batch)
+
+        for _ in range(self.upsert_workers):
+            await self._queues["upsert"].put(_DONE)
+
+    async def _upsert(self, item: Tuple[IngestionJob, Optional[np.ndarray]], published: List[DocumentMetadata]):
+        job, vectors = item
+        await self.service.publish(job, vectors, save_sparse=False)
+        published.append(job.metadata)
+
+    def stats(self) -> Dict[str, Any]:
+        stages = {}
+        for stage, stats in self.stages.items():
+            stages[stage] = stats.as_dict()
+            queue = self._queues.get(stage)
+            stages[stage]["queue_depth"] = queue.qsize() if queue else 0
+        stages["embed"]["batches"] = self.embed_batches
+        stages["embed"]["avg_batch_size"] = self.stages["embed"].items / self.embed_batches if self.embed_batches else 0.0
+        return stages
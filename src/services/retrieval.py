@@ -1,7 +1,19 @@
-from typing import List, Optional, Dict, Any
+import asyncio
+from typing import List, Literal, Optional, Dict, Any
 from pydantic import BaseModel
+from src.app.core.config import settings
 from src.infrastructure.db.qdrant import QdrantHandler
+from src.infrastructure.db.sparse_index import SparseIndex, get_sparse_index
 from src.infrastructure.llm.embeddings import EmbeddingService
+from src.infrastructure.db.registry import DocumentRegistry, corpus_generation
+from src.services.retrieval_cache import RetrievalCache, retrieval_cache
+from src.infrastructure.executors import executors
+from src.domain.documents.models import SearchFilters
+
+RetrievalMode = Literal["dense", "sparse", "hybrid"]
+
+# Standard reciprocal-rank-fusion damping constant
+RRF_K = 60
 
 class RetrievalResult(BaseModel):
     chunk_id: str
@@ -10,40 +22,209 @@ class RetrievalResult(BaseModel):
     metadata: Dict[str, Any]
 
 class Retriever:
-    def __init__(self, qdrant_handler: Optional[QdrantHandler] = None):
+    def __init__(
+        self,
+        qdrant_handler: Optional[QdrantHandler] = None,
+        registry: Optional[DocumentRegistry] = None,
+        sparse_index: Optional[SparseIndex] = None,
+        cache: Optional[RetrievalCache] = None,
+        embedding_service: Optional[EmbeddingService] = None
+    ):
         self.qdrant = qdrant_handler or QdrantHandler()
-        self.embedding_service = EmbeddingService()
+        self.registry = registry or DocumentRegistry()
+        self.sparse_index = sparse_index if sparse_index is not None else get_sparse_index()
+        self.cache = cache or retrieval_cache
+        self.embedding_service = embedding_service or EmbeddingService()
 
     async def retrieve(
-        self, 
-        query: str, 
-        top_k: int = 5, 
-        score_threshold: Optional[float] = 0.2
+        self,
+        query: str,
+        top_k: int = 5,
+        score_threshold: Optional[float] = 0.2,
+        filters: Optional[SearchFilters] = None,
+        mode: Optional[RetrievalMode] = None,
+        query_vector: Optional[List[float]] = None
     ) -> List[RetrievalResult]:
         """
         Retrieves relevant documents for a given query.
+        `query_vector`: the query's embedding, if the caller already has it.
+        Filters are applied server-side, so they do not eat into top_k.
+        mode: 'dense' (embeddings), 'sparse' (BM25) or 'hybrid' (both, fused with RRF).
+        The score threshold only applies to dense scores: in hybrid mode it
+        filters the dense leg only, and `score` is the RRF value (the cosine
+        score is kept in metadata["dense_score"], BM25 in "sparse_score").
+        """
+        mode = mode or settings.RETRIEVAL_MODE
+
+        # Hot questions are answered from the cache until the corpus changes
+        cache_key = self._cache_key(query, top_k, score_threshold, filters, mode)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        generation = corpus_generation.value
+
+        # Current version per document (cached in-process; refreshed after registry writes)
+        current_versions = await executors.run_io(self.registry.get_current_versions)
+
+        if mode == "dense":
+            results = await self._dense(query, top_k, score_threshold, filters, current_versions, query_vector)
+        elif mode == "sparse":
+            results = await self._sparse(query, top_k, filters, current_versions)
+        else:
+            # Hybrid: both lookups run concurrently over a deeper candidate pool, then fuse
+            depth = max(top_k * 3, 10)
+            dense, sparse = await asyncio.gather(
+                self._dense(query, depth, score_threshold, filters, current_versions, query_vector),
+                self._sparse(query, depth, filters, current_versions)
+            )
+            results = self._fuse(dense, sparse, top_k)
+
+        self.cache.put(cache_key, results, generation)
+        return results
+
+    async def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        score_threshold: Optional[float] = 0.2,
+        filters: Optional[SearchFilters] = None,
+        mode: Optional[RetrievalMode] = None
+    ) -> List[List[RetrievalResult]]:
         """
+        retrieve() for several queries at once, returning one result list per query.
+        Cached queries are served directly; the rest are embedded in a single
+        model call and searched with a single batched Qdrant request.
+        """
+        mode = mode or settings.RETRIEVAL_MODE
+        keys = [self._cache_key(q, top_k, score_threshold, filters, mode) for q in queries]
+        results: List[Optional[List[RetrievalResult]]] = [self.cache.get(key) for key in keys]
+        pending = [i for i, r in enumerate(results) if r is None]
+        if not pending:
+            return results
+        generation = corpus_generation.value
+
+        current_versions = await executors.run_io(self.registry.get_current_versions)
+        pending_queries = [queries[i] for i in pending]
+        depth = max(top_k * 3, 10) if mode == "hybrid" else top_k
+
+        async def no_results() -> List[List[RetrievalResult]]:
+            return [[] for _ in pending_queries]
+
+        async def sparse_many() -> List[List[RetrievalResult]]:
+            return list(await asyncio.gather(
+                *(self._sparse(q, depth, filters, current_versions) for q in pending_queries)
+            ))
+
+        dense_lists, sparse_lists = await asyncio.gather(
+            self._dense_many(pending_queries, depth, score_threshold, filters, current_versions)
+            if mode != "sparse" else no_results(),
+            sparse_many() if mode != "dense" else no_results()
+        )
+
+        for j, i in enumerate(pending):
+            if mode == "dense":
+                found = dense_lists[j]
+            elif mode == "sparse":
+                found = sparse_lists[j]
+            else:
+                found = self._fuse(dense_lists[j], sparse_lists[j], top_k)
+            self.cache.put(keys[i], found, generation)
+            results[i] = found
+        return results
+
+    def _cache_key(
+        self,
+        query: str,
+        top_k: int,
+        score_threshold: Optional[float],
+        filters: Optional[SearchFilters],
+        mode: str
+    ):
+        return self.cache.make_key(query, top_k, score_threshold, filters.model_dump_json() if filters else None, mode)
+
+    async def _dense_many(
+        self,
+        queries: List[str],
+        limit: int,
+        score_threshold: Optional[float],
+        filters: Optional[SearchFilters],
+        current_versions: Dict[str, int]
+    ) -> List[List[RetrievalResult]]:
+        vectors = await self.embedding_service.aembed_documents(queries)
+        batches = await self.qdrant.search_batch(
+            query_vectors=vectors.tolist(),
+            limit=limit,
+            score_threshold=score_threshold,
+            filters=filters,
+            current_versions=current_versions
+        )
+        return [
+            [self._to_result(point.payload or {}, point.score, current_versions) for point in points]
+            for points in batches
+        ]
+
+    async def _dense(
+        self,
+        query: str,
+        limit: int,
+        score_threshold: Optional[float],
+        filters: Optional[SearchFilters],
+        current_versions: Dict[str, int],
+        query_vector: Optional[List[float]] = None
+    ) -> List[RetrievalResult]:
         # 1. Embed Query
-        query_vector = self.embedding_service.embed_query(query)
-        
+        if query_vector is None:
+            query_vector = await self.embedding_service.aembed_query(query)
+
         # 2. Search Qdrant
         points = await self.qdrant.search(
-            query_vector=query_vector, 
-            limit=top_k, 
-            score_threshold=score_threshold
+            query_vector=query_vector,
+            limit=limit,
+            score_threshold=score_threshold,
+            filters=filters,
+            current_versions=current_versions
         )
-        
+
         # 3. Format Results
-        results = []
-        for point in points:
-            # Safely get payload
-            payload = point.payload or {}
-            
-            results.append(RetrievalResult(
-                chunk_id=payload.get("chunk_id", ""),
-                content=payload.get("content", ""),
-                score=point.score,
-                metadata=payload
-            ))
-            
-        return results
+        return [self._to_result(point.payload or {}, point.score, current_versions) for point in points]
+
+    async def _sparse(
+        self,
+        query: str,
+        limit: int,
+        filters: Optional[SearchFilters],
+        current_versions: Dict[str, int]
+    ) -> List[RetrievalResult]:
+        hits = await executors.run_io(self.sparse_index.search, query, limit, filters, current_versions)
+        return [self._to_result(payload, score, current_versions) for _, score, payload in hits]
+
+    @staticmethod
+    def _to_result(payload: Dict[str, Any], score: float, current_versions: Dict[str, int]) -> RetrievalResult:
+        # Safely get payload
+        payload = dict(payload)
+        # Staleness is decided against the registry pointer, not stored on the chunk
+        payload["is_latest"] = current_versions.get(payload.get("logical_doc_id")) in payload.get("versions", [])
+
+        return RetrievalResult(
+            chunk_id=payload.get("chunk_id", ""),
+            content=payload.get("content", ""),
+            score=score,
+            metadata=payload
+        )
+
+    @staticmethod
+    def _fuse(dense: List[RetrievalResult], sparse: List[RetrievalResult], top_k: int) -> List[RetrievalResult]:
+        """Reciprocal rank fusion: score = sum over lists of 1 / (RRF_K + rank)."""
+        fused: Dict[str, RetrievalResult] = {}
+        scores: Dict[str, float] = {}
+
+        for source, results in (("dense_score", dense), ("sparse_score", sparse)):
+            for rank, result in enumerate(results, start=1):
+                entry = fused.setdefault(result.chunk_id, result.model_copy(deep=True))
+                entry.metadata[source] = result.score
+                scores[result.chunk_id] = scores.get(result.chunk_id, 0.0) + 1.0 / (RRF_K + rank)
+
+        ranked = sorted(fused.values(), key=lambda r: scores[r.chunk_id], reverse=True)[:top_k]
+        for result in ranked:
+            result.score = scores[result.chunk_id]
+        return ranked
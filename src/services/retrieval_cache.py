@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from src.app.core.config import settings
+from src.infrastructure.db.registry import corpus_generation
+
+class RetrievalCache:
+    """
+    LRU cache of retrieval results keyed by (normalized query, top_k, threshold,
+    filters, mode). Entries expire after a TTL and are invalidated as soon as the
+    corpus generation moves, so a newly ingested handbook is never hidden by a hit.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = settings.RETRIEVAL_CACHE_TTL_S
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[int, float, List[Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def make_key(self, query: str, *params: Any) -> Tuple[Any, ...]:
+        return (self.normalize(query), *params)
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[List[Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, results = entry
+                if generation == corpus_generation.value and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return list(results)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple[Any, ...], results: List[Any], generation: Optional[int] = None):
+        """`generation` should be read before the lookup started, so a write racing with it invalidates the entry."""
+        with self._lock:
+            self._entries[key] = (
+                corpus_generation.value if generation is None else generation,
+                time.monotonic() + self.ttl_seconds,
+                list(results)
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "generation": corpus_generation.value
+        }
+
+# Shared by every Retriever in the process (the /search endpoint builds one per request)
+retrieval_cache = RetrievalCache()
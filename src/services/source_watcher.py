@@ -0,0 +1,311 @@
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from src.app.core.config import settings
+from src.domain.documents.parser import DocumentParser
+from src.infrastructure.executors import executors
+from src.services.pipeline import IngestionPipeline
+
+# (size, mtime_ns, inode): a file whose stat tuple is unchanged is not re-hashed
+FileStat = Tuple[int, int, int]
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+# Files count once fully written (close) or moved in; creation only matters for directories
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE
+
+# struct inotify_event header: wd, mask, cookie, len (followed by `len` name bytes)
+_EVENT = struct.Struct("iIII")
+
+class Inotify:
+    """Minimal recursive inotify reader (Linux only, via ctypes)."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        # AttributeError here means the platform has no inotify
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), "inotify_init1")
+        self._paths: Dict[int, Path] = {} # watch descriptor -> directory
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def add_watch(self, path: Path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(path))
+        self._paths[wd] = path
+
+    def watch_tree(self, root: Path):
+        """Watches `root` and every directory below it (inotify itself is not recursive)."""
+        self.add_watch(root)
+        for directory, subdirs, _ in os.walk(root):
+            for subdir in subdirs:
+                self.add_watch(Path(directory) / subdir)
+
+    def read(self) -> List[Tuple[Optional[Path], int]]:
+        """Drains pending events as (path, mask); path is None when the kernel queue overflowed."""
+        events: List[Tuple[Optional[Path], int]] = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    events.append((None, mask))
+                    continue
+                if mask & IN_IGNORED:
+                    # Watched directory is gone
+                    self._paths.pop(wd, None)
+                    continue
+                directory = self._paths.get(wd)
+                if directory is not None:
+                    events.append((directory / os.fsdecode(name) if name else directory, mask))
+
+    def close(self):
+        os.close(self.fd)
+
+class StatCache:
+    """Stat of every source file as of its last successful ingestion, persisted as JSON."""
+
+    def __init__(self, path: Optional[str] = settings.WATCHER_STAT_CACHE_PATH):
+        self.path = path
+        self.entries: Dict[str, FileStat] = {} # relative path -> stat
+        if path and Path(path).exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = {name: tuple(stat) for name, stat in json.load(f).items()} # type: ignore
+            except (OSError, ValueError) as e:
+                # Only costs one re-hash of every file
+                print(f"⚠️ Ignoring unreadable stat cache {path}: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+class SourceWatcher:
+    """
+    Keeps the index in step with a source directory (recursively).
+    - Changes arrive as inotify events; where inotify is unavailable the tree
+      is polled instead. Both only stat files: a file is handed to the
+      ingestion pipeline (which hashes it) only when its (size, mtime_ns,
+      inode) differs from the persisted stat cache.
+    - Event bursts are debounced and coalesced into one pipeline run; when
+      polling, a changed file is ingested once its stat is stable across two scans.
+    - Documents are registered under their path relative to the root.
+    - Files that failed keep failing silently until they change again or the
+      next full reconciliation (`rescan_interval_s`), which also recovers from
+      missed events.
+    """
+
+    def __init__(
+        self,
+        pipeline: IngestionPipeline,
+        root: Path,
+        stat_cache: Optional[StatCache] = None,
+        use_inotify: bool = settings.WATCHER_USE_INOTIFY,
+        debounce_s: float = settings.WATCHER_DEBOUNCE_S,
+        max_delay_s: float = settings.WATCHER_MAX_DELAY_S,
+        poll_interval_s: float = settings.WATCHER_POLL_INTERVAL_S,
+        rescan_interval_s: float = settings.WATCHER_RESCAN_INTERVAL_S
+    ):
+        self.pipeline = pipeline
+        self.root = root
+        self.stat_cache = stat_cache if stat_cache is not None else StatCache()
+        self.use_inotify = use_inotify
+        self.debounce_s = debounce_s
+        self.max_delay_s = max_delay_s
+        self.poll_interval_s = poll_interval_s
+        self.rescan_interval_s = rescan_interval_s
+        self._inotify: Optional[Inotify] = None
+        self._changed = asyncio.Event()
+        self._pending: Set[Path] = set()
+        self._full_scan = True # The first pass reconciles the whole tree
+        self._last_rescan: Optional[float] = None
+        self._failed: Dict[str, FileStat] = {}
+        self._last_seen: Dict[str, FileStat] = {} # Polling: stat at the previous scan
+        self.ingested = 0
+
+    async def run(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._start_inotify()
+        try:
+            while True:
+                full, paths = await self._next_batch()
+                try:
+                    await self.sync(None if full else paths)
+                except Exception as e:
+                    print(f"⚠️ Background Worker Error: {e}")
+        finally:
+            self._stop_inotify()
+
+    def _start_inotify(self):
+        if not self.use_inotify:
+            return
+        inotify = None
+        try:
+            inotify = Inotify()
+            inotify.watch_tree(self.root)
+        except (OSError, AttributeError) as e:
+            if inotify is not None:
+                inotify.close()
+            print(f"⚠️ inotify unavailable ({e}); polling {self.root} every {self.poll_interval_s:g}s.")
+            return
+        asyncio.get_running_loop().add_reader(inotify.fd, self._on_inotify)
+        self._inotify = inotify
+        print(f"👀 Watching {self.root} ({len(inotify)} directories).")
+
+    def _stop_inotify(self):
+        if self._inotify:
+            asyncio.get_running_loop().remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+
+    def _on_inotify(self):
+        for path, mask in self._inotify.read():
+            if path is None:
+                # Events were dropped: only a full scan is reliable now
+                self._full_scan = True
+                self._changed.set()
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self._inotify.watch_tree(path)
+                    except OSError as e:
+                        print(f"⚠️ Could not watch {path}: {e}")
+            elif mask & IN_CREATE:
+                # A file still being written; its IN_CLOSE_WRITE follows
+                continue
+            # New or removed directories are scanned as a whole
+            self._pending.add(path)
+            self._changed.set()
+
+    async def _next_batch(self) -> Tuple[bool, Set[Path]]:
+        """Waits for changes; returns (full scan?, changed paths)."""
+        if not self._full_scan:
+            timeout = self.rescan_interval_s if self._inotify else self.poll_interval_s
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+                await self._debounce()
+            except asyncio.TimeoutError:
+                self._full_scan = True
+        full, paths = self._full_scan, self._pending
+        self._full_scan, self._pending = False, set()
+        self._changed.clear()
+        return full, paths
+
+    async def _debounce(self):
+        """Returns once events stop for debounce_s (or max_delay_s after the first)."""
+        started = time.monotonic()
+        while (remaining := self.max_delay_s - (time.monotonic() - started)) > 0:
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), min(self.debounce_s, remaining))
+            except asyncio.TimeoutError:
+                return
+
+    async def sync(self, paths: Optional[Iterable[Path]] = None) -> List[str]:
+        """Ingests files under `paths` (the whole tree when None) whose stat changed; returns their names."""
+        if paths is None and (self._last_rescan is None or time.monotonic() - self._last_rescan >= self.rescan_interval_s):
+            self._last_rescan = time.monotonic()
+            self._failed.clear() # Retry failed files
+        current, removed = await executors.run_io(self._scan, paths)
+
+        changed = [
+            name for name, stat in current.items()
+            if self.stat_cache.entries.get(name) != stat and self._failed.get(name) != stat
+        ]
+        if not self._inotify:
+            # No close-write events when polling: wait until a file stops changing
+            stable = [name for name in changed if self._last_seen.get(name) == current[name]]
+            self._last_seen = {name: current[name] for name in changed}
+            changed = stable
+
+        for name in removed:
+            self.stat_cache.entries.pop(name, None)
+        if changed:
+            print(f"📂 {len(changed)} new or modified source file(s).")
+            await self.pipeline.run([self.root / name for name in changed], root=self.root)
+            failed = set(self.pipeline.failed)
+            for name in changed:
+                if name in failed:
+                    self._failed[name] = current[name]
+                else:
+                    self.stat_cache.entries[name] = current[name]
+                    self._failed.pop(name, None)
+            self.ingested += len(changed) - len(failed)
+        if changed or removed:
+            await executors.run_io(self.stat_cache.save)
+        return changed
+
+    def _scan(self, paths: Optional[Iterable[Path]]) -> Tuple[Dict[str, FileStat], List[str]]:
+        """Stats supported files under `paths`; also returns cached names there that no longer exist."""
+        targets = [self.root] if paths is None else list(paths)
+        current: Dict[str, FileStat] = {}
+        scopes: List[str] = []
+        for target in targets:
+            scope = target.relative_to(self.root).as_posix()
+            scopes.append("" if scope == "." else scope)
+            if target.is_dir():
+                for directory, subdirs, files in os.walk(target):
+                    subdirs[:] = [d for d in subdirs if not d.startswith(".")]
+                    for file in files:
+                        self._stat(Path(directory) / file, current)
+            else:
+                self._stat(target, current)
+
+        def in_scope(name: str) -> bool:
+            return any(not scope or name == scope or name.startswith(scope + "/") for scope in scopes)
+
+        removed = [name for name in self.stat_cache.entries if name not in current and in_scope(name)]
+        return current, removed
+
+    def _stat(self, path: Path, out: Dict[str, FileStat]):
+        if path.name.startswith(".") or path.suffix.lower() not in DocumentParser.SUPPORTED_EXTENSIONS:
+            return
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return
+        out[path.relative_to(self.root).as_posix()] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "inotify" if self._inotify else "polling",
+            "watched_directories": len(self._inotify) if self._inotify else 0,
+            "tracked_files": len(self.stat_cache.entries),
+            "ingested": self.ingested,
+            "failed": len(self._failed)
+        }
@@ -1,7 +1,16 @@
 import sys
 import os
+import pytest
 from pathlib import Path
 
 # Add project root to sys.path
 root_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(root_dir))
+
+@pytest.fixture(autouse=True)
+def isolated_embedding_cache(tmp_path, monkeypatch):
+    """Default EmbeddingCache instances write under tmp_path, never to the repo's data/."""
+    from src.app.core.config import settings
+    path = tmp_path / "embedding_cache.db"
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_PATH", str(path))
+    return path
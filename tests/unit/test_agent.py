@@ -1,12 +1,21 @@
+import asyncio
 import pytest
 import json
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 from src.domain.chat.agent import AgentRouter, AgentState
 from src.domain.chat.models import AgentStep, AnswerAction
+from src.services.retrieval import RetrievalResult
+
+def _results(*contents: str) -> list:
+    return [
+        RetrievalResult(chunk_id=f"c{i}", content=c, score=1.0 - i * 0.1, metadata={"filename": "doc1.pdf", "version_number": 1})
+        for i, c in enumerate(contents)
+    ]
 
 @pytest.fixture
 def mock_dependencies():
-    with patch("src.domain.chat.agent.completion") as mock_completion, \
+    with patch("src.infrastructure.llm.client.acompletion", new_callable=AsyncMock) as mock_completion, \
          patch("src.domain.chat.agent.AgentTools") as mock_tools:
         yield mock_completion, mock_tools
 
@@ -16,7 +25,7 @@ async def test_agent_run_retrieve_then_answer(mock_dependencies):
     
     # Setup Tools
     mock_tools = mock_tools_cls.return_value
-    mock_tools.retrieve_context = AsyncMock(return_value="Paris is the capital of France.")
+    mock_tools.retrieve = AsyncMock(return_value=_results("Paris is the capital of France."))
     
     # Setup Logic
     # 1. First Call: Decides to Retrieve
@@ -33,7 +42,8 @@ async def test_agent_run_retrieve_then_answer(mock_dependencies):
         "action_type": "answer",
         "answer": "Paris",
         "confidence_score": 0.9,
-        "citations": ["doc1"]
+        "citations": ["doc1"],
+        "rationale": "Found in context"
     })
     
     mock_completion.side_effect = [response_1, response_2]
@@ -52,7 +62,7 @@ async def test_agent_run_retrieve_then_answer(mock_dependencies):
     assert AgentState.DONE in states
     
     # Check tool call
-    mock_tools.retrieve_context.assert_called_with("Capital of France")
+    mock_tools.retrieve.assert_called_with("Capital of France")
     
     # Check final answer
     last_step = steps[-1]
@@ -77,3 +87,165 @@ async def test_agent_run_retrieve_then_answer(mock_dependencies):
     actions = [s.action.action_type for s in steps if s.action]
     assert "retrieve" in actions
     assert "answer" in actions
+
+@pytest.mark.asyncio
+async def test_agent_refuses_when_budget_exhausted(mock_dependencies):
+    mock_completion, _ = mock_dependencies
+
+    router = AgentRouter()
+    router.budget_s = 0
+    steps = [s async for s in router.run("What is capital of France?")]
+
+    mock_completion.assert_not_called()
+    assert steps[-1].state == AgentState.REFUSING
+    assert steps[-1].action.reason == "Took too long to answer"
+
+@pytest.mark.asyncio
+async def test_budget_cuts_a_slow_tool_call_short(mock_dependencies):
+    mock_completion, mock_tools_cls = mock_dependencies
+    mock_tools = mock_tools_cls.return_value
+
+    async def slow_retrieve(query):
+        await asyncio.sleep(10)
+    mock_tools.retrieve = slow_retrieve
+    mock_completion.side_effect = [
+        _decision(action_type="retrieve", query="capital of France", rationale="Need facts"),
+    ]
+
+    router = AgentRouter()
+    router.budget_s = 0.2
+    started = time.monotonic()
+    steps = [s async for s in router.run("What is capital of France?")]
+
+    assert time.monotonic() - started < 2.0
+    assert steps[-1].state == AgentState.REFUSING
+    assert steps[-1].action.reason == "Took too long to answer"
+
+def _decision(**data) -> MagicMock:
+    response = MagicMock()
+    response.choices[0].message.content = json.dumps(data)
+    return response
+
+@pytest.mark.asyncio
+async def test_speculative_retrieval_is_reused(mock_dependencies):
+    mock_completion, mock_tools_cls = mock_dependencies
+    mock_tools = mock_tools_cls.return_value
+    mock_tools.retrieve = AsyncMock(return_value=_results("Paris is the capital of France."))
+    mock_completion.side_effect = [
+        _decision(action_type="retrieve", query="what is capital of france?", rationale="Need facts"),
+        _decision(action_type="answer", answer="Paris", confidence_score=0.9, citations=["doc1"], rationale="Found"),
+    ]
+    from src.domain.chat.speculation import speculation_stats
+    hits_before = speculation_stats.hits
+
+    router = AgentRouter(speculative=True)
+    with patch("src.domain.chat.speculation.EmbeddingService") as mock_embeddings:
+        mock_embeddings.return_value.aembed_query = AsyncMock(return_value=[1.0, 0.0])
+        steps = [s async for s in router.run("What is capital of France?")]
+
+    # Only the speculative call: the planner's query matched the user's
+    mock_tools.retrieve.assert_awaited_once_with("What is capital of France?", query_vector=[1.0, 0.0])
+    assert steps[-1].state == AgentState.DONE
+    assert speculation_stats.hits == hits_before + 1
+
+@pytest.mark.asyncio
+async def test_speculative_retrieval_cancelled_for_different_query(mock_dependencies):
+    mock_completion, mock_tools_cls = mock_dependencies
+    mock_tools = mock_tools_cls.return_value
+    mock_tools.retrieve = AsyncMock(return_value=_results("context"))
+    mock_completion.side_effect = [
+        _decision(action_type="retrieve", query="french government seat", rationale="Rephrase"),
+        _decision(action_type="refuse", reason="unknown", rationale="No info"),
+    ]
+
+    router = AgentRouter(speculative=True)
+    with patch("src.domain.chat.speculation.EmbeddingService") as mock_embeddings:
+        mock_embeddings.return_value.aembed_query = AsyncMock(side_effect=[[1.0, 0.0], [0.0, 1.0]])
+        [s async for s in router.run("What is capital of France?")]
+
+    mock_tools.retrieve.assert_any_await("french government seat")
+
+@pytest.mark.asyncio
+async def test_speculation_embeds_the_user_query_once(mock_dependencies):
+    mock_completion, mock_tools_cls = mock_dependencies
+    mock_tools = mock_tools_cls.return_value
+    mock_tools.retrieve = AsyncMock(return_value=_results("Paris is the capital of France."))
+    mock_completion.side_effect = [
+        _decision(action_type="retrieve", query="France capital city", rationale="Rephrase"),
+        _decision(action_type="answer", answer="Paris", confidence_score=0.9, citations=["doc1"], rationale="Found"),
+    ]
+
+    router = AgentRouter(speculative=True)
+    with patch("src.domain.chat.speculation.EmbeddingService") as mock_embeddings:
+        embed = mock_embeddings.return_value.aembed_query = AsyncMock(side_effect=[[1.0, 0.0], [0.99, 0.1]])
+        steps = [s async for s in router.run("What is capital of France?")]
+
+    # The speculative search and the similarity check share the user query's vector
+    assert [c.args[0] for c in embed.await_args_list] == ["What is capital of France?", "France capital city"]
+    mock_tools.retrieve.assert_awaited_once_with("What is capital of France?", query_vector=[1.0, 0.0])
+    assert steps[-1].state == AgentState.DONE
+
+@pytest.mark.asyncio
+async def test_agent_multi_retrieve_in_one_step(mock_dependencies):
+    mock_completion, mock_tools_cls = mock_dependencies
+    mock_tools = mock_tools_cls.return_value
+    mock_tools.retrieve_many = AsyncMock(return_value=_results("Paris.", "Berlin."))
+    mock_completion.side_effect = [
+        _decision(action_type="multi_retrieve", queries=["capital of France", "capital of Germany"], rationale="Two facts"),
+        _decision(action_type="answer", answer="Paris and Berlin", confidence_score=0.9, citations=["doc1"], rationale="Found"),
+    ]
+
+    router = AgentRouter()
+    steps = [s async for s in router.run("Capitals of France and Germany?")]
+
+    mock_tools.retrieve_many.assert_awaited_once_with(["capital of France", "capital of Germany"])
+    assert mock_completion.await_count == 2
+    assert steps[-1].state == AgentState.DONE
+
+@pytest.mark.asyncio
+async def test_agent_history_and_context_are_scoped_per_run(mock_dependencies):
+    mock_completion, mock_tools_cls = mock_dependencies
+    mock_tools = mock_tools_cls.return_value
+    mock_tools.retrieve = AsyncMock(return_value=_results("Paris is the capital of France."))
+    retrieve = _decision(action_type="retrieve", query="capital", rationale="Need facts")
+    answer = _decision(action_type="answer", answer="Paris", confidence_score=0.9, citations=["doc1"], rationale="Found")
+    mock_completion.side_effect = [retrieve, answer, retrieve, answer]
+
+    router = AgentRouter()
+    first = [s async for s in router.run("Capital of France?")]
+    second = [s async for s in router.run("Capital of France?")]
+
+    first_prompt = mock_completion.await_args_list[1].kwargs["messages"]
+    second_prompt = mock_completion.await_args_list[3].kwargs["messages"]
+    assert len(second_prompt) == len(first_prompt)
+    # The chunk is sent once, in the context section, not again as a tool output
+    assert sum("Paris is the capital" in m["content"] for m in second_prompt) == 1
+    assert second[-1].prompt_tokens == first[-1].prompt_tokens > 0
+
+@pytest.mark.asyncio
+async def test_fast_path_planner_skips_first_llm_call(mock_dependencies):
+    mock_completion, mock_tools_cls = mock_dependencies
+    mock_tools = mock_tools_cls.return_value
+    mock_tools.retrieve = AsyncMock(return_value=_results("Paris is the capital of France."))
+    mock_completion.side_effect = [
+        _decision(action_type="answer", answer="Paris", confidence_score=0.9, citations=["doc1"], rationale="Found"),
+    ]
+
+    router = AgentRouter(planner_policy="fast_path")
+    steps = [s async for s in router.run("  What is capital of France? ")]
+
+    mock_tools.retrieve.assert_awaited_once_with("What is capital of France?")
+    assert steps[-1].state == AgentState.DONE
+    assert (router.llm_calls, router.llm_calls_saved) == (1, 1)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("query", ["   ", "x" * 5000])
+async def test_fast_path_planner_refuses_locally(mock_dependencies, query):
+    mock_completion, _ = mock_dependencies
+
+    router = AgentRouter(planner_policy="fast_path")
+    steps = [s async for s in router.run(query)]
+
+    mock_completion.assert_not_called()
+    assert steps[-1].state == AgentState.REFUSING
+    assert router.llm_calls == 0
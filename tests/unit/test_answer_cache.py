@@ -0,0 +1,45 @@
+import time
+import numpy as np
+from src.domain.chat.answer_cache import SemanticAnswerCache
+from src.domain.chat.models import AgentState, AgentStep
+from src.infrastructure.db.registry import corpus_generation
+
+def _steps() -> list:
+    return [AgentStep(state=AgentState.DONE, thought="Decided to answer", timestamp=time.time())]
+
+def test_paraphrase_hits_and_unrelated_misses():
+    cache = SemanticAnswerCache(max_entries=4, threshold=0.9)
+    cache.store([1.0, 0.0, 0.0], "Can I wear a hat?", "No.", _steps(), corpus_generation.value)
+
+    hit = cache.lookup([0.95, 0.1, 0.0])
+    assert hit is not None and hit.answer == "No."
+    assert hit.similarity > 0.9
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_corpus_change_invalidates():
+    cache = SemanticAnswerCache(max_entries=4, threshold=0.9)
+    generation = corpus_generation.value
+    cache.store([1.0, 0.0], "q", "a", _steps(), generation)
+
+    corpus_generation.bump()
+
+    assert cache.lookup([1.0, 0.0]) is None
+    # An answer computed against the old corpus is not stored either
+    cache.store([1.0, 0.0], "q", "a", _steps(), generation)
+    assert cache.stats()["entries"] == 0
+
+def test_lru_eviction_keeps_recently_used():
+    cache = SemanticAnswerCache(max_entries=2, threshold=0.99)
+    generation = corpus_generation.value
+    basis = np.eye(3, dtype=np.float32)
+    cache.store(basis[0], "a", "A", _steps(), generation)
+    cache.store(basis[1], "b", "B", _steps(), generation)
+    cache.lookup(basis[0])
+
+    cache.store(basis[2], "c", "C", _steps(), generation)
+
+    assert cache.lookup(basis[0]).answer == "A"
+    assert cache.lookup(basis[1]) is None
+    assert cache.lookup(basis[2]).answer == "C"
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.domain.chat.compression import ContextCompressor
+from src.services.retrieval import RetrievalResult
+
+VOCAB = ["caps", "exams", "library", "parking", "fees"]
+
+def _embed(text: str) -> np.ndarray:
+    words = text.lower().replace(".", " ").split()
+    return np.array([float(words.count(w)) for w in VOCAB] + [0.1], dtype=np.float32)
+
+@pytest.fixture
+def embedding_service():
+    service = MagicMock()
+    service.aembed_documents = AsyncMock(side_effect=lambda texts: np.stack([_embed(t) for t in texts]))
+    service.aembed_query = AsyncMock(side_effect=lambda text: _embed(text).tolist())
+    return service
+
+def _chunk(chunk_id: str, content: str) -> RetrievalResult:
+    return RetrievalResult(
+        chunk_id=chunk_id,
+        content=content,
+        score=0.8,
+        metadata={"filename": "handbook.pdf", "version_number": 1, "is_latest": False}
+    )
+
+@pytest.mark.asyncio
+async def test_keeps_relevant_sentences_in_order_with_metadata(embedding_service):
+    compressor = ContextCompressor(embedding_service, max_sentences=2, max_chars=80)
+    chunk = _chunk("a", "The library opens at 9. Caps are banned in exams. Parking fees are due monthly. Exams start at 10 with caps removed.")
+
+    [result] = await compressor.compress("caps in exams", [chunk])
+
+    assert result.content == "Caps are banned in exams. Exams start at 10 with caps removed."
+    assert result.metadata["is_latest"] is False
+    assert result.metadata["filename"] == "handbook.pdf"
+    assert result.metadata["compressed_from_chars"] == len(chunk.content)
+
+@pytest.mark.asyncio
+async def test_sentence_embeddings_are_cached_per_chunk(embedding_service):
+    compressor = ContextCompressor(embedding_service, max_sentences=1, max_chars=40)
+    chunk = _chunk("a", "The library opens at 9. Caps are banned in exams. Parking fees are due monthly.")
+    short = _chunk("b", "Fees are due.")
+
+    first = await compressor.compress("library", [chunk, short])
+    second = await compressor.compress("parking fees", [chunk, short])
+
+    assert embedding_service.aembed_documents.await_count == 1
+    assert first[0].content == "The library opens at 9."
+    assert second[0].content == "Parking fees are due monthly."
+    # Short chunks pass through untouched
+    assert second[1] is short
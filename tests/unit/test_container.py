@@ -0,0 +1,70 @@
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from src.app.core.container import ServiceContainer, get_container
+from src.app.main import app
+from src.infrastructure.db.qdrant import QdrantHandler
+from src.infrastructure.db.registry import DocumentRegistry
+from src.infrastructure.db.sparse_index import SparseIndex
+
+@pytest_asyncio.fixture
+async def container(tmp_path):
+    with patch("src.app.core.container.EmbeddingCache"):
+        container = ServiceContainer(
+            qdrant=QdrantHandler(use_memory=True),
+            registry=DocumentRegistry(db_path=str(tmp_path / "registry.db")),
+            sparse_index=SparseIndex(path=None)
+        )
+    yield container
+    await container.qdrant.client.close()
+
+@pytest.mark.asyncio
+async def test_container_shares_one_object_graph(container):
+    assert container.retriever.qdrant is container.qdrant
+    assert container.ingestion.qdrant is container.qdrant
+    assert container.retriever.embedding_service is container.embedding_service
+    assert container.tools.retriever is container.retriever
+    assert container.agent() is not container.agent()
+    assert container.agent().tools is container.tools
+
+@pytest.mark.asyncio
+async def test_startup_prepares_collection_even_if_model_cannot_load(container):
+    with patch("src.app.core.container.model_registry.get", side_effect=OSError("offline")):
+        await container.startup(warmup=True)
+
+    assert await container.qdrant.count() == 0
+
+def test_endpoints_use_injected_container(container):
+    container.sparse_index.add("p1", "Caps may not be worn in exams.", {
+        "chunk_id": "p1", "content": "Caps may not be worn in exams.", "logical_doc_id": "d", "versions": [1]
+    })
+    app.dependency_overrides[get_container] = lambda: container
+    try:
+        response = TestClient(app).post(
+            "/api/v1/search/", params={"query": "caps exams", "mode": "sparse", "latest_only": False}
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()[0]["chunk_id"] == "p1"
+
+def test_search_for_an_explicit_old_version(container):
+    lid = container.registry.upsert_document("handbook.pdf", "hash-v1", version=1)
+    container.registry.upsert_document("handbook.pdf", "hash-v2", lid, version=2)
+    for version in (1, 2):
+        container.sparse_index.add(f"p{version}", f"Caps rule, edition {version}.", {
+            "chunk_id": f"p{version}", "content": f"Caps rule, edition {version}.",
+            "logical_doc_id": lid, "versions": [version]
+        })
+    app.dependency_overrides[get_container] = lambda: container
+    try:
+        client = TestClient(app)
+        old = client.post("/api/v1/search/", params={"query": "caps rule", "mode": "sparse", "version": 1})
+        latest = client.post("/api/v1/search/", params={"query": "caps rule", "mode": "sparse"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [r["chunk_id"] for r in old.json()] == ["p1"]
+    assert [r["chunk_id"] for r in latest.json()] == ["p2"]
@@ -0,0 +1,44 @@
+from litellm import token_counter
+from src.domain.chat.context import ContextManager
+from src.services.retrieval import RetrievalResult
+
+def _result(chunk_id: str, score: float, words: int = 50) -> RetrievalResult:
+    return RetrievalResult(
+        chunk_id=chunk_id,
+        content=" ".join([f"{chunk_id}word"] * words),
+        score=score,
+        metadata={"filename": "h.pdf", "version_number": 1}
+    )
+
+def test_chunks_are_deduplicated_by_id_keeping_best_score():
+    context = ContextManager(model="gpt-3.5-turbo")
+
+    assert context.add([_result("a", 0.5), _result("b", 0.4)]) == 2
+    assert context.add([_result("a", 0.9)]) == 0
+
+    assert context.chunks["a"].score == 0.9
+
+def test_budget_drops_lowest_scoring_chunks():
+    context = ContextManager(model="gpt-3.5-turbo", max_prompt_tokens=10_000)
+    context.add([_result("low", 0.1), _result("high", 0.9), _result("mid", 0.5)])
+    _, full_tokens = context.build_messages("system", [], "question")
+
+    context.max_prompt_tokens = full_tokens - 10
+    messages, tokens = context.build_messages("system", [], "question")
+
+    assert tokens <= context.max_prompt_tokens
+    assert context.dropped == 1
+    assert "highword" in messages[-1]["content"] and "midword" in messages[-1]["content"]
+    assert "lowword" not in messages[-1]["content"]
+
+def test_token_counts_follow_the_block_text_not_the_chunk_id():
+    context = ContextManager(model="gpt-3.5-turbo", max_prompt_tokens=10_000)
+    context.add([_result("a", 0.5, words=5)])
+    context.build_messages("system", [], "question")
+
+    # A better-scoring, much longer result replaces the one kept for "a"
+    context.add([_result("a", 0.9, words=200)])
+    messages, tokens = context.build_messages("system", [], "question")
+
+    # Headers and blocks are counted separately, so allow a token of slack per split
+    assert abs(tokens - token_counter(model="gpt-3.5-turbo", messages=messages)) <= 3
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from src.infrastructure.llm.model_registry import ModelRegistry
+from src.infrastructure.llm.embeddings import EmbeddingService
+
+@pytest.fixture
+def mock_sentence_transformer():
+    with patch("src.infrastructure.llm.model_registry.SentenceTransformer") as mock_st:
+        mock_st.return_value.parameters.return_value = []
+        yield mock_st
+
+def test_registry_loads_each_model_once(mock_sentence_transformer):
+    registry = ModelRegistry()
+
+    first = registry.get("model-a")
+    second = registry.get("model-a")
+    other = registry.get("model-b")
+
+    assert first is second
+    assert registry.get("model-b") is other
+    assert mock_sentence_transformer.call_count == 2
+    stats = registry.stats()["models"]
+    assert set(stats) == {"model-a", "model-b"}
+    assert stats["model-a"]["hits"] == 1
+
+def test_registry_concurrent_get_loads_once(mock_sentence_transformer):
+    registry = ModelRegistry()
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model-a"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert mock_sentence_transformer.call_count == 1
+    assert all(r is results[0] for r in results)
+
+def test_embedding_service_is_lazy(mock_sentence_transformer):
+    with patch("src.infrastructure.llm.embeddings.model_registry", ModelRegistry()):
+        service = EmbeddingService(model_name="model-a")
+        assert mock_sentence_transformer.call_count == 0
+
+        assert service.model is service.model
+        assert mock_sentence_transformer.call_count == 1
+
+def test_embed_documents_only_encodes_cache_misses(tmp_path):
+    from src.infrastructure.llm.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.db"), max_entries=10)
+    service = EmbeddingService(model_name="model-a", cache=cache)
+    fake_model = MagicMock()
+    fake_model.encode.side_effect = lambda texts, **_: np.array([[float(len(t)), 1.0] for t in texts])
+
+    with patch("src.infrastructure.llm.embeddings.model_registry") as registry:
+        registry.get.return_value = fake_model
+        first = service.embed_documents(["alpha", "beta"])
+        second = service.embed_documents(["alpha", "gamma!", "alpha"])
+
+    assert first.tolist() == [[5.0, 1.0], [4.0, 1.0]]
+    assert second.tolist() == [[5.0, 1.0], [6.0, 1.0], [5.0, 1.0]]
+    # Second call only sent the unseen text to the model
+    assert fake_model.encode.call_args_list[1].args[0] == ["gamma!"]
+    assert cache.stats() == {"hits": 1, "misses": 3}
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    from src.infrastructure.llm.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(db_path=str(tmp_path / "cache.db"), max_entries=2)
+    cache.put_many("m", ["a"], np.ones((1, 2)))
+    cache.put_many("m", ["b"], np.ones((1, 2)))
+    cache.get_many("m", ["a"]) # touch "a" so "b" becomes the LRU entry
+    cache.put_many("m", ["c"], np.ones((1, 2)))
+
+    assert set(cache.get_many("m", ["a", "b", "c"])) == {"a", "c"}
+
+def test_default_embedding_cache_stays_out_of_the_repo(isolated_embedding_cache):
+    from src.infrastructure.llm.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache()
+
+    assert cache.db_path == str(isolated_embedding_cache)
+    assert isolated_embedding_cache.exists()
+
+@pytest.mark.asyncio
+async def test_micro_batcher_groups_concurrent_queries():
+    from src.infrastructure.llm.batching import MicroBatcher
+
+    calls = []
+    def encode_batch(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(t))] for t in texts])
+
+    batcher = MicroBatcher(encode_batch, max_batch_size=8, max_wait_ms=50)
+    results = await asyncio.gather(*(batcher.submit("x" * n) for n in range(1, 6)))
+    await batcher.close()
+
+    assert [r.tolist() for r in results] == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(calls) == 1
+    stats = batcher.stats.as_dict()
+    assert stats["batches"] == 1
+    assert stats["avg_batch_size"] == 5
+
+@pytest.mark.asyncio
+async def test_micro_batcher_respects_max_batch_size():
+    from src.infrastructure.llm.batching import MicroBatcher
+
+    batcher = MicroBatcher(lambda texts: np.zeros((len(texts), 1)), max_batch_size=2, max_wait_ms=50)
+    await asyncio.gather(*(batcher.submit("q") for _ in range(5)))
+    await batcher.close()
+
+    assert batcher.stats.max_batch_size == 2
+    assert batcher.stats.items == 5
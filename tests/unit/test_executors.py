@@ -0,0 +1,37 @@
+import threading
+import pytest
+from src.infrastructure.executors import ExecutorManager
+
+def _thread_name() -> str:
+    return threading.current_thread().name
+
+@pytest.mark.asyncio
+async def test_work_is_routed_to_the_matching_pool():
+    manager = ExecutorManager(io_workers=2, model_workers=1)
+    try:
+        assert (await manager.run_io(_thread_name)).startswith("rag-io")
+        assert (await manager.run_model(_thread_name)).startswith("rag-model")
+        assert await manager.run_io(lambda a, b=0: a + b, 1, b=2) == 3
+
+        assert manager.stats() == {"workers": {"io": 2, "model": 1}, "submitted": {"io": 2, "model": 1}}
+    finally:
+        manager.shutdown()
+
+@pytest.mark.asyncio
+async def test_pools_are_lazy_and_recreated_after_shutdown():
+    manager = ExecutorManager(io_workers=1, model_workers=1)
+    assert manager._io_pool is None and manager._model_pool is None
+
+    await manager.run_io(_thread_name)
+    first_pool = manager.io_pool
+    assert manager._model_pool is None
+
+    manager.shutdown()
+    assert manager._io_pool is None
+    with pytest.raises(RuntimeError):
+        # A pool that was shut down rejects work
+        first_pool.submit(_thread_name)
+
+    assert (await manager.run_io(_thread_name)).startswith("rag-io")
+    assert manager.io_pool is not first_pool
+    manager.shutdown()
@@ -1,8 +1,10 @@
 import pytest
+import numpy as np
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
-from pathlib import Path
-from src.services.ingestion.py import IngestionService
+from src.services.ingestion import IngestionService
+from src.infrastructure.db.registry import DocumentRegistry
+from src.infrastructure.db.sparse_index import SparseIndex
 from src.domain.documents.models import DocumentMetadata, ChunkMetadata
 
 @pytest.fixture
@@ -10,17 +12,21 @@ def mock_ingestion_components():
     with patch("src.services.ingestion.DocumentParser") as mock_parser, \
          patch("src.services.ingestion.ChunkerFactory") as mock_chunker_factory, \
          patch("src.services.ingestion.QdrantHandler") as mock_qdrant, \
-         patch("src.services.ingestion.EmbeddingService") as mock_embedding:
+         patch("src.services.ingestion.EmbeddingService") as mock_embedding, \
+         patch("src.services.ingestion.EmbeddingCache"):
          
         yield mock_parser, mock_chunker_factory, mock_qdrant, mock_embedding
 
 @pytest.mark.asyncio
-async def test_ingest_file_flow(mock_ingestion_components):
+async def test_ingest_file_flow(mock_ingestion_components, tmp_path):
     mock_parser_cls, mock_chunker_cls, mock_qdrant_cls, mock_embed_cls = mock_ingestion_components
     
     # Setup Instances
     mock_parser = mock_parser_cls.return_value
     mock_qdrant = mock_qdrant_cls.return_value
+    mock_qdrant.create_collection_if_not_exists = AsyncMock()
+    mock_qdrant.upsert_vectors = AsyncMock()
+    mock_qdrant.tag_points_with_version = AsyncMock()
     mock_embed = mock_embed_cls.return_value
     mock_chunker = MagicMock()
     mock_chunker_cls.return_value.get_chunker.return_value = mock_chunker
@@ -37,19 +43,253 @@ async def test_ingest_file_flow(mock_ingestion_components):
         ChunkMetadata(doc_id=doc_id, start_char_idx=13, end_char_idx=27) # "This is a test"
     ]
     
-    mock_embed.embed_documents.return_value = [[0.1]*384, [0.2]*384]
+    mock_embed.aembed_documents = AsyncMock(return_value=np.array([[0.1]*384, [0.2]*384], dtype=np.float32))
     
     # Run
-    service = IngestionService()
-    await service.ingest_file(Path("dummy.txt"))
+    dummy = tmp_path / "dummy.txt"
+    dummy.write_text("Hello World. This is a test.")
+    service = IngestionService(
+        registry=DocumentRegistry(db_path=str(tmp_path / "registry.db")),
+        sparse_index=SparseIndex(path=None)
+    )
+    await service.ingest_file(dummy)
     
     # Verify
     mock_parser.parse.assert_called_once()
     mock_chunker.chunk.assert_called_once()
-    mock_embed.embed_documents.assert_called_once()
-    mock_qdrant.upsert_points.assert_called_once()
+    mock_embed.aembed_documents.assert_called_once()
+    mock_qdrant.upsert_vectors.assert_called_once()
     
     # Verify payload in upsert
-    call_args = mock_qdrant.upsert_points.call_args[0][0]
-    assert len(call_args) == 2
-    assert call_args[0].payload['content'] == "Hello World"
+    ids, vectors, payloads = mock_qdrant.upsert_vectors.call_args[0]
+    assert len(ids) == 2
+    assert vectors.shape == (2, 384)
+    assert payloads[0]['content'] == "Hello World"
+
+@pytest.mark.asyncio
+async def test_new_version_only_embeds_changed_chunks(tmp_path):
+    from src.infrastructure.db.qdrant import QdrantHandler
+    from src.domain.documents.models import SearchFilters
+
+    qdrant = QdrantHandler(use_memory=True)
+    registry = DocumentRegistry(db_path=str(tmp_path / "registry.db"))
+    with patch("src.services.ingestion.EmbeddingCache"):
+        service = IngestionService(qdrant_handler=qdrant, registry=registry, sparse_index=SparseIndex(path=None))
+    embed = AsyncMock(side_effect=lambda texts: np.ones((len(texts), 384), dtype=np.float32))
+    service.embedding_service.aembed_documents = embed
+
+    doc = tmp_path / "handbook.txt"
+    doc.write_text("Rule 1: no hats.\n\nRule 2: no running.\n\nRule 3: be kind.")
+    await service.ingest_file(doc, strategy="recursive")
+    doc.write_text("Rule 1: hats on Fridays.\n\nRule 2: no running.\n\nRule 3: be kind.")
+    await service.ingest_file(doc, strategy="recursive")
+
+    # v2 only embedded the one changed paragraph
+    assert [len(c.args[0]) for c in embed.call_args_list] == [3, 1]
+    assert await qdrant.count() == 4
+
+    record = registry.get_by_filename("handbook.txt")
+    v2_points = {e.point_id for e in registry.get_manifest(record.logical_id, 2)}
+    v1_points = {e.point_id for e in registry.get_manifest(record.logical_id, 1)}
+    assert len(v1_points & v2_points) == 2
+
+    visible = await qdrant.search(
+        [1.0] * 384, limit=10,
+        filters=SearchFilters(latest_only=True),
+        current_versions=registry.get_current_versions()
+    )
+    assert sorted(p.payload["content"] for p in visible) == [
+        "Rule 1: hats on Fridays.", "Rule 2: no running.", "Rule 3: be kind."
+    ]
+
+@pytest.mark.asyncio
+async def test_reingest_after_rollback_does_not_reuse_a_version(tmp_path):
+    from src.infrastructure.db.qdrant import QdrantHandler
+    from src.domain.documents.models import SearchFilters
+
+    qdrant = QdrantHandler(use_memory=True)
+    registry = DocumentRegistry(db_path=str(tmp_path / "registry.db"))
+    with patch("src.services.ingestion.EmbeddingCache"):
+        service = IngestionService(qdrant_handler=qdrant, registry=registry, sparse_index=SparseIndex(path=None))
+    service.embedding_service.aembed_documents = AsyncMock(
+        side_effect=lambda texts: np.ones((len(texts), 384), dtype=np.float32)
+    )
+
+    doc = tmp_path / "handbook.txt"
+    for text in ["Rule 1: no hats.", "Rule 1: hats on Fridays.", "Rule 1: hats always."]:
+        doc.write_text(text)
+        await service.ingest_file(doc, strategy="recursive")
+    lid = registry.get_by_filename("handbook.txt").logical_id
+    registry.set_current_version(lid, 1)
+
+    doc.write_text("Rule 1: caps only.")
+    await service.ingest_file(doc, strategy="recursive")
+
+    assert registry.get_by_filename("handbook.txt").current_version == 4
+    assert [v.version for v in registry.list_versions(lid)] == [1, 2, 3, 4]
+    visible = await qdrant.search(
+        [1.0] * 384, limit=10,
+        filters=SearchFilters(latest_only=True),
+        current_versions=registry.get_current_versions()
+    )
+    # The old v2 chunks must not come back as "latest"
+    assert [p.payload["content"] for p in visible] == ["Rule 1: caps only."]
+
+@pytest.mark.asyncio
+async def test_failed_upsert_leaves_carried_forward_chunks_untagged(tmp_path):
+    from src.infrastructure.db.qdrant import QdrantHandler
+
+    qdrant = QdrantHandler(use_memory=True)
+    registry = DocumentRegistry(db_path=str(tmp_path / "registry.db"))
+    sparse = SparseIndex(path=None)
+    with patch("src.services.ingestion.EmbeddingCache"):
+        service = IngestionService(qdrant_handler=qdrant, registry=registry, sparse_index=sparse)
+    service.embedding_service.aembed_documents = AsyncMock(
+        side_effect=lambda texts: np.ones((len(texts), 384), dtype=np.float32)
+    )
+
+    doc = tmp_path / "handbook.txt"
+    doc.write_text("Rule 1: no hats.\n\nRule 2: no running.")
+    await service.ingest_file(doc, strategy="recursive")
+    doc.write_text("Rule 1: hats on Fridays.\n\nRule 2: no running.")
+    with patch.object(qdrant, "upsert_vectors", AsyncMock(side_effect=RuntimeError("qdrant down"))):
+        with pytest.raises(RuntimeError):
+            await service.ingest_file(doc, strategy="recursive")
+
+    async def payloads():
+        points, _ = await qdrant.client.scroll(qdrant.collection_name, limit=10)
+        return {p.payload["content"]: p.payload for p in points}
+
+    shared = (await payloads())["Rule 2: no running."]
+    assert shared["versions"] == [1]
+    assert [p["versions"] for p in sparse._payloads.values()] == [[1], [1]]
+
+    await service.ingest_file(doc, strategy="recursive")
+    shared = (await payloads())["Rule 2: no running."]
+    # Tagged into v3 (v2 was reserved by the failed ingest), but still
+    # labelled with the version that introduced it
+    assert shared["versions"] == [1, 3] and shared["version_number"] == 1
+
+@pytest.mark.asyncio
+async def test_failed_second_batch_does_not_leak_into_a_later_version(tmp_path):
+    from src.infrastructure.db.qdrant import QdrantHandler
+    from src.domain.documents.models import SearchFilters
+
+    qdrant = QdrantHandler(use_memory=True)
+    registry = DocumentRegistry(db_path=str(tmp_path / "registry.db"))
+    with patch("src.services.ingestion.EmbeddingCache"):
+        service = IngestionService(qdrant_handler=qdrant, registry=registry, sparse_index=SparseIndex(path=None))
+    service.embedding_service.aembed_documents = AsyncMock(
+        side_effect=lambda texts: np.ones((len(texts), 384), dtype=np.float32)
+    )
+
+    doc = tmp_path / "handbook.txt"
+    doc.write_text("Rule 1: no hats.")
+    await service.ingest_file(doc, strategy="recursive")
+    lid = registry.get_by_filename("handbook.txt").logical_id
+
+    # v2: the first batch lands, the second one fails
+    doc.write_text("Rule 1: hats on Fridays.\n\nRule 2: no running.")
+    upsert = qdrant.client.upsert
+    calls = 0
+    async def flaky_upsert(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("qdrant down")
+        return await upsert(*args, **kwargs)
+    original_upsert_vectors = qdrant.upsert_vectors
+    async def one_point_batches(ids, vectors, payloads):
+        await original_upsert_vectors(ids, vectors, payloads, batch_size=1, parallelism=1)
+    with patch.object(qdrant.client, "upsert", flaky_upsert), \
+         patch.object(qdrant, "upsert_vectors", one_point_batches):
+        with pytest.raises(RuntimeError):
+            await service.ingest_file(doc, strategy="recursive")
+
+    doc.write_text("Rule 1: caps only.")
+    await service.ingest_file(doc, strategy="recursive")
+
+    assert registry.get_by_filename("handbook.txt").current_version == 3
+    assert [v.version for v in registry.list_versions(lid)] == [1, 3]
+    with pytest.raises(ValueError):
+        registry.set_current_version(lid, 2)
+    visible = await qdrant.search(
+        [1.0] * 384, limit=10,
+        filters=SearchFilters(latest_only=True),
+        current_versions=registry.get_current_versions()
+    )
+    # Half-written v2 chunks must not surface as part of v3
+    assert [p.payload["content"] for p in visible] == ["Rule 1: caps only."]
+
+def test_upload_is_hashed_once_and_unchanged_reupload_skips_parsing(tmp_path):
+    import hashlib
+    from fastapi.testclient import TestClient
+    from src.app.core.container import ServiceContainer, get_container
+    from src.app.main import app
+    from src.infrastructure.db.qdrant import QdrantHandler
+
+    with patch("src.app.core.container.EmbeddingCache"):
+        container = ServiceContainer(
+            qdrant=QdrantHandler(use_memory=True),
+            registry=DocumentRegistry(db_path=str(tmp_path / "registry.db")),
+            sparse_index=SparseIndex(path=None)
+        )
+    service = container.ingestion
+    service.embedding_service.aembed_documents = AsyncMock(
+        side_effect=lambda texts: np.ones((len(texts), 384), dtype=np.float32)
+    )
+    body = b"Caps may not be worn in exams. " * 50
+
+    app.dependency_overrides[get_container] = lambda: container
+    try:
+        client = TestClient(app)
+        with patch.object(service, "_compute_hash") as compute_hash, \
+             patch.object(service.parser, "_calculate_hash") as calculate_hash, \
+             patch.object(service.parser, "parse", wraps=service.parser.parse) as parse:
+            first = client.post("/api/v1/ingest/", params={"strategy": "fixed"}, files={"file": ("rules.txt", body)})
+            second = client.post("/api/v1/ingest/", params={"strategy": "fixed"}, files={"file": ("rules.txt", body)})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert first.status_code == 201 and second.status_code == 200
+    assert first.json()["filename"] == second.json()["filename"] == "rules.txt"
+    assert second.json()["content_hash"] == hashlib.sha256(body).hexdigest()
+    compute_hash.assert_not_called()
+    calculate_hash.assert_not_called()
+    parse.assert_called_once()
+    assert service.registry.get_by_filename("rules.txt").current_version == 1
+
+@pytest.mark.asyncio
+async def test_sparse_index_saves_are_debounced_across_ingests(tmp_path):
+    import asyncio
+    from src.infrastructure.db.qdrant import QdrantHandler
+
+    sparse = SparseIndex(path=str(tmp_path / "sparse.json.gz"))
+    with patch("src.services.ingestion.EmbeddingCache"):
+        service = IngestionService(
+            qdrant_handler=QdrantHandler(use_memory=True),
+            registry=DocumentRegistry(db_path=str(tmp_path / "registry.db")),
+            sparse_index=sparse,
+            sparse_save_delay_s=0.2
+        )
+    service.embedding_service.aembed_documents = AsyncMock(
+        side_effect=lambda texts: np.ones((len(texts), 384), dtype=np.float32)
+    )
+
+    with patch.object(sparse, "save", wraps=sparse.save) as save:
+        for name in ["a.txt", "b.txt", "c.txt"]:
+            doc = tmp_path / name
+            doc.write_text(f"Rules of {name}.")
+            await service.ingest_file(doc, strategy="recursive")
+        save.assert_not_called()
+        await asyncio.sleep(0.4)
+        save.assert_called_once()
+        assert len(SparseIndex(path=sparse.path)) == 3
+
+        # Shutdown flushes what is still waiting for the timer
+        doc = tmp_path / "d.txt"
+        doc.write_text("Rules of d.")
+        await service.ingest_file(doc, strategy="recursive")
+        await service.close()
+    assert save.call_count == 2 and not sparse.dirty
+    assert len(SparseIndex(path=sparse.path)) == 4
@@ -0,0 +1,80 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from src.infrastructure.llm.client import LLMBudgetExceeded, LLMClient, LLMCallStats
+
+def _response(content: str):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
+
+def _client(**kwargs) -> LLMClient:
+    client = LLMClient(model="test/model", **kwargs)
+    # Isolated from the process-wide per-model stats
+    client.stats = LLMCallStats()
+    return client
+
+@pytest.mark.asyncio
+async def test_slow_attempt_times_out_and_is_retried():
+    calls = []
+
+    async def fake_acompletion(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return _response('{"ok": true}')
+
+    client = _client(timeout_s=0.05, max_attempts=3)
+    with patch("src.infrastructure.llm.client.acompletion", fake_acompletion):
+        content = await client.complete([{"role": "user", "content": "hi"}])
+
+    assert content == '{"ok": true}'
+    assert len(calls) == 2
+    assert client.stats.timeouts == 1 and client.stats.retries == 1
+
+@pytest.mark.asyncio
+async def test_deadline_caps_attempts():
+    async def fake_acompletion(**kwargs):
+        await asyncio.sleep(10)
+
+    client = _client(timeout_s=5.0, max_attempts=5)
+    with patch("src.infrastructure.llm.client.acompletion", fake_acompletion):
+        started = time.monotonic()
+        with pytest.raises((asyncio.TimeoutError, LLMBudgetExceeded)):
+            await client.complete([], deadline=time.monotonic() + 0.1)
+
+    assert time.monotonic() - started < 5.0
+
+@pytest.mark.asyncio
+async def test_retry_backoff_does_not_sleep_past_the_deadline():
+    async def fake_acompletion(**kwargs):
+        raise asyncio.TimeoutError()
+
+    client = _client(timeout_s=5.0, max_attempts=5)
+    with patch("src.infrastructure.llm.client.acompletion", fake_acompletion), \
+         patch("src.infrastructure.llm.client.settings.LLM_RETRY_MAX_WAIT_S", 30.0), \
+         patch("tenacity.wait.random.uniform", lambda low, high: high):
+        started = time.monotonic()
+        with pytest.raises(LLMBudgetExceeded):
+            await client.complete([], deadline=time.monotonic() + 0.1)
+
+    assert time.monotonic() - started < 0.5
+
+@pytest.mark.asyncio
+async def test_hedge_fires_after_p95_and_wins():
+    calls = []
+
+    async def fake_acompletion(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return _response("hedged")
+
+    client = _client(timeout_s=2.0, max_attempts=1, hedge=True)
+    client.stats.latencies.extend([0.01] * 50)
+    with patch("src.infrastructure.llm.client.acompletion", fake_acompletion):
+        content = await client.complete([])
+
+    assert content == "hedged"
+    assert client.stats.hedges_fired == 1 and client.stats.hedges_won == 1
@@ -33,3 +33,47 @@ async def test_parse_txt_file(parser, tmp_path):
     assert metadata.filename == "test.txt"
     assert metadata.file_type == "txt"
     assert metadata.content_hash is not None
+
+@pytest.mark.asyncio
+async def test_converted_documents_are_cached_by_content(tmp_path):
+    from unittest.mock import AsyncMock
+    from src.domain.documents.parse_cache import ParseCache
+
+    pool = MagicMock()
+    pool.convert = AsyncMock(return_value=("# Policy\n\nText", 3))
+    cache = ParseCache(directory=str(tmp_path / "cache"), max_bytes=10_000_000)
+    with patch('src.domain.documents.parser.DocumentConverter'):
+        parser = DocumentParser(pool=pool, cache=cache)
+
+    first = tmp_path / "a.pdf"
+    first.write_bytes(b"%PDF same bytes")
+    renamed = tmp_path / "upload_tmp.pdf"
+    renamed.write_bytes(b"%PDF same bytes")
+
+    content, metadata = await parser.parse(first)
+    again, renamed_metadata = await parser.parse(renamed)
+
+    pool.convert.assert_awaited_once()
+    assert again == content == "# Policy\n\nText"
+    assert renamed_metadata.page_count == 3 and renamed_metadata.filename == "upload_tmp.pdf"
+    assert cache.stats()["hits"] == 1
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    import os
+    import time
+    from src.domain.documents.parse_cache import ParseCache
+
+    cache = ParseCache(directory=str(tmp_path), max_bytes=10_000_000)
+    for i, key in enumerate(["old", "used", "new"]):
+        cache.put(key, os.urandom(2000).hex(), 1)
+        os.utime(cache._path(key), (time.time() - 100 + i, time.time() - 100 + i))
+    assert cache.get("old") is not None # Now the most recently used
+
+    cache.max_bytes = cache.stats()["bytes"] - 1
+    cache.put("newest", "x", 1)
+    assert cache.get("used") is None
+    assert cache.get("old") is not None and cache.get("newest") is not None
+
+    # Corrupt entries are dropped instead of failing the parse
+    cache._path("newest").write_bytes(b"not gzip")
+    assert cache.get("newest") is None and not cache._path("newest").exists()
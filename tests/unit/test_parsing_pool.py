@@ -0,0 +1,50 @@
+import os
+import time
+import pytest
+from src.domain.documents.exceptions import ParsingError
+from src.domain.documents.parsing_pool import ParsingPool
+
+# Module-level so spawned workers can unpickle them
+def _pid(_: int = 0) -> int:
+    return os.getpid()
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+@pytest.fixture
+def pool():
+    pool = ParsingPool(workers=1, timeout_s=30, max_docs_per_worker=1, memory_limit_mb=0, warm_converter=False)
+    yield pool
+    pool.shutdown(wait=False)
+
+@pytest.mark.asyncio
+async def test_workers_are_recycled(pool):
+    first = await pool.run(_pid)
+    second = await pool.run(_pid)
+
+    assert first != second != os.getpid()
+    assert pool.stats()["documents"] == 2
+
+@pytest.mark.asyncio
+async def test_timeout_kills_and_rebuilds_pool(pool):
+    with pytest.raises(ParsingError, match="exceeded"):
+        await pool.run(_sleep, 30, timeout_s=0.5)
+
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["restarts"] == 1
+    assert await pool.run(_sleep, 0) == 0
+
+def _allocate(megabytes: int) -> int:
+    block = bytearray(megabytes * 1024 * 1024)
+    time.sleep(5)
+    return len(block)
+
+@pytest.mark.asyncio
+async def test_worker_over_memory_limit_is_killed():
+    pool = ParsingPool(workers=1, timeout_s=30, max_docs_per_worker=0, memory_limit_mb=150, warm_converter=False)
+    try:
+        with pytest.raises(ParsingError, match="died"):
+            await pool.run(_allocate, 300)
+        assert pool.stats()["memory_kills"] == 2  # Retried once, killed again
+    finally:
+        pool.shutdown(wait=False)
@@ -0,0 +1,81 @@
+import pytest
+import numpy as np
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+from src.services.ingestion import IngestionJob
+from src.services.pipeline import IngestionPipeline
+from src.domain.documents.models import DocumentMetadata
+
+def _job(name: str, chunks: int) -> IngestionJob:
+    job = IngestionJob(
+        filename=name, content_hash="h", logical_id=name, version=1, is_update=False, content="",
+        metadata=DocumentMetadata(filename=name, file_type="txt", content_hash="h")
+    )
+    job.texts = {f"{name}-{i}": f"{name} chunk {i}" for i in range(chunks)}
+    return job
+
+@pytest.fixture
+def service():
+    service = MagicMock()
+    jobs = {"a.txt": 3, "b.txt": 2, "bad.txt": 1, "same.txt": 0}
+
+    async def prepare(path: Path, filename=None):
+        if path.name == "bad.txt":
+            raise ValueError("corrupt")
+        if path.name == "same.txt":
+            return None # Unchanged
+        return _job(path.name, jobs[path.name])
+
+    async def chunk(job, strategy):
+        job.new_ids = list(job.texts)
+
+    service.prepare = AsyncMock(side_effect=prepare)
+    service.chunk = AsyncMock(side_effect=chunk)
+    service.embedding_service.aembed_documents = AsyncMock(
+        side_effect=lambda texts: np.arange(len(texts), dtype=np.float32)[:, None].repeat(4, axis=1)
+    )
+    service.publish = AsyncMock()
+    service.flush_sparse_index = AsyncMock()
+    return service
+
+@pytest.mark.asyncio
+async def test_pipeline_batches_across_documents_and_isolates_failures(service):
+    pipeline = IngestionPipeline(
+        service, parse_workers=2, chunk_workers=2, upsert_workers=2,
+        embed_batch_size=5, embed_max_wait_ms=1000, queue_size=2
+    )
+    files = [Path("a.txt"), Path("bad.txt"), Path("b.txt"), Path("same.txt")]
+    published = await pipeline.run(files)
+
+    assert sorted(m.filename for m in published) == ["a.txt", "b.txt"]
+    assert pipeline.failed == ["bad.txt"]
+    # Both documents' 5 chunks went through the model in one full batch
+    service.embedding_service.aembed_documents.assert_awaited_once()
+    assert len(service.embedding_service.aembed_documents.call_args[0][0]) == 5
+
+    # Every document got back exactly its own vectors, in order, and skipped the per-doc save
+    for call in service.publish.call_args_list:
+        job, vectors = call.args
+        assert vectors.shape == (len(job.new_ids), 4)
+        assert call.kwargs == {"save_sparse": False}
+    service.flush_sparse_index.assert_awaited_once()
+
+    stats = pipeline.stats()
+    assert stats["parse"]["items"] == 3 and stats["parse"]["failures"] == 1
+    assert stats["embed"]["batches"] == 1 and stats["embed"]["avg_batch_size"] == 5
+    assert stats["upsert"]["items"] == 2
+    assert all(stage["queue_depth"] == 0 for stage in stats.values())
+
+@pytest.mark.asyncio
+async def test_partial_batch_flushes_and_embed_failure_skips_publish(service):
+    pipeline = IngestionPipeline(service, embed_batch_size=64, embed_max_wait_ms=10)
+    published = await pipeline.run([Path("a.txt")])
+    assert [m.filename for m in published] == ["a.txt"]
+    assert len(service.embedding_service.aembed_documents.call_args[0][0]) == 3
+
+    service.embedding_service.aembed_documents.side_effect = RuntimeError("model down")
+    service.publish.reset_mock()
+    assert await pipeline.run([Path("b.txt")]) == []
+    service.publish.assert_not_called()
+    assert pipeline.stats()["embed"]["failures"] == 1
+    assert pipeline.failed == ["b.txt"]
@@ -0,0 +1,104 @@
+import pytest
+import pytest_asyncio
+from uuid import uuid4
+import numpy as np
+from qdrant_client import models
+from src.infrastructure.db.qdrant import QdrantHandler, get_shared_client
+from src.domain.documents.models import SearchFilters
+
+def _vector(*head: float) -> list:
+    return list(head) + [0.0] * (384 - len(head))
+
+@pytest_asyncio.fixture
+async def handler():
+    qdrant = QdrantHandler(use_memory=True)
+    await qdrant.create_collection_if_not_exists()
+    yield qdrant
+    await qdrant.client.close()
+
+def test_shared_client_is_reused():
+    assert get_shared_client(port=16333) is get_shared_client(port=16333)
+    assert get_shared_client(port=16333) is not get_shared_client(port=16333, prefer_grpc=True)
+
+@pytest.mark.asyncio
+async def test_in_memory_upsert_and_search(handler):
+    await handler.upsert_points([
+        models.PointStruct(id=str(uuid4()), vector=_vector(1.0), payload={"content": "x"}),
+        models.PointStruct(id=str(uuid4()), vector=_vector(0.0, 1.0), payload={"content": "y"}),
+    ])
+
+    points = await handler.search(_vector(1.0, 0.1), limit=1)
+
+    assert await handler.count() == 2
+    assert points[0].payload["content"] == "x"
+
+@pytest.mark.asyncio
+async def test_upsert_vectors_in_batches(handler):
+    vectors = np.zeros((10, 384), dtype=np.float32)
+    vectors[:, 0] = 1.0
+    ids = [str(uuid4()) for _ in range(10)]
+    payloads = [{"content": f"chunk {i}"} for i in range(10)]
+
+    await handler.upsert_vectors(ids, vectors, payloads, batch_size=3, parallelism=2)
+
+    assert await handler.count() == 10
+
+@pytest.mark.asyncio
+async def test_search_applies_version_filters(handler):
+    await handler.upsert_points([
+        models.PointStruct(id=str(uuid4()), vector=_vector(1.0), payload={
+            "logical_doc_id": "doc-1", "filename": "handbook.pdf", "version_number": 1, "versions": [1]
+        }),
+        models.PointStruct(id=str(uuid4()), vector=_vector(0.9, 0.1), payload={
+            "logical_doc_id": "doc-1", "filename": "handbook.pdf", "version_number": 2, "versions": [2]
+        }),
+    ])
+
+    latest = await handler.search(_vector(1.0), limit=5, filters=SearchFilters(latest_only=True), current_versions={"doc-1": 2})
+    rolled_back = await handler.search(_vector(1.0), limit=5, filters=SearchFilters(latest_only=True), current_versions={"doc-1": 1})
+    v1 = await handler.search(_vector(1.0), limit=5, filters=SearchFilters(version_number=1))
+    other_file = await handler.search(_vector(1.0), limit=5, filters=SearchFilters(filename="other.pdf"))
+
+    assert [p.payload["version_number"] for p in latest] == [2]
+    assert [p.payload["version_number"] for p in rolled_back] == [1]
+    assert [p.payload["version_number"] for p in v1] == [1]
+    assert other_file == []
+
+@pytest.mark.asyncio
+async def test_search_batch_returns_one_list_per_query(handler):
+    await handler.upsert_points([
+        models.PointStruct(id=str(uuid4()), vector=_vector(1.0), payload={"content": "x"}),
+        models.PointStruct(id=str(uuid4()), vector=_vector(0.0, 1.0), payload={"content": "y"}),
+    ])
+
+    batches = await handler.search_batch([_vector(1.0), _vector(0.0, 1.0)], limit=1)
+
+    assert [b[0].payload["content"] for b in batches] == ["x", "y"]
+
+@pytest.mark.asyncio
+async def test_points_from_before_version_history_are_backfilled(handler):
+    # Baseline payloads: version_number/is_latest, no versions array
+    await handler.upsert_points([
+        models.PointStruct(id=str(uuid4()), vector=_vector(1.0), payload={
+            "logical_doc_id": "doc-1", "content": f"v{v}", "version_number": v, "is_latest": v == 2
+        })
+        for v in (1, 2, 2)
+    ])
+
+    assert await handler.backfill_versions(page_size=2) == 3
+    assert await handler.backfill_versions() == 0
+
+    latest = await handler.search(
+        _vector(1.0), limit=5, filters=SearchFilters(latest_only=True), current_versions={"doc-1": 2}
+    )
+    assert sorted(p.payload["content"] for p in latest) == ["v2", "v2"]
+
+def test_latest_filter_groups_documents_by_version():
+    current_versions = {f"doc-{i}": 1 + i % 2 for i in range(100)}
+
+    condition = QdrantHandler.latest_condition(current_versions)
+
+    assert len(condition.should) == 2
+    assert sorted(len(c.must[1].match.any) for c in condition.should) == [50, 50]
+    assert QdrantHandler.latest_condition(current_versions) is condition
+    assert QdrantHandler.latest_condition(dict(current_versions)) is not condition
@@ -0,0 +1,67 @@
+import pytest
+from src.infrastructure.db.registry import DocumentRegistry
+
+@pytest.fixture
+def registry(tmp_path):
+    return DocumentRegistry(db_path=str(tmp_path / "registry.db"))
+
+def test_current_versions_follow_upserts(registry):
+    lid = registry.upsert_document("handbook.pdf", "hash-v1", version=1)
+    assert registry.get_current_versions() == {lid: 1}
+
+    registry.upsert_document("handbook.pdf", "hash-v2", lid, version=2)
+    assert registry.get_current_versions() == {lid: 2}
+
+def test_rollback_moves_pointer(registry):
+    lid = registry.upsert_document("handbook.pdf", "hash-v1", version=1)
+    registry.upsert_document("handbook.pdf", "hash-v2", lid, version=2)
+
+    registry.set_current_version(lid, 1)
+
+    record = registry.get_by_filename("handbook.pdf")
+    assert record.current_version == 1
+    assert record.content_hash == "hash-v1"
+    assert registry.get_current_versions() == {lid: 1}
+    assert [v.version for v in registry.list_versions(lid)] == [1, 2]
+
+def test_rollback_to_unknown_version_fails(registry):
+    lid = registry.upsert_document("handbook.pdf", "hash-v1", version=1)
+    with pytest.raises(ValueError):
+        registry.set_current_version(lid, 7)
+
+def test_version_cache_is_shared_across_instances(registry):
+    other = DocumentRegistry(db_path=registry.db_path)
+    assert other.get_current_versions() == {}
+
+    lid = registry.upsert_document("handbook.pdf", "hash-v1", version=1)
+    assert other.get_current_versions() == {lid: 1}
+
+def test_next_version_skips_versions_rolled_away_from(registry):
+    lid = registry.upsert_document("handbook.pdf", "hash-v1", version=1)
+    registry.upsert_document("handbook.pdf", "hash-v2", lid, version=2)
+    registry.upsert_document("handbook.pdf", "hash-v3", lid, version=3)
+    registry.set_current_version(lid, 1)
+
+    assert registry.next_version(lid) == 4
+    assert registry.next_version("unknown") == 1
+
+def test_registry_from_before_version_history_is_seeded(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE documents (
+            logical_id TEXT PRIMARY KEY, filename TEXT NOT NULL UNIQUE,
+            current_version INTEGER NOT NULL, content_hash TEXT NOT NULL, updated_at REAL NOT NULL
+        )
+    """)
+    conn.execute("INSERT INTO documents VALUES ('doc-1', 'handbook.pdf', 3, 'hash-v3', 1.0)")
+    conn.commit()
+    conn.close()
+
+    registry = DocumentRegistry(db_path=path)
+
+    assert [(v.version, v.content_hash) for v in registry.list_versions("doc-1")] == [(3, "hash-v3")]
+    assert registry.next_version("doc-1") == 4
+    registry.set_current_version("doc-1", 3)
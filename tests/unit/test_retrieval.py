@@ -0,0 +1,123 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.infrastructure.db.sparse_index import SparseIndex
+from src.infrastructure.db.registry import corpus_generation
+from src.services.retrieval import Retriever, RetrievalResult
+from src.services.retrieval_cache import RetrievalCache
+from src.domain.documents.models import SearchFilters
+
+def _payload(chunk_id: str, content: str, versions=(1,), doc: str = "doc-1") -> dict:
+    return {"chunk_id": chunk_id, "content": content, "logical_doc_id": doc, "versions": list(versions), "filename": "h.pdf"}
+
+@pytest.fixture
+def sparse_index():
+    index = SparseIndex(path=None)
+    index.add("a", "Policy 4.2: caps may not be worn in exams.", _payload("a", "Policy 4.2: caps may not be worn in exams."))
+    index.add("b", "Policy 4.3: phones must be switched off.", _payload("b", "Policy 4.3: phones must be switched off."))
+    index.add("c", "Library opening hours are 9 to 5.", _payload("c", "Library opening hours are 9 to 5.", versions=(1, 2)))
+    return index
+
+def test_sparse_index_keeps_policy_codes_whole(sparse_index):
+    assert "4.2" in SparseIndex.tokenize("See Policy 4.2.")
+
+    hits = sparse_index.search("Policy 4.2", limit=3)
+
+    assert hits[0][0] == "a"
+
+def test_sparse_index_filters_and_removal(sparse_index):
+    hits = sparse_index.search("policy library", limit=5, filters=SearchFilters(latest_only=True), current_versions={"doc-1": 2})
+    assert [h[0] for h in hits] == ["c"]
+
+    sparse_index.remove(["a"])
+    assert [h[0] for h in sparse_index.search("Policy 4.2", limit=5)] == ["b"]
+
+def test_sparse_index_persists(tmp_path, sparse_index):
+    sparse_index.path = str(tmp_path / "sparse.json.gz")
+    sparse_index.save()
+
+    reloaded = SparseIndex(path=sparse_index.path)
+
+    assert len(reloaded) == 3
+    assert reloaded.search("phones", limit=1)[0][0] == "b"
+
+def test_rrf_prefers_results_found_by_both():
+    dense = [RetrievalResult(chunk_id=c, content=c, score=s, metadata={}) for c, s in [("x", 0.9), ("y", 0.8)]]
+    sparse = [RetrievalResult(chunk_id=c, content=c, score=s, metadata={}) for c, s in [("y", 7.0), ("z", 3.0)]]
+
+    fused = Retriever._fuse(dense, sparse, top_k=3)
+
+    assert [r.chunk_id for r in fused] == ["y", "x", "z"]
+    assert fused[0].metadata == {"dense_score": 0.8, "sparse_score": 7.0}
+
+@pytest.mark.asyncio
+async def test_hybrid_retrieve_runs_both_lookups(sparse_index):
+    qdrant = MagicMock()
+    qdrant.search = AsyncMock(return_value=[MagicMock(payload=_payload("c", "Library opening hours are 9 to 5."), score=0.7)])
+    registry = MagicMock()
+    registry.get_current_versions.return_value = {"doc-1": 1}
+    retriever = Retriever(qdrant_handler=qdrant, registry=registry, sparse_index=sparse_index, cache=RetrievalCache())
+    retriever.embedding_service = MagicMock()
+    retriever.embedding_service.aembed_query = AsyncMock(return_value=[0.0] * 384)
+
+    results = await retriever.retrieve("Policy 4.2", top_k=2, mode="hybrid")
+
+    qdrant.search.assert_awaited_once()
+    assert {r.chunk_id for r in results} == {"a", "c"}
+
+@pytest.mark.asyncio
+async def test_retrieve_cache_hits_until_corpus_changes(sparse_index):
+    registry = MagicMock()
+    registry.get_current_versions.return_value = {"doc-1": 1}
+    cache = RetrievalCache()
+    retriever = Retriever(qdrant_handler=MagicMock(), registry=registry, sparse_index=sparse_index, cache=cache)
+
+    first = await retriever.retrieve("Policy 4.2", top_k=2, mode="sparse")
+    # Normalized query: case and whitespace do not matter
+    second = await retriever.retrieve("  policy   4.2 ", top_k=2, mode="sparse")
+
+    assert [r.chunk_id for r in second] == [r.chunk_id for r in first]
+    assert registry.get_current_versions.call_count == 1
+    assert cache.stats()["hits"] == 1
+
+    corpus_generation.bump()
+    await retriever.retrieve("Policy 4.2", top_k=2, mode="sparse")
+
+    assert registry.get_current_versions.call_count == 2
+    assert cache.stats()["misses"] == 2
+
+def test_retrieval_cache_expires_and_evicts():
+    cache = RetrievalCache(max_entries=2, ttl_seconds=0.0)
+    cache.put(("q",), ["r"])
+    assert cache.get(("q",)) is None
+
+    cache = RetrievalCache(max_entries=2, ttl_seconds=60.0)
+    for key in ("a", "b", "c"):
+        cache.put((key,), [key])
+
+    assert cache.get(("a",)) is None
+    assert cache.get(("c",)) == ["c"]
+
+@pytest.mark.asyncio
+async def test_retrieve_many_batches_dense_search(sparse_index):
+    import numpy as np
+    qdrant = MagicMock()
+    qdrant.search_batch = AsyncMock(return_value=[
+        [MagicMock(payload=_payload("c", "Library opening hours are 9 to 5."), score=0.7)],
+        [],
+    ])
+    registry = MagicMock()
+    registry.get_current_versions.return_value = {"doc-1": 1}
+    retriever = Retriever(qdrant_handler=qdrant, registry=registry, sparse_index=sparse_index, cache=RetrievalCache())
+    retriever.embedding_service = MagicMock()
+    retriever.embedding_service.aembed_documents = AsyncMock(return_value=np.zeros((2, 384), dtype=np.float32))
+
+    results = await retriever.retrieve_many(["library hours", "Policy 4.3"], top_k=2, mode="hybrid")
+
+    retriever.embedding_service.aembed_documents.assert_awaited_once_with(["library hours", "Policy 4.3"])
+    qdrant.search_batch.assert_awaited_once()
+    assert results[0][0].chunk_id == "c"
+    assert results[1][0].chunk_id == "b"
+
+    # Second call is served from the cache
+    await retriever.retrieve_many(["library hours", "Policy 4.3"], top_k=2, mode="hybrid")
+    qdrant.search_batch.assert_awaited_once()
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from src.services.source_watcher import Inotify, SourceWatcher, StatCache
+
+@pytest.fixture
+def pipeline():
+    pipeline = MagicMock()
+    pipeline.run = AsyncMock(return_value=[])
+    pipeline.failed = []
+    return pipeline
+
+def _ingested(pipeline) -> list:
+    return sorted(path.name for call in pipeline.run.await_args_list for path in call.args[0])
+
+@pytest.mark.asyncio
+async def test_only_files_whose_stat_changed_are_ingested(pipeline, tmp_path):
+    root = tmp_path / "docs"
+    (root / "policies").mkdir(parents=True)
+    (root / "a.txt").write_text("a")
+    (root / "policies" / "a.txt").write_text("same name, other folder")
+    (root / "notes.md").write_text("unsupported")
+    cache_path = str(tmp_path / "stat_cache.json")
+    watcher = SourceWatcher(pipeline, root, stat_cache=StatCache(cache_path), use_inotify=False)
+    watcher._inotify = object() # Behave as if events were delivered (no stability wait)
+
+    assert sorted(await watcher.sync()) == ["a.txt", "policies/a.txt"]
+    assert pipeline.run.await_args.kwargs == {"root": root}
+
+    # Nothing changed: nothing is handed to the pipeline (and so nothing is hashed)
+    pipeline.run.reset_mock()
+    assert await watcher.sync() == []
+    pipeline.run.assert_not_awaited()
+
+    # A fresh watcher resumes from the persisted stat cache
+    restarted = SourceWatcher(pipeline, root, stat_cache=StatCache(cache_path), use_inotify=False)
+    restarted._inotify = watcher._inotify
+    (root / "policies" / "a.txt").write_text("edited")
+    assert await restarted.sync([root / "policies"]) == ["policies/a.txt"]
+
+    # Failures are not cached, but retried only once the file changes again
+    (root / "a.txt").write_text("broken")
+    pipeline.failed = ["a.txt"]
+    assert await restarted.sync() == ["a.txt"]
+    pipeline.failed = []
+    assert await restarted.sync() == []
+    (root / "a.txt").write_text("fixed!")
+    assert await restarted.sync() == ["a.txt"]
+
+    (root / "a.txt").unlink()
+    await restarted.sync([root / "a.txt"])
+    assert "a.txt" not in StatCache(cache_path).entries
+
+@pytest.mark.asyncio
+async def test_polling_waits_for_a_stable_stat(pipeline, tmp_path):
+    watcher = SourceWatcher(pipeline, tmp_path, stat_cache=StatCache(None), use_inotify=False)
+    (tmp_path / "a.txt").write_text("partial")
+    assert await watcher.sync() == []
+    assert await watcher.sync() == ["a.txt"]
+
+@pytest.mark.asyncio
+async def test_inotify_events_are_debounced_into_one_run(pipeline, tmp_path):
+    try:
+        Inotify().close()
+    except (OSError, AttributeError):
+        pytest.skip("inotify not available")
+
+    watcher = SourceWatcher(
+        pipeline, tmp_path, stat_cache=StatCache(None), use_inotify=True, debounce_s=0.2, max_delay_s=5
+    )
+    task = asyncio.create_task(watcher.run())
+    try:
+        while watcher._inotify is None or watcher._full_scan:
+            await asyncio.sleep(0.01)
+        # A burst of writes, including into a directory created after start-up
+        (tmp_path / "a.txt").write_text("a")
+        (tmp_path / "new" / "deeper").mkdir(parents=True)
+        await asyncio.sleep(0.05)
+        (tmp_path / "new" / "deeper" / "b.txt").write_text("b")
+        (tmp_path / "a.txt").write_text("a, saved again")
+        for _ in range(300):
+            if pipeline.run.await_count:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.3)
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    pipeline.run.assert_awaited_once()
+    assert _ingested(pipeline) == ["a.txt", "b.txt"]
+    assert watcher.stats()["tracked_files"] == 2
+
+@pytest.mark.asyncio
+async def test_file_creation_alone_is_not_a_change(pipeline, tmp_path):
+    from src.services.source_watcher import IN_CLOSE_WRITE, IN_CREATE, IN_ISDIR
+
+    watcher = SourceWatcher(pipeline, tmp_path, stat_cache=StatCache(None), use_inotify=False)
+    watcher._inotify = MagicMock()
+    watcher._inotify.read.return_value = [(tmp_path / "big.pdf", IN_CREATE)]
+    watcher._on_inotify()
+    assert not watcher._pending and not watcher._changed.is_set()
+
+    watcher._inotify.read.return_value = [(tmp_path / "big.pdf", IN_CLOSE_WRITE), (tmp_path / "sub", IN_CREATE | IN_ISDIR)]
+    watcher._on_inotify()
+    assert watcher._pending == {tmp_path / "big.pdf", tmp_path / "sub"}
+    watcher._inotify.watch_tree.assert_called_once_with(tmp_path / "sub")
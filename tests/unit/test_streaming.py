@@ -0,0 +1,97 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from src.domain.chat.agent import AgentRouter
+from src.domain.chat.models import AgentState
+from src.domain.chat.streaming import AnswerFieldStreamer
+
+def _chunks(text: str, size: int = 4) -> list:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def test_streamer_extracts_answer_across_chunk_boundaries():
+    streamer = AnswerFieldStreamer()
+    content = json.dumps({
+        "action_type": "answer",
+        "rationale": 'quoted "answer": "decoy"',
+        "answer": "Caps are not allowed.\nSee §4.2",
+        "citations": ["h.pdf"]
+    })
+
+    text = "".join(streamer.feed(chunk) for chunk in _chunks(content, 3))
+
+    assert text == "Caps are not allowed.\nSee §4.2"
+    assert streamer.done
+    assert json.loads(streamer.buffer)["citations"] == ["h.pdf"]
+
+def test_streamer_ignores_non_answer_decisions():
+    streamer = AnswerFieldStreamer()
+    content = json.dumps({"action_type": "retrieve", "query": "answer", "rationale": "need docs"})
+
+    assert "".join(streamer.feed(chunk) for chunk in _chunks(content)) == ""
+
+@pytest.mark.asyncio
+async def test_agent_streams_answer_tokens():
+    content = json.dumps({
+        "action_type": "answer",
+        "answer": "Paris",
+        "rationale": "known",
+        "citations": ["doc1"],
+        "confidence_score": 0.9
+    })
+
+    async def stream():
+        for chunk in _chunks(content, 2):
+            yield MagicMock(choices=[MagicMock(delta=MagicMock(content=chunk))])
+
+    tokens = []
+    async def on_token(text):
+        tokens.append(text)
+
+    with patch("src.infrastructure.llm.client.acompletion", AsyncMock(return_value=stream())), \
+         patch("src.domain.chat.agent.AgentTools"):
+        router = AgentRouter()
+        router.guard = MagicMock()
+        router.guard.evaluate_answer.side_effect = lambda action, context: action
+        steps = [s async for s in router.run("Capital of France?", on_token=on_token)]
+
+    assert "".join(tokens) == "Paris"
+    assert len(tokens) > 1
+    assert steps[-1].state == AgentState.DONE
+
+@pytest.mark.asyncio
+async def test_sse_steps_are_sent_once_final():
+    from src.app.api.chat import _stream_agent
+
+    decisions = [
+        {"action_type": "retrieve", "query": "caps rule", "rationale": "need docs"},
+        {"action_type": "answer", "answer": "UNVERIFIED CLAIM", "rationale": "guess", "citations": [], "confidence_score": 0.1},
+    ]
+
+    def completion(**kwargs):
+        content = json.dumps(decisions.pop(0))
+        async def stream():
+            for chunk in _chunks(content, 8):
+                yield MagicMock(choices=[MagicMock(delta=MagicMock(content=chunk))])
+        return stream()
+
+    with patch("src.infrastructure.llm.client.acompletion", AsyncMock(side_effect=completion)), \
+         patch("src.domain.chat.agent.AgentTools"), \
+         patch("src.app.api.chat.answer_cache") as cache:
+        cache.lookup.return_value = None
+        router = AgentRouter()
+        router.tools.retrieve = AsyncMock(return_value=[])
+        container = MagicMock()
+        container.embedding_service.aembed_query = AsyncMock(return_value=[0.0])
+        container.agent.return_value = router
+        events = [e async for e in _stream_agent("Can I wear a cap?", container)]
+
+    steps = [json.loads(e.split("data: ", 1)[1]) for e in events if e.startswith("event: step")]
+    retrieve = next(s for s in steps if s["action"] and s["action"]["action_type"] == "retrieve")
+    assert retrieve["state"] == AgentState.RETRIEVING.value
+    assert retrieve["observation"] == "No relevant documents found."
+
+    # The guardrail's verdict is what gets sent, not the rejected answer
+    assert steps[-1]["state"] == AgentState.REFUSING.value
+    assert steps[-1]["action"]["action_type"] == "refuse"
+    assert all("UNVERIFIED CLAIM" not in json.dumps(s) for s in steps)
+    assert "UNVERIFIED CLAIM" not in events[-1] and events[-1].startswith("event: answer")